@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class LmsConfig(AppConfig):
     name = "lms"
+
+    def ready(self) -> None:
+        import lms.signals  # noqa: F401
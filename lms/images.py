@@ -0,0 +1,107 @@
+import posixpath
+from io import BytesIO
+from typing import Any, Dict, Optional, Tuple
+
+from django.core.files.base import ContentFile
+from django.db.models import Model
+from django.db.models.fields.files import FieldFile
+from PIL import Image, ImageOps
+from rest_framework.request import Request
+
+RENDITION_FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 85, "optimize": True}),
+}
+PREVIEW_SIZES = {"small": (320, 180), "medium": (640, 360)}
+AVATAR_SIZES = {"small": (64, 64), "medium": (256, 256)}
+IMAGE_RENDITIONS = {
+    ("lms.course", "preview"): PREVIEW_SIZES,
+    ("lms.lesson", "preview"): PREVIEW_SIZES,
+    ("users.user", "avatar"): AVATAR_SIZES,
+}
+
+
+def get_renditions_field(field_name: str) -> str:
+    """Возвращает имя поля с путями уменьшенных копий изображения."""
+    return f"{field_name}_renditions"
+
+
+def get_rendition_name(source: str, size: str, extension: str) -> str:
+    """Возвращает путь уменьшенной копии рядом с оригиналом."""
+    directory, filename = posixpath.split(source)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, "renditions", f"{stem}_{size}.{extension}")
+
+
+def render_image(file: FieldFile, sizes: Dict[str, Tuple[int, int]]) -> Dict[str, Dict[str, bytes]]:
+    """Обрезает изображение под каждый размер и кодирует во все форматы."""
+    with file.open("rb"), Image.open(file) as image:
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        result = {}
+        for size, dimensions in sizes.items():
+            resized = ImageOps.fit(image, dimensions, Image.Resampling.LANCZOS)
+            result[size] = {}
+            for extension, (image_format, options) in RENDITION_FORMATS.items():
+                buffer = BytesIO()
+                resized.save(buffer, image_format, **options)
+                result[size][extension] = buffer.getvalue()
+    return result
+
+
+def save_renditions(file: FieldFile, sizes: Dict[str, Tuple[int, int]]) -> Dict[str, Dict[str, str]]:
+    """Генерирует уменьшенные копии изображения в хранилище и возвращает их пути."""
+    renditions = {}
+    for size, encoded in render_image(file, sizes).items():
+        renditions[size] = {}
+        for extension, content in encoded.items():
+            name = get_rendition_name(file.name, size, extension)
+            file.storage.delete(name)
+            renditions[size][extension] = file.storage.save(name, ContentFile(content))
+    return renditions
+
+
+def delete_renditions(file: FieldFile, renditions: Dict[str, Dict[str, str]]) -> None:
+    """Удаляет файлы уменьшенных копий из хранилища."""
+    for paths in renditions.values():
+        for name in paths.values():
+            file.storage.delete(name)
+
+
+def track_image_upload(instance: Model, field_name: str, update_fields: Optional[Any]) -> None:
+    """Перед сохранением отмечает новую загрузку изображения, а при его удалении очищает копии."""
+    if field_name in instance.get_deferred_fields():
+        return
+    if update_fields is not None and field_name not in update_fields:
+        return
+    file = getattr(instance, field_name)
+    renditions_field = get_renditions_field(field_name)
+    if not file:
+        setattr(instance, renditions_field, {})
+    elif not file._committed:
+        instance._renditions_pending = getattr(instance, "_renditions_pending", set()) | {field_name}
+
+
+def pop_pending_renditions(instance: Model) -> set:
+    """Возвращает поля с новыми загрузками, отмеченные перед сохранением."""
+    return instance.__dict__.pop("_renditions_pending", set())
+
+
+def get_rendition_urls(
+    renditions: Optional[Dict[str, Dict[str, str]]], storage: Any, request: Optional[Request] = None
+) -> Dict[str, Dict[str, str]]:
+    """Превращает пути уменьшенных копий в ссылки, абсолютные при наличии запроса."""
+    result = {}
+    for size, paths in (renditions or {}).items():
+        result[size] = {}
+        for extension, name in paths.items():
+            url = storage.url(name)
+            result[size][extension] = request.build_absolute_uri(url) if request is not None else url
+    return result
+
+
+def absolutize_renditions(urls: Dict[str, Dict[str, str]], request: Request) -> Dict[str, Dict[str, str]]:
+    """Делает ссылки на уменьшенные копии абсолютными."""
+    return {
+        size: {extension: request.build_absolute_uri(url) for extension, url in paths.items()}
+        for size, paths in urls.items()
+    }
@@ -0,0 +1,39 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Tuple
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from lms.images import IMAGE_RENDITIONS, get_renditions_field
+from lms.tasks import generate_image_renditions
+
+
+def render_one(job: Tuple[str, int, str]) -> bool:
+    """Генерирует уменьшенные копии одного изображения в процессе пула."""
+    return bool(generate_image_renditions(*job))
+
+
+class Command(BaseCommand):
+    help = "Generate image renditions for existing media in a process pool"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument("--all", action="store_true", help="Regenerate images that already have renditions")
+
+    def handle(self, *args, **options) -> None:
+        jobs = []
+        for label, field_name in IMAGE_RENDITIONS:
+            queryset = apps.get_model(label).objects.exclude(**{field_name: ""}).exclude(**{field_name: None})
+            if not options["all"]:
+                queryset = queryset.filter(**{get_renditions_field(field_name): {}})
+            jobs.extend((label, pk, field_name) for pk in queryset.values_list("pk", flat=True).iterator())
+        if options["workers"] <= 1:
+            results = [render_one(job) for job in jobs]
+        else:
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options["workers"], initializer=django.setup) as executor:
+                results = list(executor.map(render_one, jobs, chunksize=16))
+        self.stdout.write(self.style.SUCCESS(f"Rendered {sum(results)} of {len(jobs)} images"))
@@ -0,0 +1,127 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from lms.models import Course, Lesson
+from online_school.benchmarks import percentile
+from users.models import Payments, User
+from users.serializers import RoleTokenObtainPairSerializer
+
+
+class Command(BaseCommand):
+    help = "Load-test the sync and async catalog read endpoints of a running server"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--url", default="http://127.0.0.1:8000")
+        parser.add_argument("--email", help="User whose access token is sent (defaults to the first course owner)")
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument("--duration", type=float, default=10.0, help="Seconds per endpoint")
+        parser.add_argument("--variant", choices=("sync", "async", "both"), default="both")
+
+    def handle(self, *args, **options) -> None:
+        user = self.get_user(options["email"])
+        token = RoleTokenObtainPairSerializer.get_token(user).access_token
+        url = urlsplit(options["url"])
+        endpoints = self.get_endpoints(user, options["variant"])
+
+        self.stdout.write(
+            f"{'endpoint':<28}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50, ms':>10}{'p95, ms':>10}{'p99, ms':>10}"
+        )
+        for name, path in endpoints.items():
+            request = f"GET {path} HTTP/1.1\r\nHost: {url.netloc}\r\nAuthorization: Bearer {token}\r\n\r\n".encode()
+            latencies, errors, elapsed = asyncio.run(
+                self.run_load(url.hostname, url.port or 80, request, options["concurrency"], options["duration"])
+            )
+            self.stdout.write(
+                f"{name:<28}{len(latencies):>10}{errors:>8}{len(latencies) / elapsed:>10.0f}"
+                f"{percentile(latencies, 50):>10.1f}{percentile(latencies, 95):>10.1f}"
+                f"{percentile(latencies, 99):>10.1f}"
+            )
+
+    def get_user(self, email: Optional[str]) -> User:
+        """Возвращает пользователя, от имени которого отправляются запросы."""
+        if email:
+            user = User.objects.filter(email=email).first()
+        else:
+            user = User.objects.filter(course__isnull=False).order_by("id").first()
+        if user is None:
+            raise CommandError("No user to authenticate as, pass --email")
+        return user
+
+    def get_endpoints(self, user: User, variant: str) -> Dict[str, str]:
+        """Возвращает пути эндпоинтов чтения, доступных пользователю."""
+        course = Course.objects.filter(owner=user).order_by("id").first()
+        lesson = Lesson.objects.filter(owner=user).order_by("id").first()
+        payment = Payments.objects.filter(user=user).order_by("id").first()
+        pairs = {"course list": ("lms:course-list", "lms:course-list-async", ())}
+        if course is not None:
+            pairs["course detail"] = ("lms:course-detail", "lms:course-detail-async", (course.pk,))
+        if lesson is not None:
+            pairs["lesson detail"] = ("lms:lesson-retrieve", "lms:lesson-retrieve-async", (lesson.pk,))
+        if payment is not None:
+            pairs["payment status"] = ("users:payments-detail", "users:payments-status-async", (payment.pk,))
+        endpoints = {}
+        for name, (sync_name, async_name, args) in pairs.items():
+            if variant in ("sync", "both"):
+                endpoints[f"{name} (sync)"] = reverse(sync_name, args=args)
+            if variant in ("async", "both"):
+                endpoints[f"{name} (async)"] = reverse(async_name, args=args)
+        return endpoints
+
+    async def run_load(
+        self, host: str, port: int, request: bytes, concurrency: int, duration: float
+    ) -> Tuple[List[float], int, float]:
+        """Отправляет запросы с заданной конкурентностью и возвращает задержки в мс, ошибки и время."""
+        latencies = []
+        errors = 0
+        start = time.perf_counter()
+        deadline = start + duration
+
+        async def worker() -> None:
+            nonlocal errors
+            connection = None
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    if connection is None:
+                        connection = await asyncio.open_connection(host, port)
+                    status, keep_alive = await self.fetch(*connection, request)
+                except (OSError, asyncio.IncompleteReadError, ValueError):
+                    status, keep_alive = 0, False
+                latencies.append((time.perf_counter() - started) * 1000)
+                if not 200 <= status < 400:
+                    errors += 1
+                if not keep_alive and connection is not None:
+                    connection[1].close()
+                    connection = None
+            if connection is not None:
+                connection[1].close()
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return latencies, errors, time.perf_counter() - start
+
+    async def fetch(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, request: bytes
+    ) -> Tuple[int, bool]:
+        """Отправляет запрос, дочитывает ответ и возвращает статус и признак keep-alive."""
+        writer.write(request)
+        await writer.drain()
+        status = int((await reader.readuntil(b"\r\n")).split()[1])
+        length = 0
+        keep_alive = True
+        while True:
+            line = await reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.partition(b":")
+            name = name.strip().lower()
+            if name == b"content-length":
+                length = int(value)
+            elif name == b"connection" and value.strip().lower() == b"close":
+                keep_alive = False
+        await reader.readexactly(length)
+        return status, keep_alive
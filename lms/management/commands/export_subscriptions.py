@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from lms.models import Subscription
+from users.exports import EXPORT_FORMATS, SUBSCRIPTION_EXPORT_FIELDS, iter_export
+
+
+class Command(BaseCommand):
+    help = "Export subscriptions to CSV or NDJSON"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--format", dest="export_format", choices=list(EXPORT_FORMATS), default="csv")
+        parser.add_argument("--output", help="File path, stdout by default")
+        parser.add_argument("--course", type=int)
+        parser.add_argument("--owner", type=int)
+
+    def handle(self, *args, **options) -> None:
+        filters = {"course": options["course"], "owner": options["owner"]}
+        queryset = Subscription.objects.filter(
+            **{field: value for field, value in filters.items() if value is not None}
+        ).order_by("id")
+        chunks = iter_export(queryset, SUBSCRIPTION_EXPORT_FIELDS, options["export_format"])
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8", newline="") as file:
+                file.writelines(chunks)
+            self.stderr.write(self.style.SUCCESS(f"Subscriptions exported to {options['output']}"))
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
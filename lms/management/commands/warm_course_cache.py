@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from lms.models import Course
+from lms.serializers import CourseDetailSerializer, CourseSerializer
+from lms.services import get_course_payloads
+
+
+class Command(BaseCommand):
+    help = "Warm the course catalog cache"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options) -> None:
+        if not settings.CACHE_ENABLED:
+            self.stdout.write(self.style.WARNING("CACHE_ENABLED is off: the local cache dies with this process, skipping"))
+            return
+        batch_size = options["batch_size"]
+        course_ids = list(Course.objects.order_by("id").values_list("id", flat=True))
+        for start in range(0, len(course_ids), batch_size):
+            batch = course_ids[start:start + batch_size]
+            courses = list(Course.objects.filter(id__in=batch).order_by("id"))
+            for expand in ((), ("lessons",)):
+                get_course_payloads(courses, CourseSerializer, "list", expand=expand)
+                get_course_payloads(courses, CourseDetailSerializer, "detail", expand=expand)
+        self.stdout.write(self.style.SUCCESS(f"Cached {len(course_ids)} courses"))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0006_lesson_updated_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CourseUpdateMark",
+            fields=[
+                (
+                    "course",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        serialize=False,
+                        to="lms.course",
+                        verbose_name="Курс",
+                    ),
+                ),
+                ("is_dirty", models.BooleanField(default=True, verbose_name="Есть несообщенные изменения")),
+                ("marked_at", models.DateTimeField(verbose_name="Последнее изменение")),
+                ("notified_at", models.DateTimeField(blank=True, null=True, verbose_name="Последнее уведомление")),
+            ],
+            options={
+                "verbose_name": "Отметка об обновлении курса",
+                "verbose_name_plural": "Отметки об обновлении курсов",
+            },
+        ),
+    ]
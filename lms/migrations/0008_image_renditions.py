@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0007_courseupdatemark"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="course",
+            name="preview_renditions",
+            field=models.JSONField(blank=True, default=dict, verbose_name="Уменьшенные копии превью курса"),
+        ),
+        migrations.AddField(
+            model_name="lesson",
+            name="preview_renditions",
+            field=models.JSONField(blank=True, default=dict, verbose_name="Уменьшенные копии превью урока"),
+        ),
+    ]
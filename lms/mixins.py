@@ -0,0 +1,197 @@
+import inspect
+from typing import Any, Dict, List, Optional, Set
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Model, QuerySet
+from django.http import Http404, HttpRequest, HttpResponse, HttpResponseBase
+from django.template.response import SimpleTemplateResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.serializers import Serializer
+
+
+class ConditionalRetrieveMixin:
+    """Поддерживает условный GET (ETag/Last-Modified) по полю updated_at.
+
+    Если клиент прислал актуальные If-None-Match/If-Modified-Since,
+    отвечает 304 без сериализации объекта.
+    """
+
+    def get_etag(self, instance: Model) -> str:
+        """Возвращает ETag объекта."""
+        return quote_etag(f"{instance._meta.model_name}-{instance.pk}-{instance.updated_at.timestamp()}")
+
+    def get_last_modified(self, instance: Model) -> int:
+        """Возвращает время изменения объекта в секундах."""
+        return int(instance.updated_at.timestamp())
+
+    def get_retrieve_data(self, instance: Model) -> Dict[str, Any]:
+        """Сериализует объект для ответа."""
+        return self.get_serializer(instance).data
+
+    def get_not_modified_response(self, request: Request, instance: Model) -> Optional[HttpResponseBase]:
+        """Возвращает 304, если у клиента актуальная версия объекта."""
+        return get_conditional_response(
+            request, etag=self.get_etag(instance), last_modified=self.get_last_modified(instance)
+        )
+
+    def add_validators(self, response: HttpResponseBase, instance: Model) -> HttpResponseBase:
+        """Добавляет в ответ ETag и Last-Modified объекта."""
+        response["ETag"] = self.get_etag(instance)
+        response["Last-Modified"] = http_date(self.get_last_modified(instance))
+        return response
+
+    def retrieve(self, request: Request, *args, **kwargs) -> HttpResponseBase:
+        """Возвращает объект или 304, если он не изменился."""
+        instance = self.get_object()
+        response = self.get_not_modified_response(request, instance)
+        if response is None:
+            response = Response(self.get_retrieve_data(instance))
+        return self.add_validators(response, instance)
+
+
+class AsyncViewMixin:
+    """Выполняет представление DRF как асинхронное представление Django.
+
+    Обработчики методов объявляются через async def и читают базу
+    асинхронным ORM. Аутентификация и проверка прав выполняются прямо
+    в цикле событий, поэтому они не должны обращаться к базе: пользователь
+    берется из токена (RoleTokenAuthentication), роли — из его claims.
+    Ответ рендерится здесь же, чтобы Django не отправлял рендеринг в поток.
+    """
+
+    async def dispatch(self, request: HttpRequest, *args, **kwargs) -> HttpResponseBase:
+        """Асинхронный вариант APIView.dispatch."""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            self.initial(request, *args, **kwargs)
+            handler = self.http_method_not_allowed
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            response = handler(request, *args, **kwargs)
+            if inspect.isawaitable(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.render_response(self.response)
+
+    def render_response(self, response: HttpResponseBase) -> HttpResponseBase:
+        """Рендерит ответ DRF в обычный HttpResponse."""
+        if not isinstance(response, SimpleTemplateResponse):
+            return response
+        response.render()
+        rendered = HttpResponse(response.content, status=response.status_code)
+        for header, value in response.items():
+            rendered[header] = value
+        return rendered
+
+    async def aget_object(self) -> Model:
+        """Асинхронный вариант GenericAPIView.get_object."""
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            instance = await queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except queryset.model.DoesNotExist:
+            raise Http404
+        self.check_object_permissions(self.request, instance)
+        return instance
+
+
+class AsyncConditionalRetrieveMixin(ConditionalRetrieveMixin):
+    """Асинхронный условный GET объекта (используется вместе с AsyncViewMixin)."""
+
+    async def aget_retrieve_data(self, instance: Model) -> Dict[str, Any]:
+        """Сериализует объект для ответа."""
+        return self.get_retrieve_data(instance)
+
+    async def get(self, request: Request, *args, **kwargs) -> HttpResponseBase:
+        """Возвращает объект или 304, если он не изменился."""
+        instance = await self.aget_object()
+        response = self.get_not_modified_response(request, instance)
+        if response is None:
+            response = Response(await self.aget_retrieve_data(instance))
+        return self.add_validators(response, instance)
+
+
+class SparseFieldsMixin:
+    """Поддерживает параметры ?fields= (набор полей) и ?expand= (раскрытие связей).
+
+    Выбор управляет и сериализатором, и запросом: невыбранные колонки
+    не загружаются через only(). Поля из required_model_fields загружаются
+    всегда (они нужны пагинации и проверке прав).
+    """
+
+    fields_query_param = "fields"
+    expand_query_param = "expand"
+    expandable_fields = ()
+    required_model_fields = ("owner", "updated_at")
+
+    def get_query_list(self, param: str) -> Optional[List[str]]:
+        """Разбирает список имен через запятую из параметра запроса."""
+        value = self.request.query_params.get(param)
+        if value is None:
+            return None
+        return [name.strip() for name in value.split(",") if name.strip()]
+
+    def get_expand(self) -> Set[str]:
+        """Возвращает раскрываемые связи."""
+        if not hasattr(self, "_expand"):
+            expand = set(self.get_query_list(self.expand_query_param) or ())
+            unknown = expand - set(self.expandable_fields)
+            if unknown:
+                raise ValidationError({self.expand_query_param: f"Нельзя раскрыть: {', '.join(sorted(unknown))}"})
+            self._expand = expand
+        return self._expand
+
+    def get_sparse_fields(self) -> Optional[List[str]]:
+        """Возвращает выбранные поля или None, если выводятся все поля (только для чтения)."""
+        if not hasattr(self, "_sparse_fields"):
+            fields = None
+            if self.request.method in ("GET", "HEAD"):
+                fields = self.get_query_list(self.fields_query_param)
+            if fields is not None:
+                available = set(self.get_serializer_class()(expand=self.expandable_fields).fields)
+                unknown = set(fields) - available
+                if unknown:
+                    raise ValidationError({self.fields_query_param: f"Неизвестные поля: {', '.join(sorted(unknown))}"})
+                fields = sorted(set(fields))
+            self._sparse_fields = fields
+        return self._sparse_fields
+
+    def get_serializer(self, *args, **kwargs) -> Serializer:
+        """Передает сериализатору выбранные поля и раскрытые связи."""
+        kwargs.setdefault("fields", self.get_sparse_fields())
+        kwargs.setdefault("expand", self.get_expand())
+        return super().get_serializer(*args, **kwargs)
+
+    def get_only_fields(self, model: type) -> Optional[List[str]]:
+        """Возвращает колонки модели для only() по выбранным полям сериализатора."""
+        fields = self.get_sparse_fields()
+        if fields is None:
+            return None
+        serializer = self.get_serializer_class()(fields=fields, expand=self.get_expand())
+        names = {model._meta.pk.name, *self.required_model_fields}
+        for field in serializer.fields.values():
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                continue
+            if model_field.concrete and not model_field.many_to_many:
+                names.add(model_field.name)
+        return sorted(names)
+
+    def get_queryset(self) -> QuerySet:
+        """Ограничивает загружаемые колонки выбранными полями."""
+        queryset = super().get_queryset()
+        only = self.get_only_fields(queryset.model)
+        if only is not None:
+            queryset = queryset.only(*only)
+        return queryset
@@ -1,7 +1,25 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
 
 from online_school import settings
 
+SEARCH_CONFIG = "russian"
+
+
+def get_search_vector() -> SearchVector:
+    """Возвращает взвешенный поисковый вектор по названию и описанию."""
+    return SearchVector("name", weight="A", config=SEARCH_CONFIG) + SearchVector(
+        "description", weight="B", config=SEARCH_CONFIG
+    )
+
+
+class SearchableManager(models.Manager):
+    """Не загружает поисковый вектор: он нужен только в условиях и сортировке запроса."""
+
+    def get_queryset(self) -> models.QuerySet:
+        return super().get_queryset().defer("search_vector")
+
 
 class Course(models.Model):
     name = models.CharField(max_length=50, verbose_name="Название курса")
@@ -11,15 +29,24 @@ class Course(models.Model):
         null=True,
         blank=True,
     )
+    preview_renditions = models.JSONField(default=dict, blank=True, verbose_name="Уменьшенные копии превью курса")
     description = models.TextField(max_length=200, verbose_name="Описание", blank=True, null=True)
     owner = models.ForeignKey(
         settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, verbose_name="Владелец курса", blank=True, null=True
     )
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Обновление курса")
+    search_vector = models.GeneratedField(
+        expression=get_search_vector(), output_field=SearchVectorField(), db_persist=True
+    )
+
+    objects = SearchableManager()
 
     class Meta:
         verbose_name = "Курс"
         verbose_name_plural = "Курсы"
+        indexes = [
+            GinIndex(fields=["search_vector"], name="lms_course_search_idx"),
+        ]
 
     def __str__(self):
         return self.name
@@ -35,14 +62,25 @@ class Lesson(models.Model):
         null=True,
         blank=True,
     )
+    preview_renditions = models.JSONField(default=dict, blank=True, verbose_name="Уменьшенные копии превью урока")
     video_link = models.URLField(verbose_name="Видео")
     owner = models.ForeignKey(
         settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, verbose_name="Владелец урока", blank=True, null=True
     )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Обновление урока")
+    search_vector = models.GeneratedField(
+        expression=get_search_vector(), output_field=SearchVectorField(), db_persist=True
+    )
+
+    objects = SearchableManager()
 
     class Meta:
         verbose_name = "Урок"
         verbose_name_plural = "Уроки"
+        indexes = [
+            models.Index(fields=["course", "id"], name="lms_lesson_course_id_idx"),
+            GinIndex(fields=["search_vector"], name="lms_lesson_search_idx"),
+        ]
 
     def __str__(self):
         return self.name
@@ -61,3 +99,18 @@ class Subscription(models.Model):
 
     def __str__(self):
         return f"{self.owner}: {self.course}"
+
+
+class CourseUpdateMark(models.Model):
+    """Отметка о несообщенных подписчикам изменениях курса"""
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, primary_key=True, verbose_name="Курс")
+    is_dirty = models.BooleanField(default=True, verbose_name="Есть несообщенные изменения")
+    marked_at = models.DateTimeField(verbose_name="Последнее изменение")
+    notified_at = models.DateTimeField(blank=True, null=True, verbose_name="Последнее уведомление")
+
+    class Meta:
+        verbose_name = "Отметка об обновлении курса"
+        verbose_name_plural = "Отметки об обновлении курсов"
+
+    def __str__(self):
+        return f"{self.course_id}: {self.marked_at}"
@@ -1,7 +1,70 @@
-from rest_framework.pagination import PageNumberPagination
+from typing import List, Optional
+
+from django.core.paginator import InvalidPage, Page
+from django.db.models import QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination, PageNumberPagination
+from rest_framework.request import Request
 
 
 class CustomPagination(PageNumberPagination):
     page_size = 5
     page_size_query_param = "page_size"
     max_page_size = 10
+
+
+class AsyncCustomPagination(CustomPagination):
+    """Постраничная пагинация для асинхронных представлений: COUNT и страница читаются асинхронным ORM."""
+
+    async def apaginate_queryset(self, queryset: QuerySet, request: Request, view=None) -> Optional[List]:
+        """Асинхронный вариант paginate_queryset."""
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            number = paginator.validate_number(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        bottom = (number - 1) * page_size
+        object_list = [obj async for obj in queryset[bottom:bottom + page_size]]
+        self.page = Page(object_list, number, paginator)
+        self.request = request
+        return object_list
+
+
+class CustomCursorPagination(CursorPagination):
+    """Курсорная пагинация по id: без COUNT(*) и OFFSET."""
+
+    page_size = 5
+    page_size_query_param = "page_size"
+    max_page_size = 10
+    ordering = "id"
+
+
+class CourseCursorPagination(CustomCursorPagination):
+    """Курсорная пагинация курсов по неизменяемому ключу: сначала новые."""
+
+    ordering = "-id"
+
+
+class SearchCursorPagination(CustomCursorPagination):
+    """Курсорная пагинация результатов поиска: сначала наиболее релевантные."""
+
+    ordering = ("-rank", "-id")
+
+
+class PaginationModeMixin:
+    """Переключает представление на курсорную пагинацию по параметру ?pagination=cursor."""
+
+    pagination_mode_query_param = "pagination"
+    cursor_pagination_class = CustomCursorPagination
+
+    @property
+    def paginator(self) -> BasePagination:
+        """Возвращает пагинатор для выбранного режима."""
+        if not hasattr(self, "_paginator") and self.request.query_params.get(self.pagination_mode_query_param) == "cursor":
+            self._paginator = self.cursor_pagination_class()
+        return super().paginator
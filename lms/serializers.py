@@ -1,50 +1,109 @@
-from typing import Dict, List
+from typing import Any, Dict, Iterable, List, Optional
 
-from rest_framework.fields import SerializerMethodField
-from rest_framework.serializers import ModelSerializer
+from django.core.files.storage import default_storage
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema_field
+from rest_framework.fields import (BooleanField, CharField, Field, FloatField, IntegerField, ListField,
+                                   SerializerMethodField)
+from rest_framework.serializers import ModelSerializer, Serializer, ValidationError
 
+from lms.images import get_rendition_urls
 from lms.models import Course, Lesson, Subscription
 from lms.validators import LinkValidator
 
+LESSONS_BULK_MAX = 100
 
-class CourseSerializer(ModelSerializer):
+
+class DynamicFieldsMixin:
+    """Оставляет в сериализаторе только поля из fields и раскрытые связи из expand.
+
+    Связи из expandable_fields выводятся только при явном раскрытии.
+    """
+
+    expandable_fields = ()
+
+    def __init__(self, *args, fields: Optional[Iterable[str]] = None, expand: Iterable[str] = (), **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        expand = set(expand)
+        for name in set(self.expandable_fields) - expand:
+            self.fields.pop(name, None)
+        if fields is not None:
+            for name in set(self.fields) - set(fields) - expand:
+                self.fields.pop(name)
+
+
+@extend_schema_field(OpenApiTypes.OBJECT)
+class RenditionsField(Field):
+    """Выводит ссылки на уменьшенные копии изображения по размерам и форматам."""
+
+    def __init__(self, **kwargs: Any):
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value: Dict[str, Dict[str, str]]) -> Dict[str, Dict[str, str]]:
+        """Превращает пути в ссылки."""
+        return get_rendition_urls(value, default_storage, self.context.get("request"))
+
+
+class CourseSerializer(DynamicFieldsMixin, ModelSerializer):
+    expandable_fields = ("lessons",)
     is_subscribe = SerializerMethodField()
     lessons = SerializerMethodField()
+    preview_renditions = RenditionsField()
 
     class Meta:
         model = Course
-        fields = ("id", "name", "preview", "description", "owner", "lessons", "is_subscribe")
+        fields = ("id", "name", "preview", "preview_renditions", "description", "owner", "lessons", "is_subscribe")
 
     def get_lessons(self, obj: Course) -> List[Dict]:
-        """Возвращает список уроков для курса."""
+        """Возвращает список уроков для курса (использует prefetch_related, если он есть)."""
         queryset = obj.lesson_set.all()
         return LessonSerializer(queryset, many=True).data
 
     def get_is_subscribe(self, obj: Course) -> bool:
         """Проверяет есть ли подписка у пользователя."""
-        user = self.context["request"].user
+        if hasattr(obj, "is_subscribe"):
+            return obj.is_subscribe
+        request = self.context.get("request")
+        if request is None:
+            return False
+        user = request.user
         if not user.is_authenticated:
             return False
-        return Subscription.objects.filter(owner=user, course=obj).exists()
+        return Subscription.objects.filter(owner_id=user.pk, course=obj).exists()
+
 
+class LessonSerializer(DynamicFieldsMixin, ModelSerializer):
+    preview_renditions = RenditionsField()
 
-class LessonSerializer(ModelSerializer):
     class Meta:
         model = Lesson
-        fields = ("id", "name", "description", "course", "owner")
+        fields = ("id", "name", "description", "preview_renditions", "course", "owner")
         validators = [LinkValidator(field="video_link")]
 
 
-class CourseDetailSerializer(ModelSerializer):
+class LessonBulkItemSerializer(ModelSerializer):
+    class Meta:
+        model = Lesson
+        fields = ("name", "description", "video_link")
+        validators = [LinkValidator(field="video_link")]
+
+
+class LessonBulkCreateSerializer(Serializer):
+    lessons = LessonBulkItemSerializer(many=True, allow_empty=False, max_length=LESSONS_BULK_MAX)
+
+
+class CourseDetailSerializer(DynamicFieldsMixin, ModelSerializer):
+    expandable_fields = ("lessons",)
     count_lessons = SerializerMethodField()
-    lessons = LessonSerializer(many=True, read_only=True)
+    lessons = LessonSerializer(source="lesson_set", many=True, read_only=True)
 
     class Meta:
         model = Course
         fields = ("name", "count_lessons", "lessons")
 
     def get_count_lessons(self, obj: Course) -> int:
-        """Считает количество уроков в курсе."""
+        """Считает количество уроков в курсе (без запроса, если уроки подгружены)."""
         return obj.lesson_set.count()
 
 
@@ -52,3 +111,47 @@ class SubscriptionSerializer(ModelSerializer):
     class Meta:
         model = Subscription
         fields = "__all__"
+
+
+class SubscriptionBulkSerializer(Serializer):
+    subscribe = ListField(child=IntegerField(), required=False, default=list, max_length=100)
+    unsubscribe = ListField(child=IntegerField(), required=False, default=list, max_length=100)
+
+    def validate(self, attrs: Dict) -> Dict:
+        """Проверяет, что курсы существуют и не указаны в обоих списках."""
+        subscribe = set(attrs["subscribe"])
+        unsubscribe = set(attrs["unsubscribe"])
+        if subscribe & unsubscribe:
+            raise ValidationError("Курс не может быть одновременно в subscribe и unsubscribe")
+        existing = set(Course.objects.filter(id__in=subscribe).values_list("id", flat=True))
+        missing = subscribe - existing
+        if missing:
+            raise ValidationError({"subscribe": f"Курсы не найдены: {sorted(missing)}"})
+        attrs["subscribe"] = sorted(subscribe)
+        attrs["unsubscribe"] = sorted(unsubscribe)
+        return attrs
+
+
+class SubscriptionStateSerializer(Serializer):
+    course_id = IntegerField()
+    is_subscribe = BooleanField()
+
+
+class SearchQuerySerializer(Serializer):
+    q = CharField(min_length=2, max_length=200, help_text="Поисковый запрос")
+
+
+class CourseSearchSerializer(ModelSerializer):
+    rank = FloatField(read_only=True)
+
+    class Meta:
+        model = Course
+        fields = ("id", "name", "description", "rank")
+
+
+class LessonSearchSerializer(ModelSerializer):
+    rank = FloatField(read_only=True)
+
+    class Meta:
+        model = Lesson
+        fields = ("id", "name", "description", "course", "rank")
@@ -0,0 +1,95 @@
+import time
+from functools import partial
+from typing import Any, Collection, Dict, Iterable, List, Optional, Sequence, Type
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from django.utils.timezone import now
+from rest_framework.serializers import Serializer
+
+from lms.models import Course, CourseUpdateMark
+
+
+def get_course_version_key(course_id: int) -> str:
+    """Возвращает ключ кэша с версией курса."""
+    return f"course_version:{course_id}"
+
+
+def get_course_payload_key(kind: str, course_id: int, version: int) -> str:
+    """Возвращает ключ кэша с данными курса определенной версии."""
+    return f"course:{kind}:{course_id}:{version}"
+
+
+def get_course_versions(course_ids: Iterable[int]) -> Dict[int, int]:
+    """Возвращает текущие версии курсов, заводя новые для отсутствующих в кэше."""
+    keys = {course_id: get_course_version_key(course_id) for course_id in course_ids}
+    cached = cache.get_many(keys.values())
+    missing = [key for key in keys.values() if key not in cached]
+    if missing:
+        for key in missing:
+            cache.add(key, time.time_ns(), None)
+        cached.update(cache.get_many(missing))
+    return {course_id: cached[key] for course_id, key in keys.items()}
+
+
+def set_course_version(course_id: int) -> None:
+    """Записывает курсу новую версию, после чего закэшированные данные курса больше не читаются."""
+    cache.set(get_course_version_key(course_id), time.time_ns(), None)
+
+
+def bump_course_version(course_id: Optional[int]) -> None:
+    """Меняет версию курса после коммита текущей транзакции.
+
+    До коммита читатели видят в базе старые данные и кэшируют их под старой
+    версией, а при откате версия не меняется.
+    """
+    if course_id is not None:
+        transaction.on_commit(partial(set_course_version, course_id))
+
+
+def get_payload_kind(kind: str, fields: Optional[Sequence[str]], expand: Collection[str]) -> str:
+    """Возвращает вид данных курса с учетом выбранных полей и раскрытых связей."""
+    return f"{kind}:{','.join(sorted(fields)) if fields is not None else '*'}:{','.join(sorted(expand))}"
+
+
+def get_course_payloads(
+    courses: List[Course],
+    serializer_class: Type[Serializer],
+    kind: str,
+    fields: Optional[Sequence[str]] = None,
+    expand: Collection[str] = (),
+) -> List[Dict[str, Any]]:
+    """Возвращает общие для всех пользователей данные курсов из кэша.
+
+    Каждый набор полей и раскрытых связей кэшируется отдельно. Уроки
+    отсутствующих в кэше курсов подгружаются одним запросом, только если
+    раскрыты. Пользовательское поле is_subscribe в кэш не попадает.
+    """
+    kind = get_payload_kind(kind, fields, expand)
+    versions = get_course_versions(course.pk for course in courses)
+    keys = {course.pk: get_course_payload_key(kind, course.pk, versions[course.pk]) for course in courses}
+    payloads = cache.get_many(keys.values())
+    missed = [course for course in courses if keys[course.pk] not in payloads]
+    if missed:
+        if "lessons" in expand:
+            prefetch_related_objects(missed, "lesson_set")
+        fresh = {}
+        for course in missed:
+            data = dict(serializer_class(course, fields=fields, expand=expand).data)
+            data.pop("is_subscribe", None)
+            fresh[keys[course.pk]] = data
+        cache.set_many(fresh, settings.COURSE_CACHE_TIMEOUT)
+        payloads.update(fresh)
+    return [dict(payloads[keys[course.pk]]) for course in courses]
+
+
+def mark_course_updated(course_id: int) -> None:
+    """Отмечает курс как измененный для отложенной рассылки уведомлений."""
+    CourseUpdateMark.objects.bulk_create(
+        [CourseUpdateMark(course_id=course_id, is_dirty=True, marked_at=now())],
+        update_conflicts=True,
+        unique_fields=["course"],
+        update_fields=["is_dirty", "marked_at"],
+    )
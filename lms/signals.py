@@ -0,0 +1,67 @@
+from functools import partial
+from typing import Optional
+
+from django.db import transaction
+from django.db.models import Model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils.timezone import now
+
+from lms.images import pop_pending_renditions, track_image_upload
+from lms.models import Course, Lesson
+from lms.services import bump_course_version
+from lms.tasks import generate_image_renditions
+
+
+def touch_course(course_id: Optional[int]) -> None:
+    """Обновляет updated_at курса и сбрасывает его кэш."""
+    if course_id is not None:
+        Course.objects.filter(pk=course_id).update(updated_at=now())
+        bump_course_version(course_id)
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def course_changed(sender, instance, **kwargs) -> None:
+    """Сбрасывает кэш курса при его изменении или удалении."""
+    bump_course_version(instance.pk)
+
+
+@receiver(pre_save, sender=Lesson)
+def lesson_moving(sender, instance, **kwargs) -> None:
+    """Сбрасывает кэш прежнего курса, если урок переносят в другой курс."""
+    if instance.pk:
+        old_course_id = Lesson.objects.filter(pk=instance.pk).values_list("course_id", flat=True).first()
+        if old_course_id != instance.course_id:
+            touch_course(old_course_id)
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+def lesson_changed(sender, instance, **kwargs) -> None:
+    """Обновляет курс при изменении или удалении урока."""
+    if isinstance(kwargs.get("origin"), Course):
+        return
+    touch_course(instance.course_id)
+
+
+def schedule_renditions(instance: Model) -> None:
+    """Ставит генерацию уменьшенных копий новых изображений в очередь после коммита."""
+    for field_name in pop_pending_renditions(instance):
+        transaction.on_commit(
+            partial(generate_image_renditions.delay, instance._meta.label_lower, instance.pk, field_name)
+        )
+
+
+@receiver(pre_save, sender=Course)
+@receiver(pre_save, sender=Lesson)
+def preview_uploading(sender, instance, update_fields=None, **kwargs) -> None:
+    """Отмечает новую загрузку превью."""
+    track_image_upload(instance, "preview", update_fields)
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Lesson)
+def preview_uploaded(sender, instance, **kwargs) -> None:
+    """Запускает генерацию уменьшенных копий превью."""
+    schedule_renditions(instance)
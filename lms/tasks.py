@@ -1,20 +1,129 @@
-from celery import shared_task
-from django.core.mail import send_mail
+import logging
+from functools import partial
+from smtplib import SMTPException
+from typing import Dict, List
 
-from lms.models import Subscription
+from celery import group, shared_task
+from django.apps import apps
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils.timezone import now
+
+from lms.images import IMAGE_RENDITIONS, delete_renditions, get_renditions_field, save_renditions
+from lms.models import CourseUpdateMark, Subscription
 from online_school import settings
 
+logger = logging.getLogger(__name__)
+
+EMAIL_CHUNK_SIZE = 500
+
 
 @shared_task
-def send_info_about_updates(course_id):
-    """Отправляет письмо об обновлении курса"""
-    subscription = Subscription.objects.filter(id=course_id)
-
-    for sub in subscription:
-        send_mail(
-            subject="Обновления курса",
-            message="В ваш курс по подписке добавлены новые материалы!",
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[sub.owner.email],
-            fail_silently=True,
+def send_info_about_updates(course_id: int) -> Dict[str, int]:
+    """Разбивает подписчиков курса на пачки и запускает их рассылку группой задач"""
+    emails = (
+        Subscription.objects.filter(course_id=course_id, active=True)
+        .values_list("owner__email", flat=True)
+        .iterator(chunk_size=EMAIL_CHUNK_SIZE)
+    )
+    chunks = []
+    chunk: List[str] = []
+    recipients = 0
+    for email in emails:
+        chunk.append(email)
+        recipients += 1
+        if len(chunk) == EMAIL_CHUNK_SIZE:
+            chunks.append(send_update_emails_chunk.s(chunk))
+            chunk = []
+    if chunk:
+        chunks.append(send_update_emails_chunk.s(chunk))
+    if chunks:
+        group(chunks).apply_async()
+    logger.info("Course %s update: %s recipients in %s chunks", course_id, recipients, len(chunks))
+    return {"recipients": recipients, "chunks": len(chunks)}
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def send_update_emails_chunk(self, emails: List[str], sent: int = 0) -> Dict[str, int]:
+    """Отправляет письмо об обновлении курса пачке подписчиков; sent накапливается между повторами"""
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except (SMTPException, OSError) as exc:
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=exc)
+        logger.warning("Course update chunk: SMTP connection failed, %s recipients not sent", len(emails))
+        return {"sent": sent, "failed": len(emails)}
+
+    failed = []
+    try:
+        for email in emails:
+            message = EmailMessage(
+                subject="Обновления курса",
+                body="В ваш курс по подписке добавлены новые материалы!",
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                to=[email],
+                connection=connection,
+            )
+            try:
+                sent += connection.send_messages([message]) or 0
+            except (SMTPException, OSError):
+                failed.append(email)
+    finally:
+        connection.close()
+
+    logger.info("Course update chunk: sent %s, failed %s", sent, len(failed))
+    if failed and self.request.retries < self.max_retries:
+        raise self.retry(args=(failed,), kwargs={"sent": sent})
+    return {"sent": sent, "failed": len(failed)}
+
+
+@shared_task
+def send_pending_course_updates() -> int:
+    """Запускает не более одной рассылки на курс за окно COURSE_UPDATE_NOTIFICATION_WINDOW"""
+    current_time = now()
+    window_start = current_time - settings.COURSE_UPDATE_NOTIFICATION_WINDOW
+    with transaction.atomic():
+        course_ids = list(
+            CourseUpdateMark.objects.select_for_update(skip_locked=True)
+            .filter(Q(notified_at__isnull=True) | Q(notified_at__lte=window_start), is_dirty=True)
+            .values_list("course_id", flat=True)
         )
+        if course_ids:
+            CourseUpdateMark.objects.filter(course_id__in=course_ids).update(is_dirty=False, notified_at=current_time)
+        for course_id in course_ids:
+            transaction.on_commit(partial(send_info_about_updates.delay, course_id))
+    logger.info("Pending course updates: %s notifications scheduled", len(course_ids))
+    return len(course_ids)
+
+
+@shared_task
+def generate_image_renditions(model_label: str, pk: int, field_name: str) -> Dict[str, Dict[str, str]]:
+    """Генерирует уменьшенные копии изображения и сохраняет их пути в объекте"""
+    model = apps.get_model(model_label)
+    renditions_field = get_renditions_field(field_name)
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None or not getattr(instance, field_name):
+        return {}
+    file = getattr(instance, field_name)
+    try:
+        renditions = save_renditions(file, IMAGE_RENDITIONS[(model_label, field_name)])
+    except OSError:
+        logger.warning("Cannot render %s %s of %s", field_name, file.name, model_label, exc_info=True)
+        return {}
+    if model.objects.filter(pk=pk).values_list(field_name, flat=True).first() != file.name:
+        delete_renditions(file, renditions)
+        return {}
+    new_paths = {name for paths in renditions.values() for name in paths.values()}
+    stale = {
+        size: {extension: name for extension, name in paths.items() if name not in new_paths}
+        for size, paths in (getattr(instance, renditions_field) or {}).items()
+    }
+    delete_renditions(file, stale)
+    setattr(instance, renditions_field, renditions)
+    update_fields = [renditions_field]
+    if any(field.name == "updated_at" for field in model._meta.concrete_fields):
+        update_fields.append("updated_at")
+    instance.save(update_fields=update_fields)
+    return renditions
@@ -1,9 +1,33 @@
-from django.urls import reverse
+import tempfile
+from asyncio import iscoroutinefunction
+from io import BytesIO, StringIO
+from smtplib import SMTPException
+from typing import Tuple
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends import locmem
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.http import StreamingHttpResponse
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from PIL import Image
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from lms.models import Course, Lesson, Subscription
+from lms.models import Course, CourseUpdateMark, Lesson, Subscription
+from lms.services import get_course_versions
+from lms.tasks import send_info_about_updates, send_pending_course_updates, send_update_emails_chunk
+from online_school.celery import app as celery_app
 from users.models import User
+from users.serializers import RoleTokenObtainPairSerializer
 
 
 class CourseTestCase(APITestCase):
@@ -24,6 +48,20 @@ class CourseTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(data["name"], self.course.name)
 
+    def test_course_retrieve_not_modified(self) -> None:
+        """Тестирует ответ 304 на условный запрос курса и смену ETag после изменения урока"""
+        url = reverse("lms:course-detail", args=(self.course.id,))
+        response = self.client.get(url)
+        etag = response["ETag"]
+        self.assertIn("Last-Modified", response)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+        Lesson.objects.create(name="Alphabet", course=self.course, owner=self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
     def test_course_create(self) -> None:
         """Тестирует создание курса"""
         url = reverse("lms:course-list")
@@ -65,9 +103,9 @@ class CourseTestCase(APITestCase):
                 {
                     "id": self.course.id,
                     "is_subscribe": False,
-                    "lessons": [],
                     "name": self.course.name,
                     "preview": None,
+                    "preview_renditions": {},
                     "description": None,
                     "owner": self.course.owner.id,
                 }
@@ -76,6 +114,121 @@ class CourseTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(data, result)
 
+    def test_course_list_query_count(self) -> None:
+        """Тестирует, что число запросов списка курсов не зависит от количества курсов и уроков"""
+        for i in range(4):
+            course = Course.objects.create(name=f"Course {i}", owner=self.user)
+            Lesson.objects.create(name=f"Lesson {i}", course=course, owner=self.user)
+            Lesson.objects.create(name=f"Lesson {i}.2", course=course, owner=self.user)
+        Subscription.objects.create(owner=self.user, course=course)
+        url = reverse("lms:course-list")
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {"expand": "lessons"})
+        results = response.json()["results"]
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(results), 5)
+        self.assertEqual([item["is_subscribe"] for item in results], [False, False, False, False, True])
+        self.assertEqual([len(item["lessons"]) for item in results], [0, 2, 2, 2, 2])
+
+    def test_course_list_cursor(self) -> None:
+        """Тестирует курсорную пагинацию курсов: сначала новые"""
+        course = Course.objects.create(name="Math", owner=self.user)
+        url = reverse("lms:course-list")
+        response = self.client.get(url, {"pagination": "cursor"})
+        data = response.json()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("count", data)
+        self.assertEqual([item["id"] for item in data["results"]], [course.id, self.course.id])
+
+    def test_course_list_cursor_stable_on_update(self) -> None:
+        """Тестирует, что изменение курса между страницами не приводит к пропускам и повторам"""
+        courses = [Course.objects.create(name=f"Course {i}", owner=self.user) for i in range(3)]
+        url = reverse("lms:course-list")
+        first = self.client.get(url, {"pagination": "cursor", "page_size": 2}).json()
+        courses[0].name = "Updated"
+        courses[0].save()
+        second = self.client.get(first["next"]).json()
+        ids = [item["id"] for item in first["results"] + second["results"]]
+        self.assertEqual(ids, [courses[2].id, courses[1].id, courses[0].id, self.course.id])
+
+    def test_course_list_cached(self) -> None:
+        """Тестирует, что повторный список курсов берется из кэша, а изменения урока сбрасывают кэш"""
+        cache.clear()
+        lesson = Lesson.objects.create(name="Alphabet", course=self.course, owner=self.user)
+        url = reverse("lms:course-list")
+        self.client.get(url, {"expand": "lessons"})
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {"expand": "lessons"})
+        self.assertEqual(response.json()["results"][0]["lessons"][0]["name"], "Alphabet")
+        lesson.name = "Numbers"
+        with self.captureOnCommitCallbacks(execute=True):
+            lesson.save()
+        Subscription.objects.create(owner=self.user, course=self.course)
+        item = self.client.get(url, {"expand": "lessons"}).json()["results"][0]
+        self.assertEqual(item["lessons"][0]["name"], "Numbers")
+        self.assertTrue(item["is_subscribe"])
+
+    def test_course_list_sparse_fields(self) -> None:
+        """Тестирует выбор полей курса: невыбранные колонки, подписки и уроки не загружаются"""
+        cache.clear()
+        Lesson.objects.create(name="Alphabet", course=self.course, owner=self.user)
+        url = reverse("lms:course-list")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {"fields": "id,name"})
+        self.assertEqual(response.json()["results"], [{"id": self.course.id, "name": "English"}])
+        sql = " ".join(query["sql"] for query in queries.captured_queries)
+        self.assertNotIn("description", sql)
+        self.assertNotIn("lms_subscription", sql)
+        self.assertNotIn("lms_lesson", sql)
+        response = self.client.get(url, {"fields": "name", "expand": "lessons"})
+        item = response.json()["results"][0]
+        self.assertEqual(set(item), {"name", "lessons"})
+        self.assertEqual(item["lessons"][0]["name"], "Alphabet")
+
+    def test_course_sparse_fields_invalid(self) -> None:
+        """Тестирует ошибку на неизвестное поле или связь"""
+        url = reverse("lms:course-list")
+        self.assertEqual(self.client.get(url, {"fields": "id,secret"}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url, {"expand": "owner"}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_course_version_bumped_on_commit(self) -> None:
+        """Тестирует, что версия курса меняется только после коммита, а при откате остается прежней"""
+        cache.clear()
+        version = get_course_versions([self.course.id])[self.course.id]
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            Lesson.objects.create(name="Alphabet", course=self.course, owner=self.user)
+            raise RuntimeError
+        self.assertEqual(get_course_versions([self.course.id])[self.course.id], version)
+        with self.captureOnCommitCallbacks(execute=True):
+            Lesson.objects.create(name="Alphabet", course=self.course, owner=self.user)
+            self.assertEqual(get_course_versions([self.course.id])[self.course.id], version)
+        self.assertNotEqual(get_course_versions([self.course.id])[self.course.id], version)
+
+    def test_course_cache_timeout_without_shared_cache(self) -> None:
+        """Тестирует, что без общего кэша данные курсов кэшируются ненадолго, а прогрев пропускается"""
+        self.assertFalse(settings.CACHE_ENABLED)
+        self.assertLessEqual(settings.COURSE_CACHE_TIMEOUT, 60)
+        cache.clear()
+        with patch.object(cache, "set_many", wraps=cache.set_many) as set_many:
+            self.client.get(reverse("lms:course-list"))
+        self.assertEqual(set_many.call_args.args[1], settings.COURSE_CACHE_TIMEOUT)
+        out = StringIO()
+        call_command("warm_course_cache", stdout=out)
+        self.assertIn("skipping", out.getvalue())
+
+    @override_settings(CACHE_ENABLED=True)
+    def test_warm_course_cache(self) -> None:
+        """Тестирует прогрев кэша курсов командой"""
+        cache.clear()
+        Lesson.objects.create(name="Alphabet", course=self.course, owner=self.user)
+        call_command("warm_course_cache", stdout=StringIO())
+        url = reverse("lms:course-detail", args=(self.course.id,))
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {"expand": "lessons"})
+        data = response.json()
+        self.assertEqual(data["count_lessons"], 1)
+        self.assertEqual(data["lessons"][0]["name"], "Alphabet")
+
 
 class LessonTestCase(APITestCase):
     def setUp(self) -> None:
@@ -95,6 +248,13 @@ class LessonTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(data["name"], self.lesson.name)
 
+    def test_lesson_retrieve_not_modified(self) -> None:
+        """Тестирует ответ 304 на запрос урока с If-Modified-Since"""
+        url = reverse("lms:lesson-retrieve", args=(self.lesson.id,))
+        response = self.client.get(url)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
     def test_lesson_create(self) -> None:
         """Тестирует создание урока"""
         url = reverse("lms:lesson-create")
@@ -134,6 +294,7 @@ class LessonTestCase(APITestCase):
                     "id": self.lesson.id,
                     "name": self.lesson.name,
                     "description": None,
+                    "preview_renditions": {},
                     "course": self.course.id,
                     "owner": self.lesson.owner.id,
                 }
@@ -142,6 +303,77 @@ class LessonTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(data, result)
 
+    def test_lesson_list_cursor(self) -> None:
+        """Тестирует курсорную пагинацию списка уроков без запроса COUNT"""
+        lessons = [self.lesson] + [
+            Lesson.objects.create(name=f"Lesson {i}", course=self.course, owner=self.user) for i in range(5)
+        ]
+        url = reverse("lms:lesson-list")
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {"pagination": "cursor"})
+        data = response.json()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("count", data)
+        self.assertEqual([item["id"] for item in data["results"]], [lesson.id for lesson in lessons[:5]])
+        response = self.client.get(data["next"])
+        self.assertEqual([item["id"] for item in response.json()["results"]], [lessons[5].id])
+
+    def test_lesson_sparse_fields(self) -> None:
+        """Тестирует выбор полей в списке и деталях урока"""
+        response = self.client.get(reverse("lms:lesson-list"), {"fields": "id,name"})
+        self.assertEqual(response.json()["results"], [{"id": self.lesson.id, "name": self.lesson.name}])
+        response = self.client.get(reverse("lms:lesson-retrieve", args=(self.lesson.id,)), {"fields": "course"})
+        self.assertEqual(response.json(), {"course": self.course.id})
+
+    def test_course_lessons_list(self) -> None:
+        """Тестирует вывод уроков одного курса"""
+        other_course = Course.objects.create(name="Math")
+        Lesson.objects.create(name="Numbers", course=other_course, owner=self.user)
+        url = reverse("lms:course-lessons", args=(self.course.id,))
+        response = self.client.get(url)
+        data = response.json()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item["id"] for item in data["results"]], [self.lesson.id])
+        self.assertIsNone(data["next"])
+
+    def test_lessons_bulk_create(self) -> None:
+        """Тестирует создание уроков курса одним запросом"""
+        self.course.owner = self.user
+        self.course.save()
+        url = reverse("lms:lessons-bulk", args=(self.course.id,))
+        lessons = [{"name": f"Lesson {n}", "video_link": f"https://youtu.be/{n}"} for n in range(60)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, {"lessons": lessons}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.json()), 60)
+        self.assertEqual(Lesson.objects.filter(course=self.course).count(), 61)
+        inserts = [query for query in queries.captured_queries if query["sql"].startswith('INSERT INTO "lms_lesson"')]
+        self.assertEqual(len(inserts), 1)
+
+    def test_lessons_bulk_create_errors(self) -> None:
+        """Тестирует, что при ошибке в одном уроке возвращаются ошибки по каждому и ничего не создается"""
+        self.course.owner = self.user
+        self.course.save()
+        url = reverse("lms:lessons-bulk", args=(self.course.id,))
+        lessons = [
+            {"name": "Ok", "video_link": "https://www.youtube.com/watch?v=1"},
+            {"name": "Bad", "video_link": "https://vimeo.com/1"},
+            {"video_link": "https://youtu.be/2"},
+        ]
+        response = self.client.post(url, {"lessons": lessons}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = response.json()["lessons"]
+        self.assertEqual(set(errors), {"1", "2"})
+        self.assertIn("non_field_errors", errors["1"])
+        self.assertIn("name", errors["2"])
+        self.assertEqual(Lesson.objects.count(), 1)
+
+    def test_lessons_bulk_create_forbidden(self) -> None:
+        """Тестирует, что создавать уроки пачкой может только владелец курса или модератор"""
+        url = reverse("lms:lessons-bulk", args=(self.course.id,))
+        response = self.client.post(url, {"lessons": [{"name": "A", "video_link": "https://youtu.be/1"}]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
 
 class SubscriptionTestCase(APITestCase):
     def setUp(self) -> None:
@@ -168,3 +400,314 @@ class SubscriptionTestCase(APITestCase):
         response = self.client.post(url, data)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(Subscription.objects.count(), 0)
+
+    def test_subscription_bulk(self) -> None:
+        """Тестирует массовую подписку и отписку"""
+        math = Course.objects.create(name="Math", owner=self.user)
+        music = Course.objects.create(name="Music", owner=self.user)
+        Subscription.objects.create(owner=self.user, course=music)
+        url = reverse("lms:subscriptions-bulk")
+        data = {"subscribe": [self.course.id, math.id, self.course.id], "unsubscribe": [music.id]}
+        response = self.client.post(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json(),
+            [
+                {"course_id": self.course.id, "is_subscribe": True},
+                {"course_id": math.id, "is_subscribe": True},
+                {"course_id": music.id, "is_subscribe": False},
+            ],
+        )
+        response = self.client.post(url, {"subscribe": [math.id]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Subscription.objects.filter(owner=self.user).count(), 2)
+
+    def test_subscription_export(self) -> None:
+        """Тестирует потоковую выгрузку подписок персоналом"""
+        Subscription.objects.create(owner=self.user, course=self.course)
+        url = reverse("lms:subscriptions-export")
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(url, {"course": self.course.id})
+        self.assertTrue(response.is_async)
+        lines = read_streaming_content(response).decode().splitlines()
+        self.assertEqual(lines[0], "id,owner_id,owner__email,course_id,course__name,active,created_at")
+        self.assertIn(f"{self.user.id},test@example.com,{self.course.id},English,True", lines[1])
+
+    def test_subscription_bulk_unknown_course(self) -> None:
+        """Тестирует ошибку при подписке на несуществующий курс"""
+        url = reverse("lms:subscriptions-bulk")
+        response = self.client.post(url, {"subscribe": [self.course.id + 1000]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Subscription.objects.count(), 0)
+
+
+class CourseUpdateMailingTestCase(APITestCase):
+    def setUp(self) -> None:
+        """Создает курс с подписчиками и включает синхронное выполнение задач."""
+        self.course = Course.objects.create(name="English")
+        for i in range(3):
+            user = User.objects.create(email=f"student{i}@example.com")
+            Subscription.objects.create(owner=user, course=self.course)
+        other_course = Course.objects.create(name="Math")
+        Subscription.objects.create(owner=User.objects.create(email="other@example.com"), course=other_course)
+        celery_app.conf.task_always_eager = True
+        self.addCleanup(setattr, celery_app.conf, "task_always_eager", False)
+
+    @patch("lms.tasks.EMAIL_CHUNK_SIZE", 2)
+    def test_send_info_about_updates(self) -> None:
+        """Тестирует рассылку подписчикам курса пачками"""
+        result = send_info_about_updates(self.course.id)
+        self.assertEqual(result, {"recipients": 3, "chunks": 2})
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            ["student0@example.com", "student1@example.com", "student2@example.com"],
+        )
+
+    def test_send_update_emails_chunk(self) -> None:
+        """Тестирует счетчики отправленных писем в пачке"""
+        result = send_update_emails_chunk.apply(args=(["a@example.com", "b@example.com"],)).get()
+        self.assertEqual(result, {"sent": 2, "failed": 0})
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_send_update_emails_chunk_retry_keeps_sent(self) -> None:
+        """Тестирует, что повтор пачки отправляет только неудачные письма и сохраняет счетчик отправленных"""
+        send_messages = locmem.EmailBackend.send_messages
+        failures = {"b@example.com"}
+
+        def flaky_send_messages(backend, messages):
+            if messages[0].to[0] in failures:
+                failures.discard(messages[0].to[0])
+                raise SMTPException("Temporary failure")
+            return send_messages(backend, messages)
+
+        with patch.object(locmem.EmailBackend, "send_messages", flaky_send_messages):
+            result = send_update_emails_chunk.apply(args=(["a@example.com", "b@example.com", "c@example.com"],))
+        self.assertEqual(result.get(), {"sent": 3, "failed": 0})
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox), ["a@example.com", "b@example.com", "c@example.com"]
+        )
+
+    def test_send_update_emails_chunk_connection_failed(self) -> None:
+        """Тестирует, что после исчерпания повторов неотправленные адреса учитываются как неудачные"""
+        with patch.object(locmem.EmailBackend, "open", side_effect=OSError("Connection refused")):
+            result = send_update_emails_chunk.apply(args=(["b@example.com", "c@example.com"],), kwargs={"sent": 1})
+        self.assertEqual(result.get(), {"sent": 1, "failed": 2})
+        self.assertEqual(mail.outbox, [])
+
+
+class CourseUpdateNotificationTestCase(APITestCase):
+    def setUp(self) -> None:
+        """Создает курс с уроком у пользователя."""
+        self.user = User.objects.create(email="author@example.com")
+        self.course = Course.objects.create(name="English", owner=self.user)
+        self.lesson = Lesson.objects.create(name="Alphabet", course=self.course, owner=self.user)
+        self.client.force_authenticate(user=self.user)
+
+    @patch("lms.tasks.send_info_about_updates.delay")
+    def test_updates_coalesced(self, delay_mock) -> None:
+        """Тестирует, что серия правок курса и уроков дает одно уведомление за окно"""
+        self.client.patch(reverse("lms:course-detail", args=(self.course.id,)), {"name": "Math"})
+        self.client.patch(reverse("lms:lesson-update", args=(self.lesson.id,)), {"name": "Numbers"})
+        self.client.patch(reverse("lms:lesson-update", args=(self.lesson.id,)), {"name": "Fractions"})
+        self.assertEqual(CourseUpdateMark.objects.filter(is_dirty=True).count(), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(send_pending_course_updates(), 1)
+        delay_mock.assert_called_once_with(self.course.id)
+
+        self.client.patch(reverse("lms:lesson-update", args=(self.lesson.id,)), {"name": "Decimals"})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(send_pending_course_updates(), 0)
+        self.assertEqual(delay_mock.call_count, 1)
+        self.assertTrue(CourseUpdateMark.objects.get(course=self.course).is_dirty)
+
+
+def read_streaming_content(response: StreamingHttpResponse) -> bytes:
+    """Дочитывает асинхронный потоковый ответ (так его отдает ASGI-воркер)."""
+
+    async def read() -> bytes:
+        return b"".join([chunk async for chunk in response.streaming_content])
+
+    return async_to_sync(read)()
+
+
+def make_image(name: str, size: Tuple[int, int] = (1200, 900)) -> SimpleUploadedFile:
+    """Создает PNG-изображение для загрузки."""
+    buffer = BytesIO()
+    Image.new("RGB", size, "red").save(buffer, "PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+
+class ImageRenditionsTestCase(APITestCase):
+    def setUp(self) -> None:
+        """Включает синхронное выполнение задач и временный каталог для медиа."""
+        celery_app.conf.task_always_eager = True
+        self.addCleanup(setattr, celery_app.conf, "task_always_eager", False)
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=media.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.user = User.objects.create(email="test@example.com")
+        self.client.force_authenticate(user=self.user)
+
+    def test_course_preview_renditions(self) -> None:
+        """Тестирует генерацию копий превью курса после загрузки и вывод их ссылок в списке"""
+        with self.captureOnCommitCallbacks(execute=True):
+            course = Course.objects.create(name="English", owner=self.user, preview=make_image("cover.png"))
+        course.refresh_from_db()
+        self.assertEqual(set(course.preview_renditions), {"small", "medium"})
+        small = course.preview_renditions["small"]
+        self.assertEqual(small["webp"], "course_preview/renditions/cover_small.webp")
+        with default_storage.open(small["jpeg"]) as file, Image.open(file) as image:
+            self.assertEqual(image.size, (320, 180))
+            self.assertEqual(image.format, "JPEG")
+        item = self.client.get(reverse("lms:course-list")).json()["results"][0]
+        self.assertEqual(
+            item["preview_renditions"]["medium"]["webp"],
+            "http://testserver/media/course_preview/renditions/cover_medium.webp",
+        )
+
+    def test_renditions_not_regenerated_without_upload(self) -> None:
+        """Тестирует, что сохранение без новой загрузки не запускает генерацию, а очистка превью сбрасывает копии"""
+        with self.captureOnCommitCallbacks(execute=True):
+            course = Course.objects.create(name="English", preview=make_image("cover.png"))
+        course.refresh_from_db()
+        with patch("lms.signals.generate_image_renditions.delay") as delay_mock:
+            with self.captureOnCommitCallbacks(execute=True):
+                course.name = "Math"
+                course.save()
+        delay_mock.assert_not_called()
+        course.preview = None
+        course.save()
+        course.refresh_from_db()
+        self.assertEqual(course.preview_renditions, {})
+
+    def test_backfill_renditions(self) -> None:
+        """Тестирует генерацию копий для уже загруженных изображений командой"""
+        name = default_storage.save("lesson_preview/old.png", make_image("old.png"))
+        course = Course.objects.create(name="English")
+        lesson = Lesson.objects.create(name="Alphabet", course=course, owner=self.user)
+        Lesson.objects.filter(pk=lesson.pk).update(preview=name)
+        out = StringIO()
+        call_command("backfill_renditions", "--workers", "1", stdout=out)
+        self.assertIn("Rendered 1 of 1 images", out.getvalue())
+        lesson.refresh_from_db()
+        self.assertEqual(lesson.preview_renditions["small"]["jpeg"], "lesson_preview/renditions/old_small.jpeg")
+        out = StringIO()
+        call_command("backfill_renditions", "--workers", "1", stdout=out)
+        self.assertIn("Rendered 0 of 0 images", out.getvalue())
+
+
+class SearchTestCase(APITestCase):
+    def setUp(self) -> None:
+        """Создает курсы и уроки для поиска."""
+        self.user = User.objects.create(email="test@example.com")
+        self.client.force_authenticate(user=self.user)
+        self.english = Course.objects.create(name="Английский язык", description="Грамматика и разговорная практика")
+        self.math = Course.objects.create(name="Математика", description="Задачи из английских олимпиад")
+        self.history = Course.objects.create(name="История", description="Древний мир")
+
+    def test_course_search_ranked(self) -> None:
+        """Тестирует поиск курсов с учетом морфологии: совпадение в названии выше совпадения в описании"""
+        response = self.client.get(reverse("lms:search-courses"), {"q": "английскому"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.json()["results"]
+        self.assertEqual([item["id"] for item in results], [self.english.id, self.math.id])
+        self.assertGreater(results[0]["rank"], results[1]["rank"])
+
+    def test_course_search_cursor(self) -> None:
+        """Тестирует курсорную пагинацию результатов поиска"""
+        courses = [Course.objects.create(name=f"Физика {n}") for n in range(7)]
+        response = self.client.get(reverse("lms:search-courses"), {"q": "физика", "page_size": 5})
+        data = response.json()
+        ids = [item["id"] for item in data["results"]]
+        ids += [item["id"] for item in self.client.get(data["next"]).json()["results"]]
+        self.assertEqual(sorted(ids), [course.id for course in courses])
+
+    def test_lesson_search(self) -> None:
+        """Тестирует поиск уроков, включая уроки, измененные после создания"""
+        lesson = Lesson.objects.create(name="Времена глаголов", course=self.english, owner=self.user)
+        Lesson.objects.filter(pk=lesson.pk).update(description="Past Simple и Present Perfect")
+        response = self.client.get(reverse("lms:search-lessons"), {"q": "perfect"})
+        self.assertEqual(
+            [(item["id"], item["course"]) for item in response.json()["results"]], [(lesson.id, self.english.id)]
+        )
+
+    def test_search_requires_query(self) -> None:
+        """Тестирует ошибку при пустом запросе"""
+        response = self.client.get(reverse("lms:search-courses"))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AsyncCatalogTestCase(APITestCase):
+    def setUp(self) -> None:
+        """Создает курсы с уроками и аутентифицирует владельца по access-токену."""
+        cache.clear()
+        self.user = User.objects.create(email="async@example.com")
+        self.course = Course.objects.create(name="English", owner=self.user)
+        self.lesson = Lesson.objects.create(name="Alphabet", course=self.course, owner=self.user)
+        for i in range(6):
+            Course.objects.create(name=f"Course {i}", owner=self.user)
+        Subscription.objects.create(owner=self.user, course=self.course)
+        token = RoleTokenObtainPairSerializer.get_token(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_async_views_are_coroutines(self) -> None:
+        """Тестирует, что асинхронные эндпоинты выполняются Django как корутины."""
+        urls = [
+            reverse("lms:course-list-async"),
+            reverse("lms:course-detail-async", args=(self.course.id,)),
+            reverse("lms:lesson-retrieve-async", args=(self.lesson.id,)),
+        ]
+        for url in urls:
+            self.assertTrue(iscoroutinefunction(resolve(url).func), url)
+
+    def test_async_course_list_matches_sync(self) -> None:
+        """Тестирует, что асинхронный список курсов совпадает с синхронным."""
+        for params in ({}, {"page": 2}, {"expand": "lessons"}, {"fields": "id,is_subscribe"}):
+            response = self.client.get(reverse("lms:course-list-async"), params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            data = response.json()
+            expected = self.client.get(reverse("lms:course-list"), params).json()
+            self.assertEqual(data["count"], expected["count"])
+            self.assertEqual(data["results"], expected["results"])
+        data = self.client.get(reverse("lms:course-list-async")).json()
+        self.assertTrue(data["results"][0]["is_subscribe"])
+        self.assertEqual(data["next"], "http://testserver" + reverse("lms:course-list-async") + "?page=2")
+
+    def test_async_course_list_errors(self) -> None:
+        """Тестирует ошибки асинхронного списка курсов."""
+        response = self.client.get(reverse("lms:course-list-async"), {"page": 5})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(reverse("lms:course-list-async"), {"fields": "id,unknown"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.client.credentials()
+        response = self.client.get(reverse("lms:course-list-async"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_async_course_retrieve(self) -> None:
+        """Тестирует асинхронные детали курса, ответ 304 и проверку прав."""
+        url = reverse("lms:course-detail-async", args=(self.course.id,))
+        response = self.client.get(url, {"expand": "lessons"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        sync_url = reverse("lms:course-detail", args=(self.course.id,))
+        self.assertEqual(response.json(), self.client.get(sync_url, {"expand": "lessons"}).json())
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        other = Course.objects.create(name="Other", owner=User.objects.create(email="other@example.com"))
+        response = self.client.get(reverse("lms:course-detail-async", args=(other.id,)))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get(reverse("lms:course-detail-async", args=(other.id + 1,)))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_async_lesson_retrieve(self) -> None:
+        """Тестирует асинхронные детали урока одним запросом к базе."""
+        url = reverse("lms:lesson-retrieve-async", args=(self.lesson.id,))
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {"fields": "id,name"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {"id": self.lesson.id, "name": "Alphabet"})
+        self.assertIn("ETag", response)
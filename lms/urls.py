@@ -2,8 +2,11 @@ from django.urls import path
 from rest_framework.routers import SimpleRouter
 
 from lms.apps import LmsConfig
-from lms.views import (CourseViewSet, LessonCreateApiView, LessonDestroyApiView, LessonListApiView,
-                       LessonRetrieveApiView, LessonUpdateApiView, SubscriptionCreateApiView)
+from lms.views import (CourseLessonListApiView, CourseListAsyncApiView, CourseRetrieveAsyncApiView,
+                       CourseSearchApiView, CourseViewSet, LessonBulkCreateApiView, LessonCreateApiView,
+                       LessonDestroyApiView, LessonListApiView, LessonRetrieveApiView, LessonRetrieveAsyncApiView,
+                       LessonSearchApiView, LessonUpdateApiView, SubscriptionBulkApiView, SubscriptionCreateApiView,
+                       SubscriptionExportApiView)
 
 app_name = LmsConfig.name
 
@@ -11,12 +14,21 @@ router = SimpleRouter()
 router.register("", CourseViewSet)
 
 urlpatterns = [
+    path("async/", CourseListAsyncApiView.as_view(), name="course-list-async"),
+    path("async/<int:pk>/", CourseRetrieveAsyncApiView.as_view(), name="course-detail-async"),
     path("lesson/create/", LessonCreateApiView.as_view(), name="lesson-create"),
     path("lesson/list/", LessonListApiView.as_view(), name="lesson-list"),
     path("lesson/<int:pk>/", LessonRetrieveApiView.as_view(), name="lesson-retrieve"),
+    path("lesson/<int:pk>/async/", LessonRetrieveAsyncApiView.as_view(), name="lesson-retrieve-async"),
     path("lesson/<int:pk>/update", LessonUpdateApiView.as_view(), name="lesson-update"),
     path("lesson/<int:pk>/delete", LessonDestroyApiView.as_view(), name="lesson-delete"),
+    path("<int:pk>/lessons/", CourseLessonListApiView.as_view(), name="course-lessons"),
+    path("<int:pk>/lessons/bulk/", LessonBulkCreateApiView.as_view(), name="lessons-bulk"),
+    path("search/courses/", CourseSearchApiView.as_view(), name="search-courses"),
+    path("search/lessons/", LessonSearchApiView.as_view(), name="search-lessons"),
     path("subscriptions/", SubscriptionCreateApiView.as_view(), name="subscriptions"),
+    path("subscriptions/bulk/", SubscriptionBulkApiView.as_view(), name="subscriptions-bulk"),
+    path("subscriptions/export/", SubscriptionExportApiView.as_view(), name="subscriptions-export"),
 ]
 
 urlpatterns += router.urls
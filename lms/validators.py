@@ -2,6 +2,8 @@ import re
 
 from rest_framework.serializers import ValidationError
 
+YOUTUBE_LINK = re.compile(r"^(https?://)?(www\.)?(youtube\.com|youtu\.be)/")
+
 
 class LinkValidator:
 
@@ -9,7 +11,6 @@ class LinkValidator:
         self.field = field
 
     def __call__(self, value):
-        reg = re.compile(r"^(https?://)?(www\.)?(youtube\.com|youtu\.be)/")
-        link = dict(value).get(self.field)
-        if link and not re.match(reg, link):
+        link = value.get(self.field)
+        if link and not YOUTUBE_LINK.match(link):
             raise ValidationError("Разрешены только ссылки на YouTube")
@@ -1,29 +1,93 @@
-from datetime import timedelta
-from typing import List, Type
+from typing import Any, Dict, List, Type
 
-from django.utils.timezone import now
+from asgiref.sync import sync_to_async
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import transaction
+from django.db.models import Exists, F, FloatField, OuterRef, QuerySet, Value
+from django.db.models.functions import Cast
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django_filters.rest_framework import DjangoFilterBackend
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, extend_schema_view
 from rest_framework import generics, permissions, status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.serializers import Serializer
 from rest_framework.viewsets import ModelViewSet
 
-from lms.models import Course, Lesson, Subscription
-from lms.paginators import CustomPagination
-from lms.serializers import CourseDetailSerializer, CourseSerializer, LessonSerializer, SubscriptionSerializer
-from lms.tasks import send_info_about_updates
+from lms.images import absolutize_renditions
+from lms.mixins import AsyncConditionalRetrieveMixin, AsyncViewMixin, ConditionalRetrieveMixin, SparseFieldsMixin
+from lms.models import SEARCH_CONFIG, Course, Lesson, Subscription
+from lms.paginators import (AsyncCustomPagination, CourseCursorPagination, CustomCursorPagination, CustomPagination,
+                            PaginationModeMixin, SearchCursorPagination)
+from lms.serializers import (CourseDetailSerializer, CourseSearchSerializer, CourseSerializer,
+                             LessonBulkCreateSerializer, LessonSearchSerializer, LessonSerializer,
+                             SearchQuerySerializer, SubscriptionBulkSerializer, SubscriptionSerializer,
+                             SubscriptionStateSerializer)
+from lms.services import get_course_payloads, mark_course_updated
+from lms.signals import touch_course
+from users.exports import SUBSCRIPTION_EXPORT_FIELDS, export_response, get_export_format
 from users.permissions import IsModer, IsOwner
+from users.roles import is_moderator
+
+
+class CourseCatalogMixin:
+    """Чтение каталога курсов, общее для синхронных и асинхронных представлений."""
+
+    queryset = Course.objects.all().order_by("id")
+    expandable_fields = ("lessons",)
+
+    def annotate_is_subscribe(self, queryset: QuerySet) -> QuerySet:
+        """Помечает подписки пользователя в том же запросе, если они запрошены."""
+        fields = self.get_sparse_fields()
+        if fields is not None and "is_subscribe" not in fields:
+            return queryset
+        user = self.request.user
+        if user.is_authenticated:
+            is_subscribe = Exists(Subscription.objects.filter(owner_id=user.pk, course=OuterRef("pk")))
+        else:
+            is_subscribe = Value(False)
+        return queryset.annotate(is_subscribe=is_subscribe)
+
+    def get_list_data(self, courses: List[Course]) -> List[Dict[str, Any]]:
+        """Отдает курсы из кэша и добавляет к ним подписку текущего пользователя."""
+        fields = self.get_sparse_fields()
+        data = get_course_payloads(courses, CourseSerializer, "list", fields, self.get_expand())
+        for item, course in zip(data, courses):
+            self.absolutize_urls(item)
+            if fields is None or "is_subscribe" in fields:
+                item["is_subscribe"] = course.is_subscribe
+        return data
+
+    def absolutize_urls(self, item: Dict[str, Any]) -> None:
+        """Делает ссылки на изображения в закэшированных данных курса абсолютными."""
+        if item.get("preview"):
+            item["preview"] = self.request.build_absolute_uri(item["preview"])
+        for entry in [item, *item.get("lessons", ())]:
+            if entry.get("preview_renditions"):
+                entry["preview_renditions"] = absolutize_renditions(entry["preview_renditions"], self.request)
+
+    def get_retrieve_data(self, instance: Course) -> Dict[str, Any]:
+        """Отдает детали курса из кэша."""
+        data = get_course_payloads(
+            [instance], CourseDetailSerializer, "detail", self.get_sparse_fields(), self.get_expand()
+        )[0]
+        self.absolutize_urls(data)
+        return data
 
 
 @extend_schema_view(
     list=extend_schema(
         summary="Список курсов",
-        description="Возвращает список всех курсов с пагинацией.",
+        description="Возвращает список всех курсов с пагинацией. С параметром pagination=cursor — курсорная пагинация. "
+        "Параметр fields выбирает поля, expand=lessons добавляет уроки.",
     ),
     retrieve=extend_schema(
         summary="Детали курса",
-        description="Возвращает детальную информацию о курсе по ID.",
+        description="Возвращает детальную информацию о курсе по ID. Поддерживает ETag/Last-Modified. "
+        "Параметр fields выбирает поля, expand=lessons добавляет уроки.",
         responses=CourseDetailSerializer,
     ),
     create=extend_schema(
@@ -50,9 +114,27 @@ from users.permissions import IsModer, IsOwner
         responses=None,
     ),
 )
-class CourseViewSet(ModelViewSet):
-    queryset = Course.objects.all().order_by("id")
+class CourseViewSet(
+    CourseCatalogMixin, PaginationModeMixin, ConditionalRetrieveMixin, SparseFieldsMixin, ModelViewSet
+):
     pagination_class = CustomPagination
+    cursor_pagination_class = CourseCursorPagination
+
+    def get_queryset(self) -> QuerySet:
+        """Для списка помечает подписки пользователя в том же запросе."""
+        queryset = super().get_queryset()
+        if self.action != "list":
+            return queryset
+        return self.annotate_is_subscribe(queryset)
+
+    def list(self, request: Request, *args, **kwargs) -> Response:
+        """Отдает курсы из кэша и добавляет к ним подписку текущего пользователя."""
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        data = self.get_list_data(list(page if page is not None else queryset))
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
 
     def get_serializer_class(self) -> Type[Serializer]:
         """Получает сериализатор для текущего действия."""
@@ -62,9 +144,8 @@ class CourseViewSet(ModelViewSet):
 
     def get_permissions(self) -> List[permissions.BasePermission]:
         """Получает права доступа для эндпоинтов."""
-        user = self.request.user
         if self.action == "create":
-            if user.groups.filter(name="Модераторы").exists():
+            if is_moderator(self.request.user):
                 self.permission_classes = []
             else:
                 self.permission_classes = [IsAuthenticated]
@@ -79,17 +160,55 @@ class CourseViewSet(ModelViewSet):
     def perform_create(self, serializer: Serializer) -> None:
         """Привязывает курс к пользователю."""
         course = serializer.save()
-        course.owner = self.request.user
+        course.owner_id = self.request.user.pk
         course.save()
 
     def perform_update(self, serializer: Serializer) -> None:
-        """Проверяет обновления курса и отправляет письмо при наличии обновлений"""
-        course = self.get_object()
-        last_update = course.updated_at
-        serializer.save()
+        """Сохраняет курс и отмечает его для рассылки уведомления об обновлении"""
+        course = serializer.save()
+        mark_course_updated(course.id)
+
+
+@extend_schema(
+    summary="Список курсов (асинхронный)",
+    description="Асинхронный вариант списка курсов для ASGI-воркера: постраничная пагинация, "
+    "параметр fields выбирает поля, expand=lessons добавляет уроки.",
+    responses=CourseSerializer(many=True),
+)
+class CourseListAsyncApiView(CourseCatalogMixin, AsyncViewMixin, SparseFieldsMixin, generics.GenericAPIView):
+    serializer_class = CourseSerializer
+    pagination_class = AsyncCustomPagination
+
+    def get_queryset(self) -> QuerySet:
+        """Помечает подписки пользователя в том же запросе."""
+        return self.annotate_is_subscribe(super().get_queryset())
 
-        if last_update and now() - last_update >= timedelta(hours=4):
-            send_info_about_updates.delay(course.id)
+    async def get(self, request: Request, *args, **kwargs) -> Response:
+        """Читает страницу курсов асинхронным ORM, а их данные берет из кэша."""
+        queryset = self.filter_queryset(self.get_queryset())
+        page = await self.paginator.apaginate_queryset(queryset, request, view=self)
+        courses = page if page is not None else [course async for course in queryset]
+        data = await sync_to_async(self.get_list_data)(courses)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+
+@extend_schema(
+    summary="Детали курса (асинхронный)",
+    description="Асинхронный вариант деталей курса для ASGI-воркера. Поддерживает ETag/Last-Modified. "
+    "Параметр fields выбирает поля, expand=lessons добавляет уроки.",
+    responses=CourseDetailSerializer,
+)
+class CourseRetrieveAsyncApiView(
+    CourseCatalogMixin, AsyncViewMixin, AsyncConditionalRetrieveMixin, SparseFieldsMixin, generics.GenericAPIView
+):
+    serializer_class = CourseDetailSerializer
+    permission_classes = [IsModer | IsOwner]
+
+    async def aget_retrieve_data(self, instance: Course) -> Dict[str, Any]:
+        """Берет детали курса из кэша, сериализуя промахи в отдельном потоке."""
+        return await sync_to_async(self.get_retrieve_data)(instance)
 
 
 @extend_schema(
@@ -104,8 +223,7 @@ class LessonCreateApiView(generics.CreateAPIView):
 
     def get_permissions(self) -> List[permissions.BasePermission]:
         """Получает права доступа для эндпоинтов."""
-        user = self.request.user
-        if user.groups.filter(name="Модераторы").exists():
+        if is_moderator(self.request.user):
             self.permission_classes = []
         else:
             self.permission_classes = [IsAuthenticated]
@@ -113,27 +231,87 @@ class LessonCreateApiView(generics.CreateAPIView):
 
     def perform_create(self, serializer) -> None:
         """Привязывает урок к пользователю"""
-        serializer.save(owner=self.request.user)
+        serializer.save(owner_id=self.request.user.pk)
+
+
+@extend_schema(
+    summary="Массовое создание уроков",
+    description="Создает уроки курса одним запросом в одной транзакции. Только владелец курса или модератор. "
+    "При ошибках возвращает их по каждому уроку и ничего не создает.",
+    request=LessonBulkCreateSerializer,
+    responses={201: LessonSerializer(many=True)},
+)
+class LessonBulkCreateApiView(generics.GenericAPIView):
+    queryset = Course.objects.only("id", "owner")
+    serializer_class = LessonBulkCreateSerializer
+    permission_classes = [IsModer | IsOwner]
+
+    def post(self, request, *args, **kwargs) -> Response:
+        """Проверяет все уроки и создает их одним bulk_create"""
+        course = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            lessons = Lesson.objects.bulk_create(
+                [
+                    Lesson(course=course, owner_id=request.user.pk, **item)
+                    for item in serializer.validated_data["lessons"]
+                ]
+            )
+            touch_course(course.id)
+        return Response(LessonSerializer(lessons, many=True).data, status=status.HTTP_201_CREATED)
 
 
 @extend_schema(
     summary="Список уроков",
-    description="Возвращает список всех уроков с пагинацией.",
+    description="Возвращает список всех уроков с пагинацией. С параметром pagination=cursor — курсорная пагинация. "
+    "Параметр fields выбирает поля.",
     responses=LessonSerializer(many=True),
 )
-class LessonListApiView(generics.ListAPIView):
+class LessonListApiView(PaginationModeMixin, SparseFieldsMixin, generics.ListAPIView):
     queryset = Lesson.objects.all().order_by("id")
     serializer_class = LessonSerializer
     permission_classes = [IsAuthenticated]
     pagination_class = CustomPagination
 
 
+@extend_schema(
+    summary="Список уроков курса",
+    description="Возвращает уроки одного курса с курсорной пагинацией. Параметр fields выбирает поля.",
+    responses=LessonSerializer(many=True),
+)
+class CourseLessonListApiView(SparseFieldsMixin, generics.ListAPIView):
+    queryset = Lesson.objects.all()
+    serializer_class = LessonSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = CustomCursorPagination
+
+    def get_queryset(self) -> QuerySet:
+        """Получает уроки курса из URL."""
+        return super().get_queryset().filter(course_id=self.kwargs["pk"])
+
+
 @extend_schema(
     summary="Детали урока",
-    description="Возвращает детальную информацию об уроке по ID.",
+    description="Возвращает детальную информацию об уроке по ID. Поддерживает ETag/Last-Modified. "
+    "Параметр fields выбирает поля.",
     responses=LessonSerializer,
 )
-class LessonRetrieveApiView(generics.RetrieveAPIView):
+class LessonRetrieveApiView(ConditionalRetrieveMixin, SparseFieldsMixin, generics.RetrieveAPIView):
+    queryset = Lesson.objects.all()
+    serializer_class = LessonSerializer
+    permission_classes = [IsOwner | IsModer]
+
+
+@extend_schema(
+    summary="Детали урока (асинхронный)",
+    description="Асинхронный вариант деталей урока для ASGI-воркера. Поддерживает ETag/Last-Modified. "
+    "Параметр fields выбирает поля.",
+    responses=LessonSerializer,
+)
+class LessonRetrieveAsyncApiView(
+    AsyncViewMixin, AsyncConditionalRetrieveMixin, SparseFieldsMixin, generics.GenericAPIView
+):
     queryset = Lesson.objects.all()
     serializer_class = LessonSerializer
     permission_classes = [IsOwner | IsModer]
@@ -151,16 +329,9 @@ class LessonUpdateApiView(generics.UpdateAPIView):
     permission_classes = [IsOwner | IsModer]
 
     def perform_update(self, serializer: Serializer) -> None:
-        """Проверяет обновления уроков в курсе и отправляет уведомление при наличии"""
-        lesson = self.get_object()
-        course = lesson.course
-
-        last_update = course.updated_at
-
-        serializer.save()
-
-        if last_update and now() - last_update >= timedelta(hours=4):
-            send_info_about_updates.delay(course.id)
+        """Сохраняет урок и отмечает курс для рассылки уведомления об обновлении"""
+        lesson = serializer.save()
+        mark_course_updated(lesson.course_id)
 
 
 @extend_schema(
@@ -174,8 +345,7 @@ class LessonDestroyApiView(generics.DestroyAPIView):
 
     def get_permissions(self) -> List[permissions.BasePermission]:
         """Получает права доступа для эндпоинтов."""
-        user = self.request.user
-        if user.groups.filter(name="Модераторы").exists():
+        if is_moderator(self.request.user):
             self.permission_classes = []
         else:
             self.permission_classes = [IsOwner]
@@ -196,13 +366,103 @@ class SubscriptionCreateApiView(generics.CreateAPIView):
         """Удаляет и создает подписку на курс у пользователя"""
         user = request.user
         course_id = request.data.get("course_id")
-        course_item = Course.objects.get(id=course_id)
-        subs_item = Subscription.objects.filter(course=course_item, owner=user)
-        if subs_item.exists():
-            subs_item.delete()
+        deleted, _ = Subscription.objects.filter(course_id=course_id, owner_id=user.pk).delete()
+        if deleted:
             message = "Подписка удалена"
             return Response({"message": message}, status=status.HTTP_200_OK)
-        else:
-            Subscription.objects.create(owner=user, course=course_item)
-            message = "Подписка добавлена"
-            return Response({"message": message}, status=status.HTTP_201_CREATED)
+        course_item = get_object_or_404(Course, id=course_id)
+        Subscription.objects.bulk_create([Subscription(owner_id=user.pk, course=course_item)], ignore_conflicts=True)
+        message = "Подписка добавлена"
+        return Response({"message": message}, status=status.HTTP_201_CREATED)
+
+
+@extend_schema(
+    summary="Массовая подписка/отписка",
+    description="Подписывает на курсы из subscribe и отписывает от курсов из unsubscribe в одной транзакции. "
+    "Возвращает итоговое состояние подписок по переданным курсам.",
+    request=SubscriptionBulkSerializer,
+    responses=SubscriptionStateSerializer(many=True),
+)
+class SubscriptionBulkApiView(generics.GenericAPIView):
+    permission_classes = (IsAuthenticated,)
+    serializer_class = SubscriptionBulkSerializer
+
+    def post(self, request, *args, **kwargs) -> Response:
+        """Создает и удаляет подписки пользователя пачкой"""
+        user = request.user
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        subscribe = serializer.validated_data["subscribe"]
+        unsubscribe = serializer.validated_data["unsubscribe"]
+        with transaction.atomic():
+            if unsubscribe:
+                Subscription.objects.filter(owner_id=user.pk, course_id__in=unsubscribe).delete()
+            if subscribe:
+                Subscription.objects.bulk_create(
+                    [Subscription(owner_id=user.pk, course_id=course_id) for course_id in subscribe],
+                    ignore_conflicts=True,
+                )
+        course_ids = sorted(subscribe + unsubscribe)
+        subscribed = set(
+            Subscription.objects.filter(owner_id=user.pk, course_id__in=course_ids).values_list("course_id", flat=True)
+        )
+        state = [{"course_id": course_id, "is_subscribe": course_id in subscribed} for course_id in course_ids]
+        return Response(SubscriptionStateSerializer(state, many=True).data, status=status.HTTP_200_OK)
+
+
+@extend_schema(
+    summary="Выгрузка подписок",
+    description="Потоково выгружает подписки в CSV или NDJSON (export_format=csv|ndjson). "
+    "Фильтры: course, owner. Только для персонала.",
+    responses={(200, "text/csv"): OpenApiTypes.STR, (200, "application/x-ndjson"): OpenApiTypes.STR},
+)
+class SubscriptionExportApiView(generics.GenericAPIView):
+    queryset = Subscription.objects.order_by("id")
+    permission_classes = [IsAdminUser]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ("course", "owner", "active")
+
+    def get(self, request: Request, *args, **kwargs) -> StreamingHttpResponse:
+        """Выгружает отфильтрованные подписки."""
+        export_format = get_export_format(request.query_params.get("export_format", "csv"))
+        queryset = self.filter_queryset(self.get_queryset())
+        return export_response(queryset, SUBSCRIPTION_EXPORT_FIELDS, export_format, "subscriptions")
+
+
+class SearchApiView(generics.ListAPIView):
+    """Полнотекстовый поиск по названию и описанию с сортировкой по релевантности."""
+
+    permission_classes = [IsAuthenticated]
+    pagination_class = SearchCursorPagination
+
+    def get_queryset(self) -> QuerySet:
+        """Находит объекты по индексу поискового вектора и считает их релевантность."""
+        params = SearchQuerySerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        query = SearchQuery(params.validated_data["q"], config=SEARCH_CONFIG, search_type="websearch")
+        rank = Cast(SearchRank(F("search_vector"), query), FloatField())
+        return super().get_queryset().filter(search_vector=query).annotate(rank=rank)
+
+
+@extend_schema(
+    summary="Поиск курсов",
+    description="Ищет курсы по названию и описанию. Результаты отсортированы по релевантности, "
+    "пагинация курсорная.",
+    parameters=[SearchQuerySerializer],
+    responses=CourseSearchSerializer(many=True),
+)
+class CourseSearchApiView(SearchApiView):
+    queryset = Course.objects.only("id", "name", "description")
+    serializer_class = CourseSearchSerializer
+
+
+@extend_schema(
+    summary="Поиск уроков",
+    description="Ищет уроки по названию и описанию. Результаты отсортированы по релевантности, "
+    "пагинация курсорная.",
+    parameters=[SearchQuerySerializer],
+    responses=LessonSearchSerializer(many=True),
+)
+class LessonSearchApiView(SearchApiView):
+    queryset = Lesson.objects.only("id", "name", "description", "course")
+    serializer_class = LessonSearchSerializer
@@ -0,0 +1,9 @@
+import statistics
+from typing import List
+
+
+def percentile(values: List[float], percent: int) -> float:
+    """Возвращает перцентиль задержек."""
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100)[percent - 1]
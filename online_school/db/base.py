@@ -0,0 +1,80 @@
+import os
+import threading
+import time
+from typing import Any, Dict
+
+from django.db.backends.postgresql import base
+
+
+class ConnectionStats:
+    """Счетчики получения соединений с базой данных в одном процессе."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = 0.0
+
+    def add(self, elapsed_ms: float) -> None:
+        """Учитывает одно полученное соединение."""
+        with self.lock:
+            self.checkouts += 1
+            self.total_ms += elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+            self.last_ms = elapsed_ms
+
+    def add_error(self) -> None:
+        """Учитывает неудачную попытку получить соединение."""
+        with self.lock:
+            self.errors += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Возвращает согласованную копию счетчиков."""
+        with self.lock:
+            return {
+                "checkouts": self.checkouts,
+                "errors": self.errors,
+                "total_ms": round(self.total_ms, 3),
+                "avg_ms": round(self.total_ms / self.checkouts, 3) if self.checkouts else 0.0,
+                "max_ms": round(self.max_ms, 3),
+                "last_ms": round(self.last_ms, 3),
+            }
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """Бэкенд PostgreSQL, замеряющий время получения соединения из пула или установки нового."""
+
+    _connection_stats: Dict[str, ConnectionStats] = {}
+    _stats_lock = threading.Lock()
+
+    @property
+    def connection_stats(self) -> ConnectionStats:
+        """Возвращает счетчики соединений процесса для алиаса базы данных."""
+        stats = self._connection_stats.get(self.alias)
+        if stats is None:
+            with self._stats_lock:
+                stats = self._connection_stats.setdefault(self.alias, ConnectionStats())
+        return stats
+
+    def get_new_connection(self, conn_params: Dict[str, Any]) -> Any:
+        """Получает соединение и учитывает задержку его получения."""
+        started = time.perf_counter()
+        try:
+            connection = super().get_new_connection(conn_params)
+        except Exception:
+            self.connection_stats.add_error()
+            raise
+        self.connection_stats.add((time.perf_counter() - started) * 1000)
+        return connection
+
+
+def reset_connection_stats() -> None:
+    """Сбрасывает счетчики соединений процесса."""
+    DatabaseWrapper._connection_stats = {}
+    DatabaseWrapper._stats_lock = threading.Lock()
+
+
+# Дочерние процессы (prefork Celery, gunicorn) считают соединения заново, а не наследуют счетчики родителя.
+os.register_at_fork(after_in_child=reset_connection_stats)
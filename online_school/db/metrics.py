@@ -0,0 +1,52 @@
+import os
+from typing import Any, Dict
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+def get_pool_metrics(pool: Any) -> Dict[str, Any]:
+    """Возвращает размер пула, очередь ожидания и время ожидания соединения."""
+    stats = pool.get_stats()
+    requests = stats.get("requests_num", 0)
+    connections_opened = stats.get("connections_num", 0)
+    return {
+        "min_size": stats.get("pool_min", pool.min_size),
+        "max_size": stats.get("pool_max", pool.max_size),
+        "size": stats.get("pool_size", 0),
+        "available": stats.get("pool_available", 0),
+        "waiting": stats.get("requests_waiting", 0),
+        "requests": requests,
+        "requests_queued": stats.get("requests_queued", 0),
+        "wait_ms": stats.get("requests_wait_ms", 0),
+        "avg_wait_ms": round(stats.get("requests_wait_ms", 0) / requests, 3) if requests else 0.0,
+        "timeouts": stats.get("requests_errors", 0),
+        "connections_opened": connections_opened,
+        "connections_lost": stats.get("connections_lost", 0),
+        "connection_errors": stats.get("connections_errors", 0),
+        "connection_setup_ms": stats.get("connections_ms", 0),
+        "avg_connection_setup_ms": (
+            round(stats.get("connections_ms", 0) / connections_opened, 3) if connections_opened else 0.0
+        ),
+        "returns_bad": stats.get("returns_bad", 0),
+    }
+
+
+def get_connection_metrics(alias: str = DEFAULT_DB_ALIAS) -> Dict[str, Any]:
+    """Возвращает метрики соединений с базой данных для текущего процесса-воркера."""
+    connection = connections[alias]
+    pool = getattr(connection, "pool", None)
+    if pool is not None:
+        mode = "pool"
+    elif connection.settings_dict["CONN_MAX_AGE"] != 0:
+        mode = "persistent"
+    else:
+        mode = "per_request"
+    connection_stats = getattr(connection, "connection_stats", None)
+    return {
+        "pid": os.getpid(),
+        "alias": alias,
+        "mode": mode,
+        "health_checks": connection.settings_dict["CONN_HEALTH_CHECKS"],
+        "checkout": connection_stats.snapshot() if connection_stats is not None else None,
+        "pool": get_pool_metrics(pool) if pool is not None else None,
+    }
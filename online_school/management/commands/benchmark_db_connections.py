@@ -0,0 +1,105 @@
+import copy
+import statistics
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import load_backend
+
+from online_school.benchmarks import percentile
+from online_school.db.metrics import get_pool_metrics
+
+MODES = ("per_request", "persistent", "pool")
+
+
+class Command(BaseCommand):
+    help = "Load-test database connection setup: a new connection per request, persistent connections and the pool"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--threads", type=int, default=8, help="Concurrent workers, one connection wrapper each")
+        parser.add_argument("--duration", type=float, default=5.0, help="Seconds per mode")
+        parser.add_argument("--pool-size", type=int, help="Pool size (defaults to the number of threads)")
+        parser.add_argument("--mode", choices=MODES + ("all",), default="all")
+        parser.add_argument("--query", default="SELECT 1", help="Statement executed in every request")
+
+    def handle(self, *args, **options) -> None:
+        modes = MODES if options["mode"] == "all" else (options["mode"],)
+        self.stdout.write(
+            f"{'mode':<14}{'requests':>10}{'req/s':>10}{'connects':>10}"
+            f"{'checkout avg, ms':>18}{'checkout p95, ms':>18}{'request p50, ms':>17}"
+        )
+        for mode in modes:
+            settings_dict = self.get_settings(mode, options["pool_size"] or options["threads"])
+            alias = f"benchmark_{mode}"
+            wrapper_class = load_backend(settings_dict["ENGINE"]).DatabaseWrapper
+            try:
+                checkouts, requests, elapsed = self.run_load(
+                    wrapper_class, settings_dict, alias, options["threads"], options["duration"], options["query"]
+                )
+                connects = self.count_connects(wrapper_class, settings_dict, alias, len(checkouts))
+            finally:
+                self.close_pool(wrapper_class, settings_dict, alias)
+            self.stdout.write(
+                f"{mode:<14}{len(requests):>10}{len(requests) / elapsed:>10.0f}{connects:>10}"
+                f"{statistics.fmean(checkouts) if checkouts else 0.0:>18.3f}{percentile(checkouts, 95):>18.3f}"
+                f"{percentile(requests, 50):>17.3f}"
+            )
+
+    def get_settings(self, mode: str, pool_size: int) -> Dict[str, Any]:
+        """Возвращает настройки базы данных по умолчанию, переключенные на проверяемый режим."""
+        settings_dict = copy.deepcopy(connections.settings[DEFAULT_DB_ALIAS])
+        settings_dict["OPTIONS"].pop("pool", None)
+        settings_dict["CONN_MAX_AGE"] = 0
+        if mode == "persistent":
+            settings_dict["CONN_MAX_AGE"] = None
+        elif mode == "pool":
+            settings_dict["OPTIONS"]["pool"] = {"min_size": pool_size, "max_size": pool_size}
+        return settings_dict
+
+    def run_load(
+        self, wrapper_class: Any, settings_dict: Dict[str, Any], alias: str, threads: int, duration: float, query: str
+    ) -> Tuple[List[float], List[float], float]:
+        """Выполняет запросы как обработчик HTTP-запроса и возвращает задержки получения соединения и запросов."""
+        checkouts = []
+        requests = []
+        start = time.perf_counter()
+        deadline = start + duration
+
+        def worker() -> None:
+            connection = wrapper_class(settings_dict, alias)
+            try:
+                while time.perf_counter() < deadline:
+                    started = time.perf_counter()
+                    connection.close_if_unusable_or_obsolete()
+                    if connection.connection is None:
+                        connection.ensure_connection()
+                        checkouts.append((time.perf_counter() - started) * 1000)
+                    with connection.cursor() as cursor:
+                        cursor.execute(query)
+                        cursor.fetchall()
+                    connection.close_if_unusable_or_obsolete()
+                    requests.append((time.perf_counter() - started) * 1000)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return checkouts, requests, time.perf_counter() - start
+
+    def count_connects(self, wrapper_class: Any, settings_dict: Dict[str, Any], alias: str, checkouts: int) -> int:
+        """Возвращает число установленных соединений с сервером: у пула — по его статистике."""
+        pool = wrapper_class(settings_dict, alias).pool
+        if pool is None:
+            return checkouts
+        return get_pool_metrics(pool)["connections_opened"]
+
+    def close_pool(self, wrapper_class: Any, settings_dict: Dict[str, Any], alias: str) -> None:
+        """Закрывает пул, созданный для замера, и удаляет счетчики его алиаса."""
+        connection = wrapper_class(settings_dict, alias)
+        connection.close_pool()
+        connection._connection_stats.pop(alias, None)
@@ -24,6 +24,7 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "rest_framework",
+    "online_school",
     "users",
     "lms",
     "rest_framework_simplejwt",
@@ -61,17 +62,48 @@ TEMPLATES = [
 WSGI_APPLICATION = "online_school.wsgi.application"
 
 
+DB_POOL_ENABLED = os.getenv("DB_POOL_ENABLED") != "False"
+
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+
+DB_CONN_MAX_AGE = int(os.getenv("DB_CONN_MAX_AGE", "60"))
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": "online_school.db",
         "NAME": os.getenv("POSTGRES_DB", "online_school"),
         "USER": os.getenv("POSTGRES_USER", "postgres"),
         "PASSWORD": os.getenv("POSTGRES_PASSWORD", "postgres"),
         "HOST": os.getenv("POSTGRES_HOST", "localhost"),
         "PORT": os.getenv("POSTGRES_PORT", "5432"),
+        "CONN_MAX_AGE": 0 if DB_POOL_ENABLED else DB_CONN_MAX_AGE,
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": (
+            {"pool": {"min_size": DB_POOL_MIN_SIZE, "max_size": DB_POOL_MAX_SIZE, "timeout": DB_POOL_TIMEOUT}}
+            if DB_POOL_ENABLED
+            else {}
+        ),
     }
 }
 
+CACHE_ENABLED = os.getenv("CACHE_ENABLED") == "True"
+
+if CACHE_ENABLED:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("CACHE_LOCATION"),
+        }
+    }
+
+# Без общего кэша у каждого процесса свой LocMemCache и сброс версии курса виден только в нем,
+# поэтому данные курсов кэшируются ненадолго.
+COURSE_CACHE_TIMEOUT = 60 * 60 * 24 if CACHE_ENABLED else 60
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -106,7 +138,7 @@ AUTH_USER_MODEL = "users.User"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.RoleTokenAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
@@ -117,6 +149,9 @@ REST_FRAMEWORK = {
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=15),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
+    "TOKEN_USER_CLASS": "users.authentication.RoleTokenUser",
+    "TOKEN_OBTAIN_SERIALIZER": "users.serializers.RoleTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "users.serializers.RoleTokenRefreshSerializer",
 }
 
 SPECTACULAR_SETTINGS = {
@@ -128,6 +163,14 @@ SPECTACULAR_SETTINGS = {
 
 STRIPE_API_KEY = os.getenv("STRIPE_API_KEY")
 
+STRIPE_CHECKOUT_ASYNC = os.getenv("STRIPE_CHECKOUT_ASYNC") == "True"
+
+STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET", "")
+
+STRIPE_RECONCILE_WORKERS = int(os.getenv("STRIPE_RECONCILE_WORKERS", "8"))
+
+STRIPE_RECONCILE_DAYS = int(os.getenv("STRIPE_RECONCILE_DAYS", "3"))
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL")
@@ -150,9 +193,25 @@ DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL")
 SERVER_EMAIL = os.getenv("SERVER_EMAIL")
 
 
+COURSE_UPDATE_NOTIFICATION_WINDOW = timedelta(hours=4)
+
+INACTIVE_USER_DAYS = int(os.getenv("INACTIVE_USER_DAYS", "30"))
+
+INACTIVE_USER_BATCH_SIZE = int(os.getenv("INACTIVE_USER_BATCH_SIZE", "500"))
+
+INACTIVE_USER_BLOCK_NEVER_LOGGED_IN = os.getenv("INACTIVE_USER_BLOCK_NEVER_LOGGED_IN") == "True"
+
 CELERY_BEAT_SCHEDULE = {
     "block_inactive_user": {
         "task": "users.tasks.block_inactive_user",
         "schedule": crontab(hour=3, minute=0),
     },
+    "send_pending_course_updates": {
+        "task": "lms.tasks.send_pending_course_updates",
+        "schedule": crontab(minute="*/10"),
+    },
+    "reconcile_stripe_payments": {
+        "task": "users.tasks.reconcile_stripe_payments_task",
+        "schedule": crontab(minute="*/15"),
+    },
 }
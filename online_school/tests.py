@@ -0,0 +1,51 @@
+import os
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from users.models import User
+
+
+class DatabaseConnectionsTestCase(APITestCase):
+    def setUp(self) -> None:
+        """Создает администратора и обычного пользователя."""
+        self.admin = User.objects.create(email="admin@example.com", is_staff=True)
+        self.user = User.objects.create(email="test@example.com")
+
+    def test_database_metrics(self) -> None:
+        """Тестирует метрики пула соединений текущего воркера и доступ только для администраторов."""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse("metrics-db"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(reverse("metrics-db"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data["pid"], os.getpid())
+        self.assertEqual(data["mode"], "pool")
+        self.assertTrue(data["health_checks"])
+        self.assertGreaterEqual(data["checkout"]["checkouts"], 1)
+        self.assertEqual(data["checkout"]["errors"], 0)
+        pool = data["pool"]
+        self.assertEqual(pool["max_size"], settings.DB_POOL_MAX_SIZE)
+        self.assertGreaterEqual(pool["size"], pool["available"])
+        for key in ("waiting", "wait_ms", "avg_wait_ms", "timeouts", "connections_opened", "connection_setup_ms"):
+            self.assertIn(key, pool)
+
+    def test_benchmark_db_connections(self) -> None:
+        """Тестирует замер: без пула соединение открывается на каждый запрос, пул открывает не больше своего размера."""
+        out = StringIO()
+        call_command("benchmark_db_connections", "--duration", "0.3", "--threads", "2", stdout=out)
+        rows = {line.split()[0]: line.split() for line in out.getvalue().splitlines()[1:]}
+        self.assertEqual(set(rows), {"per_request", "persistent", "pool"})
+        requests, connects = int(rows["per_request"][1]), int(rows["per_request"][3])
+        self.assertEqual(requests, connects)
+        self.assertLessEqual(int(rows["persistent"][3]), 2)
+        self.assertLessEqual(int(rows["pool"][3]), 2)
+        self.assertGreater(int(rows["pool"][1]), int(rows["pool"][3]))
+        self.assertNotIn("benchmark_pool", connection._connection_pools)
@@ -2,10 +2,13 @@ from django.contrib import admin
 from django.urls import include, path
 from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
 
+from online_school.views import DatabaseMetricsAPIView
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("courses/", include("lms.urls", namespace="lms")),
     path("users/", include("users.urls", namespace="users")),
+    path("metrics/db/", DatabaseMetricsAPIView.as_view(), name="metrics-db"),
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path("swagger/", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger"),
     path("redoc/", SpectacularRedocView.as_view(url_name="schema"), name="redoc"),
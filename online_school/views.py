@@ -0,0 +1,22 @@
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema
+from rest_framework.permissions import IsAdminUser
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from online_school.db.metrics import get_connection_metrics
+
+
+@extend_schema(
+    summary="Метрики соединений с базой данных",
+    description="Возвращает метрики соединений процесса-воркера, обработавшего запрос: режим (pool, persistent, "
+    "per_request), число и время получения соединений, размер пула, очередь и время ожидания соединения.",
+    responses=OpenApiTypes.OBJECT,
+)
+class DatabaseMetricsAPIView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request: Request, *args, **kwargs) -> Response:
+        """Отдает метрики соединений текущего воркера."""
+        return Response(get_connection_metrics())
@@ -0,0 +1,55 @@
+from functools import cached_property
+from typing import FrozenSet
+
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import Token
+
+from users.models import User
+from users.roles import get_user_groups
+
+ROLES_CLAIM = "roles"
+
+
+def set_role_claims(token: Token, user: User) -> None:
+    """Записывает в токен признаки пользователя, нужные для проверки прав.
+
+    Группы читаются из базы, а не из кэша ролей, чтобы токен не получил уже устаревшие роли.
+    """
+    token["is_active"] = user.is_active
+    token["is_staff"] = user.is_staff
+    token[ROLES_CLAIM] = sorted(get_user_groups(user))
+
+
+class RoleTokenUser(TokenUser):
+    """Пользователь из access-токена: id, активность, флаг персонала и роли без запроса к базе."""
+
+    @cached_property
+    def id(self) -> int:
+        """Возвращает id пользователя с типом первичного ключа (в токене он хранится строкой)."""
+        return User._meta.pk.to_python(self.token[api_settings.USER_ID_CLAIM])
+
+    @cached_property
+    def is_active(self) -> bool:
+        """Возвращает признак активности пользователя из токена."""
+        return self.token.get("is_active", True)
+
+    @cached_property
+    def _cached_roles(self) -> FrozenSet[str]:
+        """Возвращает роли из токена; get_user_roles берет их отсюда без запроса к базе."""
+        return frozenset(self.token[ROLES_CLAIM])
+
+
+class RoleTokenAuthentication(JWTStatelessUserAuthentication):
+    """Аутентифицирует по access-токену без загрузки пользователя из базы."""
+
+    def get_user(self, validated_token: Token) -> RoleTokenUser:
+        """Возвращает пользователя из токена; токены без ролей нужно обновить."""
+        if ROLES_CLAIM not in validated_token:
+            raise InvalidToken("Токен выдан без ролей, обновите его")
+        user = super().get_user(validated_token)
+        if not user.is_active:
+            raise InvalidToken("Пользователь неактивен")
+        return user
@@ -0,0 +1,93 @@
+import csv
+import io
+import json
+from itertools import islice
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, Sequence
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import QuerySet
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import ValidationError
+
+EXPORT_CHUNK_SIZE = 2000
+
+PAYMENT_EXPORT_FIELDS = (
+    "id",
+    "user_id",
+    "payment_date",
+    "payment_amount",
+    "payment_method",
+    "paid_course_id",
+    "paid_lesson_id",
+    "status",
+    "stripe_session_id",
+)
+
+SUBSCRIPTION_EXPORT_FIELDS = ("id", "owner_id", "owner__email", "course_id", "course__name", "active", "created_at")
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def format_rows(rows: Iterable[Dict[str, Any]], fields: Sequence[str], export_format: str) -> str:
+    """Форматирует пачку строк в CSV или NDJSON."""
+    buffer = io.StringIO()
+    if export_format == "csv":
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([row[field] for field in fields])
+    else:
+        for row in rows:
+            buffer.write(json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False))
+            buffer.write("\n")
+    return buffer.getvalue()
+
+
+def format_header(fields: Sequence[str], export_format: str) -> str:
+    """Возвращает заголовок выгрузки: строку с именами полей для CSV."""
+    if export_format != "csv":
+        return ""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(fields)
+    return buffer.getvalue()
+
+
+def iter_export(queryset: QuerySet, fields: Sequence[str], export_format: str) -> Iterator[str]:
+    """Построчно выгружает queryset в CSV или NDJSON, отдавая текст пачками по EXPORT_CHUNK_SIZE строк."""
+    yield format_header(fields, export_format)
+    rows = queryset.values(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    while chunk := list(islice(rows, EXPORT_CHUNK_SIZE)):
+        yield format_rows(chunk, fields, export_format)
+
+
+async def aiter_export(queryset: QuerySet, fields: Sequence[str], export_format: str) -> AsyncIterator[str]:
+    """Асинхронный вариант iter_export: под ASGI Django дочитывает синхронный итератор целиком перед отправкой."""
+    yield format_header(fields, export_format)
+    chunk = []
+    async for row in queryset.values(*fields).aiterator(chunk_size=EXPORT_CHUNK_SIZE):
+        chunk.append(row)
+        if len(chunk) == EXPORT_CHUNK_SIZE:
+            yield format_rows(chunk, fields, export_format)
+            chunk = []
+    if chunk:
+        yield format_rows(chunk, fields, export_format)
+
+
+def get_export_format(value: str) -> str:
+    """Проверяет формат выгрузки."""
+    if value not in EXPORT_FORMATS:
+        raise ValidationError({"export_format": f"Доступные форматы: {', '.join(EXPORT_FORMATS)}"})
+    return value
+
+
+def export_response(
+    queryset: QuerySet, fields: Sequence[str], export_format: str, filename: str
+) -> StreamingHttpResponse:
+    """Возвращает потоковый ответ с выгрузкой, не загружая все строки в память."""
+    response = StreamingHttpResponse(
+        aiter_export(queryset, fields, export_format), content_type=EXPORT_FORMATS[export_format]
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{export_format}"'
+    return response
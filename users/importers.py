@@ -0,0 +1,182 @@
+import csv
+import json
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from django.db import transaction
+
+from lms.models import Course, Lesson
+from users.models import Payments, User
+
+IMPORT_BATCH_SIZE = 2000
+
+PAYMENT_METHODS = {choice for choice, _ in Payments.PAYMENT_METHOD_CHOICES}
+PAYMENT_STATUSES = {choice for choice, _ in Payments.STATUS_CHOICES}
+UPSERT_FIELDS = [
+    "user",
+    "payment_date",
+    "paid_course",
+    "paid_lesson",
+    "payment_amount",
+    "payment_method",
+    "stripe_payment_intent_id",
+    "stripe_link",
+    "status",
+]
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    updated: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+
+
+def read_csv(file: TextIO) -> Iterator[Dict[str, Any]]:
+    """Читает строки CSV с заголовком."""
+    yield from csv.DictReader(file)
+
+
+def read_ndjson(file: TextIO) -> Iterator[Dict[str, Any]]:
+    """Читает объекты JSON, по одному на строку."""
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_json_array(file: TextIO, chunk_size: int = 65536) -> Iterator[Dict[str, Any]]:
+    """Читает массив JSON (в том числе фикстуру Django) по одному объекту, не загружая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    started = False
+    eof = False
+    while True:
+        buffer = buffer.lstrip()
+        if not started and buffer:
+            if buffer[0] != "[":
+                raise ValueError("Ожидается массив JSON")
+            buffer = buffer[1:]
+            started = True
+            continue
+        if started and buffer[:1] == ",":
+            buffer = buffer[1:]
+            continue
+        if started and buffer[:1] == "]":
+            return
+        if started and buffer:
+            try:
+                obj, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                buffer = buffer[end:]
+                yield obj.get("fields", obj) if "model" in obj else obj
+                continue
+        if eof:
+            return
+        chunk = file.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
+
+
+def get_id(row: Dict[str, Any], name: str) -> Optional[int]:
+    """Возвращает id связанного объекта из поля name или name_id."""
+    value = row.get(name, row.get(f"{name}_id"))
+    if value in (None, ""):
+        return None
+    return int(value)
+
+
+def parse_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Проверяет строку и приводит ее к полям платежа."""
+    try:
+        amount = Decimal(str(row["payment_amount"])).quantize(Decimal("0.01"))
+    except (KeyError, InvalidOperation):
+        raise ValueError("Некорректная сумма оплаты")
+    if amount < 0:
+        raise ValueError("Сумма оплаты не может быть отрицательной")
+    try:
+        payment_date = date.fromisoformat(str(row["payment_date"]))
+    except (KeyError, ValueError):
+        raise ValueError("Некорректная дата оплаты")
+    payment_method = row.get("payment_method")
+    if payment_method not in PAYMENT_METHODS:
+        raise ValueError(f"Неизвестный способ оплаты: {payment_method}")
+    status = row.get("status") or Payments.get_initial_status(payment_method)
+    if status not in PAYMENT_STATUSES:
+        raise ValueError(f"Неизвестный статус: {status}")
+    return {
+        "user_id": get_id(row, "user"),
+        "payment_date": payment_date,
+        "paid_course_id": get_id(row, "paid_course"),
+        "paid_lesson_id": get_id(row, "paid_lesson"),
+        "payment_amount": amount,
+        "payment_method": payment_method,
+        "status": status,
+        "stripe_session_id": row.get("stripe_session_id") or None,
+        "stripe_payment_intent_id": row.get("stripe_payment_intent_id") or None,
+        "stripe_link": row.get("stripe_link") or None,
+    }
+
+
+def check_relations(batch: List[Tuple[int, Dict[str, Any]]], result: ImportResult) -> List[Dict[str, Any]]:
+    """Отбрасывает строки со ссылками на несуществующих пользователей, курсы и уроки."""
+    relations = (("user_id", User), ("paid_course_id", Course), ("paid_lesson_id", Lesson))
+    existing = {}
+    for name, model in relations:
+        ids = {values[name] for _, values in batch if values[name] is not None}
+        existing[name] = set(model.objects.filter(pk__in=ids).values_list("pk", flat=True))
+    valid = []
+    for line, values in batch:
+        missing = [name for name, _ in relations if values[name] is not None and values[name] not in existing[name]]
+        if missing:
+            result.errors.append((line, f"Не найдены связанные объекты: {', '.join(missing)}"))
+        else:
+            valid.append(values)
+    return valid
+
+
+def save_batch(batch: List[Tuple[int, Dict[str, Any]]], result: ImportResult) -> None:
+    """Вставляет пачку платежей, обновляя существующие по stripe_session_id."""
+    rows = check_relations(batch, result)
+    upserts = [Payments(**values) for values in rows if values["stripe_session_id"]]
+    inserts = [Payments(**values) for values in rows if not values["stripe_session_id"]]
+    with transaction.atomic():
+        if upserts:
+            session_ids = [payment.stripe_session_id for payment in upserts]
+            existing = Payments.objects.filter(stripe_session_id__in=session_ids).count()
+            Payments.objects.bulk_create(
+                upserts, update_conflicts=True, unique_fields=["stripe_session_id"], update_fields=UPSERT_FIELDS
+            )
+            result.updated += existing
+            result.created += len(upserts) - existing
+        if inserts:
+            Payments.objects.bulk_create(inserts)
+            result.created += len(inserts)
+
+
+def import_payments(rows: Iterable[Dict[str, Any]], batch_size: int = IMPORT_BATCH_SIZE) -> ImportResult:
+    """Импортирует платежи пачками по batch_size строк."""
+    result = ImportResult()
+    batch: List[Tuple[int, Dict[str, Any]]] = []
+    sessions_in_batch = set()
+    for line, row in enumerate(rows, start=1):
+        try:
+            values = parse_row(row)
+        except (TypeError, ValueError) as exc:
+            result.errors.append((line, str(exc)))
+            continue
+        session_id = values["stripe_session_id"]
+        if session_id in sessions_in_batch or len(batch) >= batch_size:
+            save_batch(batch, result)
+            batch = []
+            sessions_in_batch = set()
+        if session_id:
+            sessions_in_batch.add(session_id)
+        batch.append((line, values))
+    if batch:
+        save_batch(batch, result)
+    return result
@@ -0,0 +1,94 @@
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from users.models import Payments, User
+
+BENCHMARK_INDEXES = ("users_payments_user_date", "users_payments_method_date")
+
+
+class Command(BaseCommand):
+    help = "Benchmark payment list filters and ordering on seeded rows (all changes are rolled back)"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--rows", type=int, default=2_000_000)
+        parser.add_argument("--users", type=int, default=10_000)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options) -> None:
+        with transaction.atomic():
+            user_id = self.seed(options["rows"], options["users"])
+            queries = self.get_queries(user_id)
+            with_indexes = self.measure(queries, options["repeat"])
+            with connection.cursor() as cursor:
+                for name in BENCHMARK_INDEXES:
+                    cursor.execute(f"DROP INDEX {name}")
+                cursor.execute(f"ANALYZE {Payments._meta.db_table}")
+            without_indexes = self.measure(queries, options["repeat"])
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{'query':<40}{'with indexes, ms':>20}{'without, ms':>16}")
+        for name in queries:
+            self.stdout.write(f"{name:<40}{with_indexes[name]:>20.2f}{without_indexes[name]:>16.2f}")
+
+    def seed(self, rows: int, users: int) -> int:
+        """Заполняет таблицы пользователями и платежами и возвращает id одного пользователя."""
+        self.stdout.write(f"Seeding {users} users and {rows} payments...")
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {User._meta.db_table}
+                    (password, is_superuser, first_name, last_name, is_staff, is_active, date_joined, email,
+                     avatar_renditions)
+                SELECT '', false, '', '', false, true, now(), 'bench' || i || '@example.com', '{{}}'
+                FROM generate_series(1, %s) AS i
+                RETURNING id
+                """,
+                [users],
+            )
+            user_ids = [row[0] for row in cursor.fetchall()]
+            cursor.execute(
+                f"""
+                INSERT INTO {Payments._meta.db_table}
+                    (user_id, payment_date, payment_amount, payment_method, status, created_at)
+                SELECT
+                    %s + (i %% %s),
+                    date '2020-01-01' + (i %% 2000),
+                    (i %% 500) * 100,
+                    (ARRAY['cash', 'credit_card', 'stripe'])[1 + i %% 3],
+                    'paid',
+                    now()
+                FROM generate_series(1, %s) AS i
+                """,
+                [user_ids[0], users, rows],
+            )
+            cursor.execute(f"ANALYZE {Payments._meta.db_table}")
+        return user_ids[len(user_ids) // 2]
+
+    def get_queries(self, user_id: int) -> Dict[str, Callable[[], List]]:
+        """Возвращает запросы списка платежей, которые выполняет PaymentsViewSet."""
+        payments = Payments.objects.all()
+        return {
+            "user, order by date": lambda: list(payments.filter(user_id=user_id).order_by("-payment_date")),
+            "user + method, order by date": lambda: list(
+                payments.filter(user_id=user_id, payment_method="cash").order_by("payment_date")
+            ),
+            "method, order by date, first 50": lambda: list(
+                payments.filter(payment_method="stripe").order_by("-payment_date")[:50]
+            ),
+        }
+
+    def measure(self, queries: Dict[str, Callable[[], List]], repeat: int) -> Dict[str, float]:
+        """Возвращает медианное время выполнения запросов в миллисекундах."""
+        results = {}
+        for name, query in queries.items():
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                query()
+                timings.append((time.perf_counter() - start) * 1000)
+            results[name] = statistics.median(timings)
+        return results
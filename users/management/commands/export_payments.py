@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from users.exports import EXPORT_FORMATS, PAYMENT_EXPORT_FIELDS, iter_export
+from users.models import Payments
+
+
+class Command(BaseCommand):
+    help = "Export payments to CSV or NDJSON"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--format", dest="export_format", choices=list(EXPORT_FORMATS), default="csv")
+        parser.add_argument("--output", help="File path, stdout by default")
+        parser.add_argument("--user", type=int)
+        parser.add_argument("--paid-course", type=int)
+        parser.add_argument("--paid-lesson", type=int)
+        parser.add_argument("--payment-method", choices=[choice for choice, _ in Payments.PAYMENT_METHOD_CHOICES])
+        parser.add_argument("--ordering", default="id", choices=["id", "payment_date", "-payment_date"])
+
+    def handle(self, *args, **options) -> None:
+        filters = {
+            "user": options["user"],
+            "paid_course": options["paid_course"],
+            "paid_lesson": options["paid_lesson"],
+            "payment_method": options["payment_method"],
+        }
+        queryset = Payments.objects.filter(
+            **{field: value for field, value in filters.items() if value is not None}
+        ).order_by(options["ordering"])
+        chunks = iter_export(queryset, PAYMENT_EXPORT_FIELDS, options["export_format"])
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8", newline="") as file:
+                file.writelines(chunks)
+            self.stderr.write(self.style.SUCCESS(f"Payments exported to {options['output']}"))
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
@@ -1,13 +1,46 @@
-from django.core.management import call_command
-from django.core.management.base import BaseCommand
+import time
+from pathlib import Path
 
-from users.models import Payments
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from users.importers import IMPORT_BATCH_SIZE, import_payments, read_csv, read_json_array, read_ndjson
+from users.rollups import rebuild_payment_rollups
+
+READERS = {"csv": read_csv, "ndjson": read_ndjson, "json": read_json_array}
+EXTENSIONS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson", ".json": "json"}
+DEFAULT_PATH = Path(settings.BASE_DIR) / "users" / "fixtures" / "payments_fixture.json"
 
 
 class Command(BaseCommand):
-    help = "Load payments to the database"
+    help = "Import payments from CSV, NDJSON or a JSON array, updating existing ones by Stripe session id"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("path", nargs="?", default=str(DEFAULT_PATH))
+        parser.add_argument("--format", dest="import_format", choices=list(READERS))
+        parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+        parser.add_argument("--skip-rollups", action="store_true", help="Do not rebuild revenue rollups")
+        parser.add_argument("--max-errors", type=int, default=20, help="How many invalid rows to print")
 
-    def handle(self, *args, **kwargs):
-        Payments.objects.all().delete()
-        call_command("loaddata", "payments_fixture.json")
-        self.stdout.write(self.style.SUCCESS("Fixtures loaded successfully"))
+    def handle(self, *args, **options) -> None:
+        path = Path(options["path"])
+        import_format = options["import_format"] or EXTENSIONS.get(path.suffix.lower())
+        if import_format is None:
+            raise CommandError("Cannot detect the file format, use --format")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive")
+        started = time.perf_counter()
+        with open(path, encoding="utf-8", newline="") as file:
+            result = import_payments(READERS[import_format](file), options["batch_size"])
+        elapsed = time.perf_counter() - started
+        rows = result.created + result.updated
+        for line, error in result.errors[:options["max_errors"]]:
+            self.stderr.write(f"row {line}: {error}")
+        if not options["skip_rollups"] and rows:
+            rebuild_payment_rollups()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Payments imported: {result.created} created, {result.updated} updated, "
+                f"{len(result.errors)} rejected in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):.0f} rows/s)"
+            )
+        )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from users.rollups import rebuild_payment_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild payment rollups from scratch"
+
+    def handle(self, *args, **kwargs):
+        created = rebuild_payment_rollups()
+        self.stdout.write(self.style.SUCCESS(f"Payment rollups rebuilt: {created} rows"))
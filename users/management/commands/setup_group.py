@@ -1,10 +1,12 @@
 from django.contrib.auth.models import Group, Permission
 from django.core.management.base import BaseCommand
 
+from users.roles import MODERATORS_GROUP
+
 
 class Command(BaseCommand):
     def handle(self, *args, **kwargs):
-        group, created = Group.objects.get_or_create(name="Модераторы")
+        group, created = Group.objects.get_or_create(name=MODERATORS_GROUP)
         permissions = Permission.objects.filter(
             codename__in=[
                 "view_course",
@@ -14,4 +16,4 @@ class Command(BaseCommand):
             ]
         )
         group.permissions.add(*permissions)
-        self.stdout.write(self.style.SUCCESS("The group 'Модераторы' was successfully created"))
+        self.stdout.write(self.style.SUCCESS(f"The group '{MODERATORS_GROUP}' was successfully created"))
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0007_courseupdatemark"),
+        ("users", "0007_alter_payments_payment_date"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StripeProduct",
+            fields=[
+                (
+                    "course",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        serialize=False,
+                        to="lms.course",
+                        verbose_name="Курс",
+                    ),
+                ),
+                ("stripe_product_id", models.CharField(max_length=255, verbose_name="ID продукта")),
+            ],
+            options={
+                "verbose_name": "Продукт Stripe",
+                "verbose_name_plural": "Продукты Stripe",
+            },
+        ),
+        migrations.CreateModel(
+            name="StripePrice",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("amount", models.DecimalField(decimal_places=2, max_digits=10, verbose_name="Сумма")),
+                ("stripe_price_id", models.CharField(max_length=255, verbose_name="ID цены")),
+                (
+                    "course",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="lms.course", verbose_name="Курс"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Цена Stripe",
+                "verbose_name_plural": "Цены Stripe",
+                "unique_together": {("course", "amount")},
+            },
+        ),
+    ]
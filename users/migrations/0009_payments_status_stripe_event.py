@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0007_courseupdatemark"),
+        ("users", "0008_stripe_product_price"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StripeEvent",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("event_id", models.CharField(max_length=255, unique=True, verbose_name="ID события")),
+                ("event_type", models.CharField(max_length=255, verbose_name="Тип события")),
+                ("processed_at", models.DateTimeField(auto_now_add=True, verbose_name="Дата обработки")),
+            ],
+            options={
+                "verbose_name": "Событие Stripe",
+                "verbose_name_plural": "События Stripe",
+            },
+        ),
+        migrations.AddField(
+            model_name="payments",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Ожидает оплаты"),
+                    ("paid", "Оплачен"),
+                    ("failed", "Ошибка оплаты"),
+                    ("expired", "Сессия истекла"),
+                ],
+                default="pending",
+                max_length=20,
+                verbose_name="Статус оплаты",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="payments",
+            name="stripe_session_id",
+            field=models.CharField(blank=True, db_index=True, max_length=255, null=True, verbose_name="ID сессии"),
+        ),
+        migrations.AddIndex(
+            model_name="payments",
+            index=models.Index(fields=["payment_method", "status"], name="users_payments_method_status"),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0007_courseupdatemark"),
+        ("users", "0009_payments_status_stripe_event"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PaymentRollup",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("date", models.DateField(verbose_name="Дата")),
+                (
+                    "payment_method",
+                    models.CharField(
+                        choices=[("cash", "Наличными"), ("credit_card", "Перевод на счет"), ("stripe", "Stripe")],
+                        max_length=20,
+                        verbose_name="Способ оплаты",
+                    ),
+                ),
+                (
+                    "total_amount",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name="Сумма"),
+                ),
+                ("payments_count", models.PositiveIntegerField(default=0, verbose_name="Количество платежей")),
+                (
+                    "course",
+                    models.ForeignKey(
+                        blank=True,
+                        db_constraint=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        to="lms.course",
+                        verbose_name="Курс",
+                    ),
+                ),
+                (
+                    "lesson",
+                    models.ForeignKey(
+                        blank=True,
+                        db_constraint=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        to="lms.lesson",
+                        verbose_name="Урок",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Сводка платежей",
+                "verbose_name_plural": "Сводки платежей",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("date", "course", "lesson", "payment_method"),
+                        name="users_payment_rollup_unique",
+                        nulls_distinct=False,
+                    )
+                ],
+            },
+        ),
+    ]
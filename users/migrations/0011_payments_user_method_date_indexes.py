@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0007_courseupdatemark"),
+        ("users", "0010_payment_rollup"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="payments",
+            index=models.Index(fields=["user", "payment_date"], name="users_payments_user_date"),
+        ),
+        migrations.AddIndex(
+            model_name="payments",
+            index=models.Index(fields=["payment_method", "payment_date"], name="users_payments_method_date"),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0011_payments_user_method_date_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="payments",
+            name="stripe_session_id",
+            field=models.CharField(blank=True, max_length=255, null=True, unique=True, verbose_name="ID сессии"),
+        ),
+    ]
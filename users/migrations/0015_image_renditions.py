@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0014_user_town_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="avatar_renditions",
+            field=models.JSONField(blank=True, default=dict, verbose_name="Уменьшенные копии аватара"),
+        ),
+    ]
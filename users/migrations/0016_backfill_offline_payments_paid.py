@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+def mark_offline_payments_paid(apps, schema_editor) -> None:
+    """Проводит оплаты наличными и переводом, которые миграция статусов оставила в pending."""
+    Payments = apps.get_model("users", "Payments")
+    Payments.objects.filter(status="pending").exclude(payment_method="stripe").update(status="paid")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0015_image_renditions"),
+    ]
+
+    operations = [
+        migrations.RunPython(mark_offline_payments_paid, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations
+from django.db.models import Count, Sum
+
+
+def rebuild_paid_rollups(apps, schema_editor) -> None:
+    """Пересчитывает сводку только по оплаченным платежам."""
+    Payments = apps.get_model("users", "Payments")
+    PaymentRollup = apps.get_model("users", "PaymentRollup")
+    PaymentRollup.objects.all().delete()
+    totals = (
+        Payments.objects.filter(status="paid")
+        .values("payment_date", "paid_course_id", "paid_lesson_id", "payment_method")
+        .annotate(total_amount=Sum("payment_amount"), payments_count=Count("id"))
+        .order_by()
+    )
+    PaymentRollup.objects.bulk_create(
+        [
+            PaymentRollup(
+                date=row["payment_date"],
+                course_id=row["paid_course_id"],
+                lesson_id=row["paid_lesson_id"],
+                payment_method=row["payment_method"],
+                total_amount=row["total_amount"],
+                payments_count=row["payments_count"],
+            )
+            for row in totals.iterator(chunk_size=1000)
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0016_backfill_offline_payments_paid"),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_paid_rollups, migrations.RunPython.noop),
+    ]
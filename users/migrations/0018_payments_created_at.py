@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:48
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0017_rebuild_paid_payment_rollups"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="payments",
+            name="created_at",
+            field=models.DateTimeField(
+                auto_now_add=True, default=django.utils.timezone.now, verbose_name="Дата создания"
+            ),
+            preserve_default=False,
+        ),
+    ]
@@ -1,6 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
-from django.db.models import ForeignKey
+from django.db.models import ForeignKey, Q
 
 from lms.models import Course, Lesson
 
@@ -12,6 +12,7 @@ class User(AbstractUser):
     phone_number = models.CharField(max_length=20, verbose_name="Телефон", blank=True, null=True)
     town = models.CharField(max_length=35, verbose_name="Город", blank=True, null=True)
     avatar = models.ImageField(upload_to="avatars/", null=True, blank=True)
+    avatar_renditions = models.JSONField(default=dict, blank=True, verbose_name="Уменьшенные копии аватара")
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
@@ -19,6 +20,15 @@ class User(AbstractUser):
     class Meta:
         verbose_name = "Пользователь"
         verbose_name_plural = "Пользователи"
+        indexes = [
+            models.Index(fields=["last_login"], condition=Q(is_active=True), name="users_user_active_last_login"),
+            models.Index(
+                fields=["date_joined"],
+                condition=Q(is_active=True, last_login__isnull=True),
+                name="users_user_never_logged_in",
+            ),
+            models.Index(fields=["town", "id"], name="users_user_town_id_idx"),
+        ]
 
     def __str__(self):
         return self.email
@@ -31,6 +41,16 @@ class Payments(models.Model):
         ("credit_card", "Перевод на счет"),
         ("stripe", "Stripe"),
     ]
+    STATUS_PENDING = "pending"
+    STATUS_PAID = "paid"
+    STATUS_FAILED = "failed"
+    STATUS_EXPIRED = "expired"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Ожидает оплаты"),
+        (STATUS_PAID, "Оплачен"),
+        (STATUS_FAILED, "Ошибка оплаты"),
+        (STATUS_EXPIRED, "Сессия истекла"),
+    ]
     user = ForeignKey(to=User, verbose_name="Плательщик", on_delete=models.SET_NULL, null=True)
     payment_date = models.DateField(verbose_name="Дата оплаты")
     paid_course = models.ForeignKey(
@@ -41,13 +61,105 @@ class Payments(models.Model):
     )
     payment_amount = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Сумма оплаты")
     payment_method = models.CharField(max_length=20, verbose_name="Способ оплаты", choices=PAYMENT_METHOD_CHOICES)
-    stripe_session_id = models.CharField(max_length=255, blank=True, null=True, verbose_name="ID сессии")
+    stripe_session_id = models.CharField(
+        max_length=255, blank=True, null=True, unique=True, verbose_name="ID сессии"
+    )
     stripe_payment_intent_id = models.CharField(max_length=255, null=True, blank=True)
     stripe_link = models.URLField(max_length=2000, blank=True, null=True, verbose_name="Ссылка на оплату")
+    status = models.CharField(
+        max_length=20, verbose_name="Статус оплаты", choices=STATUS_CHOICES, default=STATUS_PENDING
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
 
     class Meta:
         verbose_name = "Платеж"
         verbose_name_plural = "Платежи"
+        indexes = [
+            models.Index(fields=["payment_method", "status"], name="users_payments_method_status"),
+            models.Index(fields=["user", "payment_date"], name="users_payments_user_date"),
+            models.Index(fields=["payment_method", "payment_date"], name="users_payments_method_date"),
+        ]
 
     def __str__(self):
         return f"{self.user} – {self.payment_amount}"
+
+    @classmethod
+    def get_initial_status(cls, payment_method: str) -> str:
+        """Возвращает статус нового платежа: оплата вне Stripe считается проведенной сразу."""
+        return cls.STATUS_PENDING if payment_method == "stripe" else cls.STATUS_PAID
+
+
+class PaymentRollup(models.Model):
+    """Суммы платежей за день в разрезе курса, урока и способа оплаты
+
+    Поддерживается сигналами платежей. При удалении курса или урока его строки
+    переносятся в строки без курса/урока, как и сами платежи (SET_NULL).
+    """
+    date = models.DateField(verbose_name="Дата")
+    course = models.ForeignKey(
+        to=Course, on_delete=models.DO_NOTHING, db_constraint=False, blank=True, null=True, verbose_name="Курс"
+    )
+    lesson = models.ForeignKey(
+        to=Lesson, on_delete=models.DO_NOTHING, db_constraint=False, blank=True, null=True, verbose_name="Урок"
+    )
+    payment_method = models.CharField(
+        max_length=20, verbose_name="Способ оплаты", choices=Payments.PAYMENT_METHOD_CHOICES
+    )
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Сумма")
+    payments_count = models.PositiveIntegerField(default=0, verbose_name="Количество платежей")
+
+    class Meta:
+        verbose_name = "Сводка платежей"
+        verbose_name_plural = "Сводки платежей"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["date", "course", "lesson", "payment_method"],
+                name="users_payment_rollup_unique",
+                nulls_distinct=False,
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.date}: {self.total_amount}"
+
+
+class StripeEvent(models.Model):
+    """Обработанное событие вебхука страйпа"""
+    event_id = models.CharField(max_length=255, unique=True, verbose_name="ID события")
+    event_type = models.CharField(max_length=255, verbose_name="Тип события")
+    processed_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата обработки")
+
+    class Meta:
+        verbose_name = "Событие Stripe"
+        verbose_name_plural = "События Stripe"
+
+    def __str__(self):
+        return f"{self.event_type} – {self.event_id}"
+
+
+class StripeProduct(models.Model):
+    """Продукт страйпа, созданный для курса"""
+    course = models.OneToOneField(to=Course, on_delete=models.CASCADE, primary_key=True, verbose_name="Курс")
+    stripe_product_id = models.CharField(max_length=255, verbose_name="ID продукта")
+
+    class Meta:
+        verbose_name = "Продукт Stripe"
+        verbose_name_plural = "Продукты Stripe"
+
+    def __str__(self):
+        return f"{self.course_id} – {self.stripe_product_id}"
+
+
+class StripePrice(models.Model):
+    """Цена страйпа для курса и суммы оплаты"""
+    course = models.ForeignKey(to=Course, on_delete=models.CASCADE, verbose_name="Курс")
+    amount = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Сумма")
+    stripe_price_id = models.CharField(max_length=255, verbose_name="ID цены")
+
+    class Meta:
+        verbose_name = "Цена Stripe"
+        verbose_name_plural = "Цены Stripe"
+        unique_together = ("course", "amount")
+
+    def __str__(self):
+        return f"{self.course_id}: {self.amount} – {self.stripe_price_id}"
@@ -0,0 +1,16 @@
+from lms.paginators import CustomCursorPagination
+
+
+class UserCursorPagination(CustomCursorPagination):
+    """Курсорная пагинация справочника пользователей по id."""
+
+    page_size = 20
+    max_page_size = 100
+
+
+class PaymentCursorPagination(CustomCursorPagination):
+    """Курсорная пагинация платежей: сначала новые."""
+
+    page_size = 20
+    max_page_size = 100
+    ordering = "-id"
@@ -1,18 +1,20 @@
 from rest_framework import permissions
 
+from users.roles import is_moderator
+
 
 class IsModer(permissions.BasePermission):
     """Проверяет, является ли пользователь модератором"""
 
     def has_permission(self, request, view):
-        return request.user.groups.filter(name="Модераторы").exists()
+        return is_moderator(request.user)
 
 
 class IsOwner(permissions.BasePermission):
     """Проверяет, является ли пользователь владельцем"""
 
     def has_object_permission(self, request, view, obj):
-        if obj.owner == request.user:
+        if request.user.is_authenticated and obj.owner_id == request.user.pk:
             return True
         return False
 
@@ -23,4 +25,4 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS:
             return True
-        return obj == request.user
+        return obj.pk == request.user.pk
@@ -0,0 +1,51 @@
+from typing import FrozenSet, Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+
+MODERATORS_GROUP = "Модераторы"
+
+ROLES_CACHE_TIMEOUT = 60 * 15
+
+
+def get_roles_cache_key(user_id: int) -> str:
+    """Возвращает ключ кэша с ролями пользователя."""
+    return f"user_roles:{user_id}"
+
+
+def get_user_groups(user) -> FrozenSet[str]:
+    """Читает названия групп пользователя из базы."""
+    return frozenset(user.groups.values_list("name", flat=True))
+
+
+def get_user_roles(user) -> FrozenSet[str]:
+    """Возвращает названия групп пользователя.
+
+    Роли запоминаются на объекте пользователя (т.е. на время запроса).
+    Между запросами они кэшируются только в общем кэше (CACHE_ENABLED):
+    в локальном кэше процесса сброс при смене групп не дошел бы до других воркеров.
+    """
+    if not user or not user.is_authenticated:
+        return frozenset()
+    roles = getattr(user, "_cached_roles", None)
+    if roles is None:
+        if settings.CACHE_ENABLED:
+            key = get_roles_cache_key(user.pk)
+            roles = cache.get(key)
+            if roles is None:
+                roles = get_user_groups(user)
+                cache.set(key, roles, ROLES_CACHE_TIMEOUT)
+        else:
+            roles = get_user_groups(user)
+        user._cached_roles = roles
+    return roles
+
+
+def is_moderator(user) -> bool:
+    """Проверяет, состоит ли пользователь в группе модераторов."""
+    return MODERATORS_GROUP in get_user_roles(user)
+
+
+def invalidate_user_roles(user_ids: Iterable[int]) -> None:
+    """Сбрасывает закэшированные роли пользователей."""
+    cache.delete_many([get_roles_cache_key(user_id) for user_id in user_ids])
@@ -0,0 +1,151 @@
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+
+from users.models import PaymentRollup, Payments
+
+PAYMENT_ROLLUP_FIELDS = (
+    "payment_date",
+    "paid_course_id",
+    "paid_lesson_id",
+    "payment_method",
+    "payment_amount",
+    "status",
+)
+
+ROLLUP_GROUPS = {
+    "day": "date",
+    "month": "month",
+    "course": "course_id",
+    "lesson": "lesson_id",
+    "payment_method": "payment_method",
+}
+
+
+def to_amount(value: Any) -> Decimal:
+    """Приводит сумму платежа к Decimal с копейками."""
+    return Decimal(str(value)).quantize(Decimal("0.01"))
+
+
+def update_payment_rollup(
+    payment_date: date,
+    course_id: Optional[int],
+    lesson_id: Optional[int],
+    payment_method: str,
+    amount: Decimal,
+    count: int,
+) -> None:
+    """Прибавляет сумму и количество платежей к строке сводки."""
+    key = {"date": payment_date, "course_id": course_id, "lesson_id": lesson_id, "payment_method": payment_method}
+    delta = {"total_amount": F("total_amount") + amount, "payments_count": F("payments_count") + count}
+    if PaymentRollup.objects.filter(**key).update(**delta):
+        return
+    try:
+        with transaction.atomic():
+            PaymentRollup.objects.create(**key, total_amount=amount, payments_count=count)
+    except IntegrityError:
+        PaymentRollup.objects.filter(**key).update(**delta)
+
+
+def apply_payment(values: Dict[str, Any], sign: int) -> None:
+    """Добавляет (sign=1) или вычитает (sign=-1) платеж из сводки. Учитываются только оплаченные платежи."""
+    if values["status"] != Payments.STATUS_PAID:
+        return
+    update_payment_rollup(
+        values["payment_date"],
+        values["paid_course_id"],
+        values["paid_lesson_id"],
+        values["payment_method"],
+        sign * to_amount(values["payment_amount"]),
+        sign,
+    )
+
+
+def get_payment_values(payment: Payments) -> Dict[str, Any]:
+    """Возвращает поля платежа, от которых зависит сводка."""
+    return {
+        "payment_date": Payments._meta.get_field("payment_date").to_python(payment.payment_date),
+        "paid_course_id": payment.paid_course_id,
+        "paid_lesson_id": payment.paid_lesson_id,
+        "payment_method": payment.payment_method,
+        "payment_amount": to_amount(payment.payment_amount),
+        "status": payment.status,
+    }
+
+
+def apply_status_change(values: Dict[str, Any], status: str) -> None:
+    """Переносит платеж в сводке при смене статуса, выполненной без сохранения модели."""
+    if values["status"] == status:
+        return
+    apply_payment(values, -1)
+    apply_payment({**values, "status": status}, 1)
+
+
+def detach_payment_rollups(field: str, object_id: int) -> None:
+    """Переносит строки удаляемого курса или урока в строки без него."""
+    rows = list(PaymentRollup.objects.filter(**{field: object_id}))
+    for row in rows:
+        values = {
+            "payment_date": row.date,
+            "course_id": row.course_id,
+            "lesson_id": row.lesson_id,
+            "payment_method": row.payment_method,
+            "amount": row.total_amount,
+            "count": row.payments_count,
+        }
+        values[field] = None
+        update_payment_rollup(**values)
+    PaymentRollup.objects.filter(pk__in=[row.pk for row in rows]).delete()
+
+
+def rebuild_payment_rollups(batch_size: int = 1000) -> int:
+    """Пересчитывает сводку оплаченных платежей с нуля."""
+    totals = (
+        Payments.objects.filter(status=Payments.STATUS_PAID)
+        .values("payment_date", "paid_course_id", "paid_lesson_id", "payment_method")
+        .annotate(total_amount=Sum("payment_amount"), payments_count=Count("id"))
+        .order_by()
+    )
+    created = 0
+    with transaction.atomic():
+        PaymentRollup.objects.all().delete()
+        batch = []
+        for row in totals.iterator(chunk_size=batch_size):
+            batch.append(
+                PaymentRollup(
+                    date=row["payment_date"],
+                    course_id=row["paid_course_id"],
+                    lesson_id=row["paid_lesson_id"],
+                    payment_method=row["payment_method"],
+                    total_amount=row["total_amount"],
+                    payments_count=row["payments_count"],
+                )
+            )
+            if len(batch) == batch_size:
+                created += len(PaymentRollup.objects.bulk_create(batch))
+                batch = []
+        created += len(PaymentRollup.objects.bulk_create(batch))
+    return created
+
+
+def get_revenue(group_by: List[str], filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Возвращает выручку из сводки, сгруппированную по выбранным полям."""
+    queryset = PaymentRollup.objects.all()
+    if filters.get("date_from"):
+        queryset = queryset.filter(date__gte=filters["date_from"])
+    if filters.get("date_to"):
+        queryset = queryset.filter(date__lte=filters["date_to"])
+    for field in ("course", "lesson", "payment_method"):
+        if filters.get(field) is not None:
+            queryset = queryset.filter(**{field: filters[field]})
+    totals = {"total_amount": Sum("total_amount"), "payments_count": Sum("payments_count")}
+    if not group_by:
+        return [queryset.aggregate(**totals)]
+    if "month" in group_by:
+        queryset = queryset.annotate(month=TruncMonth("date"))
+    fields = [ROLLUP_GROUPS[group] for group in group_by]
+    return list(queryset.values(*fields).annotate(**totals).order_by(*fields))
@@ -0,0 +1,20 @@
+from drf_spectacular.contrib.rest_framework_simplejwt import (SimpleJWTScheme, TokenObtainPairSerializerExtension,
+                                                              TokenRefreshSerializerExtension)
+
+
+class RoleTokenScheme(SimpleJWTScheme):
+    """Описывает RoleTokenAuthentication в схеме OpenAPI как JWT."""
+
+    target_class = "users.authentication.RoleTokenAuthentication"
+
+
+class RoleTokenObtainPairSerializerExtension(TokenObtainPairSerializerExtension):
+    """Описывает вход с ролями в токене так же, как стандартный вход simplejwt."""
+
+    target_class = "users.serializers.RoleTokenObtainPairSerializer"
+
+
+class RoleTokenRefreshSerializerExtension(TokenRefreshSerializerExtension):
+    """Описывает обновление токена с ролями так же, как стандартное обновление simplejwt."""
+
+    target_class = "users.serializers.RoleTokenRefreshSerializer"
@@ -1,10 +1,20 @@
-from typing import Any, Dict
+from typing import Any, Dict, List
 
+from django.urls import reverse
 from rest_framework import serializers
 from rest_framework.fields import CharField, SerializerMethodField
 from rest_framework.serializers import ModelSerializer
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import Token
 
+from lms.serializers import RenditionsField
+from users.authentication import set_role_claims
 from users.models import Payments, User
+from users.rollups import ROLLUP_GROUPS
+
+USER_PAYMENTS_PREVIEW = 10
 
 
 class PaymentsSerializer(ModelSerializer):
@@ -15,6 +25,62 @@ class PaymentsSerializer(ModelSerializer):
         fields = ("payment_date", "payment_amount", "payment_method")
 
 
+class PaymentStatusSerializer(PaymentsSerializer):
+    paid = SerializerMethodField()
+
+    class Meta(PaymentsSerializer.Meta):
+        fields = PaymentsSerializer.Meta.fields + ("status", "paid", "stripe_link")
+        read_only_fields = ("stripe_link",)
+
+    def get_paid(self, obj: Payments) -> bool:
+        """Проверяет, оплачен ли платеж."""
+        return obj.status == Payments.STATUS_PAID
+
+
+class PaymentCheckoutSerializer(ModelSerializer):
+    payment_amount = serializers.FloatField()
+
+    class Meta:
+        model = Payments
+        fields = ("id", "payment_date", "payment_amount", "payment_method", "paid_course", "stripe_link")
+        read_only_fields = ("stripe_link",)
+
+    def validate(self, attrs: Dict[str, Any]) -> Dict[str, Any]:
+        """Проверяет, что для оплаты через страйп указан курс."""
+        if attrs.get("payment_method") == "stripe" and not attrs.get("paid_course"):
+            raise serializers.ValidationError({"paid_course": "Для оплаты через Stripe нужно указать курс"})
+        return attrs
+
+
+class RevenueQuerySerializer(serializers.Serializer):
+    group_by = serializers.CharField(required=False, default="")
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    course = serializers.IntegerField(required=False)
+    lesson = serializers.IntegerField(required=False)
+    payment_method = serializers.ChoiceField(choices=Payments.PAYMENT_METHOD_CHOICES, required=False)
+
+    def validate_group_by(self, value: str) -> List[str]:
+        """Разбирает список полей группировки."""
+        groups = [group for group in value.split(",") if group]
+        unknown = set(groups) - set(ROLLUP_GROUPS)
+        if unknown:
+            raise serializers.ValidationError(f"Неизвестные поля группировки: {sorted(unknown)}")
+        if "day" in groups and "month" in groups:
+            raise serializers.ValidationError("Нельзя группировать одновременно по дню и месяцу")
+        return groups
+
+
+class RevenueSerializer(serializers.Serializer):
+    date = serializers.DateField(required=False)
+    month = serializers.DateField(required=False)
+    course_id = serializers.IntegerField(required=False)
+    lesson_id = serializers.IntegerField(required=False)
+    payment_method = serializers.CharField(required=False)
+    total_amount = serializers.FloatField(allow_null=True)
+    payments_count = serializers.IntegerField(allow_null=True)
+
+
 class UserCreateSerializer(ModelSerializer):
     password = CharField(write_only=True)
 
@@ -33,23 +99,37 @@ class UserCreateSerializer(ModelSerializer):
 
 
 class UserPublicSerializer(ModelSerializer):
+    avatar_renditions = RenditionsField()
+
     class Meta:
         model = User
-        fields = ("id", "town", "avatar")
+        fields = ("id", "town", "avatar", "avatar_renditions")
 
 
 class UserPrivateSerializer(ModelSerializer):
+    avatar_renditions = RenditionsField()
     payments = SerializerMethodField()
+    payments_url = SerializerMethodField()
 
     class Meta:
         model = User
         exclude = ("password",)
 
-    def get_payments(self, obj: User) -> Payments:
-        """Получает платежи пользователя."""
-        queryset = Payments.objects.filter(user=obj)
+    def get_payments(self, obj: User) -> List[Dict[str, Any]]:
+        """Получает последние платежи пользователя, полный список доступен по payments_url."""
+        queryset = (
+            Payments.objects.filter(user=obj)
+            .only(*PaymentsSerializer.Meta.fields)
+            .order_by("-payment_date", "-id")[:USER_PAYMENTS_PREVIEW]
+        )
         return PaymentsSerializer(queryset, many=True).data
 
+    def get_payments_url(self, obj: User) -> str:
+        """Получает ссылку на постраничный список платежей пользователя."""
+        url = reverse("users:payments-list")
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request else url
+
 
 class UserUpdateSerializer(ModelSerializer):
     class Meta:
@@ -62,3 +142,24 @@ class UserUpdateSerializer(ModelSerializer):
             "first_name",
             "last_name",
         )
+
+
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user: User) -> Token:
+        """Добавляет в токен активность, флаг персонала и роли пользователя."""
+        token = super().get_token(user)
+        set_role_claims(token, user)
+        return token
+
+
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs: Dict[str, Any]) -> Dict[str, str]:
+        """Выдает новый access-токен с признаками пользователя, перечитанными из базы."""
+        refresh = self.token_class(attrs["refresh"])
+        user = User.objects.filter(pk=refresh.payload.get(api_settings.USER_ID_CLAIM), is_active=True).first()
+        if user is None:
+            raise AuthenticationFailed(self.error_messages["no_active_account"], "no_active_account")
+        access = refresh.access_token
+        set_role_claims(access, user)
+        return {"access": str(access)}
@@ -1,32 +1,44 @@
-from typing import Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Optional, Set, Tuple
 
 import stripe
+from django.db import transaction
+from django.db.models import Q
+from django.utils.timezone import now
 
-from online_school.settings import STRIPE_API_KEY
+from lms.models import Course
+from online_school.settings import (INACTIVE_USER_BATCH_SIZE, INACTIVE_USER_BLOCK_NEVER_LOGGED_IN, STRIPE_API_KEY,
+                                    STRIPE_RECONCILE_DAYS, STRIPE_RECONCILE_WORKERS)
+from users.models import Payments, StripeEvent, StripePrice, StripeProduct, User
+from users.rollups import PAYMENT_ROLLUP_FIELDS, apply_status_change
 
 stripe.api_key = STRIPE_API_KEY
 
 
-def create_stripe_product(name: str) -> dict:
+def create_stripe_product(name: str, idempotency_key: Optional[str] = None) -> dict:
     """Создает продукт в страйпе."""
-    return stripe.Product.create(name=name)
+    return stripe.Product.create(name=name, idempotency_key=idempotency_key)
 
 
-def create_stripe_price(payment_amount: int, product_id: str) -> dict:
+def create_stripe_price(payment_amount: Decimal, product_id: str, idempotency_key: Optional[str] = None) -> dict:
     """Создает цену в страйпе."""
     return stripe.Price.create(
         currency="rub",
-        unit_amount=payment_amount * 100,
+        unit_amount=int(payment_amount * 100),
         product=product_id,
+        idempotency_key=idempotency_key,
     )
 
 
-def create_stripe_session(price: str) -> Tuple[Optional[str], Optional[str]]:
+def create_stripe_session(price: str, idempotency_key: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
     """Создает сессию в страйпе."""
     session = stripe.checkout.Session.create(
         success_url="https://example.com/success",
         line_items=[{"price": price, "quantity": 1}],
         mode="payment",
+        idempotency_key=idempotency_key,
     )
     return session.get("id"), session.get("url")
 
@@ -38,3 +50,188 @@ def retrieve_stripe_session(session_id: str) -> Optional[dict]:
         return session
     except stripe.error.InvalidRequestError:
         return None
+
+
+def get_stripe_product_id(course: Course) -> str:
+    """Возвращает продукт курса в страйпе, создавая его только один раз."""
+    product_id = StripeProduct.objects.filter(course=course).values_list("stripe_product_id", flat=True).first()
+    if product_id is None:
+        product = create_stripe_product(course.name, idempotency_key=f"course-{course.pk}-product")
+        StripeProduct.objects.bulk_create(
+            [StripeProduct(course=course, stripe_product_id=product["id"])], ignore_conflicts=True
+        )
+        product_id = product["id"]
+    return product_id
+
+
+def get_stripe_price_id(course: Course, payment_amount: Decimal) -> str:
+    """Возвращает цену курса в страйпе, создавая ее только для новой суммы."""
+    amount = Decimal(str(payment_amount)).quantize(Decimal("0.01"))
+    price_id = (
+        StripePrice.objects.filter(course=course, amount=amount).values_list("stripe_price_id", flat=True).first()
+    )
+    if price_id is None:
+        product_id = get_stripe_product_id(course)
+        price = create_stripe_price(amount, product_id, idempotency_key=f"course-{course.pk}-price-{amount}")
+        StripePrice.objects.bulk_create(
+            [StripePrice(course=course, amount=amount, stripe_price_id=price["id"])], ignore_conflicts=True
+        )
+        price_id = price["id"]
+    return price_id
+
+
+def create_payment_checkout(payment: Payments) -> None:
+    """Создает сессию оплаты в страйпе и сохраняет ссылку в платеже."""
+    price_id = get_stripe_price_id(payment.paid_course, payment.payment_amount)
+    session_id, payment_link = create_stripe_session(price_id, idempotency_key=f"payment-{payment.pk}-session")
+    payment.stripe_session_id = session_id
+    payment.stripe_link = payment_link
+    Payments.objects.filter(pk=payment.pk).update(stripe_session_id=session_id, stripe_link=payment_link)
+
+
+STRIPE_SESSION_EVENT_STATUSES = {
+    "checkout.session.completed": None,
+    "checkout.session.async_payment_succeeded": Payments.STATUS_PAID,
+    "checkout.session.async_payment_failed": Payments.STATUS_FAILED,
+    "checkout.session.expired": Payments.STATUS_EXPIRED,
+}
+
+
+def get_session_status(session: dict) -> str:
+    """Определяет статус платежа по сессии страйпа."""
+    if session.get("payment_status") in ("paid", "no_payment_required"):
+        return Payments.STATUS_PAID
+    if session.get("status") == "expired":
+        return Payments.STATUS_EXPIRED
+    return Payments.STATUS_PENDING
+
+
+def handle_stripe_event(event: dict) -> bool:
+    """Применяет событие вебхука страйпа к платежу.
+
+    Каждое событие обрабатывается один раз, повторная доставка игнорируется.
+    Возвращает False, если событие уже было обработано.
+    """
+    with transaction.atomic():
+        _, created = StripeEvent.objects.get_or_create(event_id=event["id"], defaults={"event_type": event["type"]})
+        if not created:
+            return False
+        if event["type"] not in STRIPE_SESSION_EVENT_STATUSES:
+            return True
+        session = event["data"]["object"]
+        status = STRIPE_SESSION_EVENT_STATUSES[event["type"]] or get_session_status(session)
+        payments = Payments.objects.select_for_update().filter(stripe_session_id=session["id"])
+        if status != Payments.STATUS_PAID:
+            payments = payments.exclude(status=Payments.STATUS_PAID)
+        rollups = list(payments.exclude(status=status).values(*PAYMENT_ROLLUP_FIELDS))
+        values = {"status": status}
+        if session.get("payment_intent"):
+            values["stripe_payment_intent_id"] = session["payment_intent"]
+        payments.update(**values)
+        for rollup in rollups:
+            apply_status_change(rollup, status)
+    return True
+
+
+def list_stripe_sessions(created_gte: int, session_ids: Set[str]) -> Dict[str, dict]:
+    """Загружает сессии страйпа постранично, пока не найдены все нужные."""
+    found = {}
+    for session in stripe.checkout.Session.list(created={"gte": created_gte}, limit=100).auto_paging_iter():
+        if session["id"] in session_ids:
+            found[session["id"]] = session
+            if len(found) == len(session_ids):
+                break
+    return found
+
+
+def reconcile_stripe_payments(
+    max_workers: int = STRIPE_RECONCILE_WORKERS, days: int = STRIPE_RECONCILE_DAYS
+) -> Dict[str, int]:
+    """Сверяет неоплаченные платежи, созданные за последние days дней, со страйпом и сохраняет изменившиеся статусы.
+
+    Окно считается по created_at, который ставит сервер: дата оплаты приходит от клиента,
+    и один старый платеж заставлял бы листать всю историю сессий. Сессии сначала загружаются
+    списком, оставшиеся запрашиваются по одной в пуле из max_workers потоков. Изменения
+    пишутся одним bulk_update вместе с поправкой сводки платежей.
+    """
+    payments = list(
+        Payments.objects.filter(
+            payment_method="stripe",
+            status=Payments.STATUS_PENDING,
+            stripe_session_id__isnull=False,
+            created_at__gte=now() - timedelta(days=days),
+        ).only("id", *PAYMENT_ROLLUP_FIELDS, "created_at", "stripe_session_id", "stripe_payment_intent_id")
+    )
+    if not payments:
+        return {"checked": 0, "updated": 0, "missing": 0}
+
+    session_ids = {payment.stripe_session_id for payment in payments}
+    # Сессия создается после платежа, запас в час покрывает расхождение часов со страйпом.
+    created_gte = int((min(payment.created_at for payment in payments) - timedelta(hours=1)).timestamp())
+    sessions = list_stripe_sessions(created_gte, session_ids)
+
+    missing = [session_id for session_id in session_ids if session_id not in sessions]
+    if missing:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for session_id, session in zip(missing, executor.map(retrieve_stripe_session, missing)):
+                if session is not None:
+                    sessions[session_id] = session
+
+    changed = {}
+    for payment in payments:
+        session = sessions.get(payment.stripe_session_id)
+        if session is None:
+            continue
+        status = get_session_status(session)
+        if status != payment.status:
+            payment.status = status
+            payment.stripe_payment_intent_id = session.get("payment_intent") or payment.stripe_payment_intent_id
+            changed[payment.pk] = payment
+    with transaction.atomic():
+        # Вебхук мог изменить платеж, пока шла сверка: сводка правится по заблокированным строкам,
+        # а уже не ожидающие оплаты платежи пропускаются, чтобы не учесть их дважды.
+        rows = (
+            Payments.objects.select_for_update()
+            .filter(pk__in=changed, status=Payments.STATUS_PENDING)
+            .values("pk", *PAYMENT_ROLLUP_FIELDS)
+        )
+        updated = []
+        for row in rows:
+            payment = changed[row.pop("pk")]
+            apply_status_change(row, payment.status)
+            updated.append(payment)
+        Payments.objects.bulk_update(updated, ["status", "stripe_payment_intent_id"], batch_size=500)
+    return {"checked": len(payments), "updated": len(updated), "missing": len(session_ids) - len(sessions)}
+
+
+def block_inactive_users(
+    cutoff: datetime,
+    batch_size: int = INACTIVE_USER_BATCH_SIZE,
+    include_never_logged_in: bool = INACTIVE_USER_BLOCK_NEVER_LOGGED_IN,
+) -> Dict[str, int]:
+    """Блокирует пользователей, не заходивших с cutoff, короткими транзакциями по batch_size строк.
+
+    Пользователи без last_login учитываются по date_joined, если include_never_logged_in.
+    Строки, заблокированные другими транзакциями, пропускаются до следующего запуска.
+    """
+    conditions = {"stale": Q(last_login__lt=cutoff)}
+    if include_never_logged_in:
+        conditions["never_logged_in"] = Q(last_login__isnull=True, date_joined__lt=cutoff)
+    result = {"batches": 0}
+    for name, condition in conditions.items():
+        result[name] = 0
+        last_pk = 0
+        while True:
+            with transaction.atomic():
+                pks = list(
+                    User.objects.filter(condition, is_active=True, pk__gt=last_pk)
+                    .order_by("pk")
+                    .select_for_update(skip_locked=True)
+                    .values_list("pk", flat=True)[:batch_size]
+                )
+                if not pks:
+                    break
+                result[name] += User.objects.filter(pk__in=pks).update(is_active=False)
+            result["batches"] += 1
+            last_pk = pks[-1]
+    return result
@@ -0,0 +1,85 @@
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from lms.images import track_image_upload
+from lms.models import Course, Lesson
+from lms.signals import schedule_renditions
+from users.models import Payments, User
+from users.roles import invalidate_user_roles
+from users.rollups import PAYMENT_ROLLUP_FIELDS, apply_payment, detach_payment_rollups, get_payment_values, to_amount
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs) -> None:
+    """Сбрасывает кэш ролей при изменении состава групп."""
+    if reverse:
+        if action == "pre_clear":
+            invalidate_user_roles(instance.user_set.values_list("pk", flat=True))
+        elif action in ("post_add", "post_remove"):
+            invalidate_user_roles(pk_set)
+    elif action in ("post_add", "post_remove", "post_clear"):
+        invalidate_user_roles([instance.pk])
+
+
+@receiver(pre_save, sender=User)
+def avatar_uploading(sender, instance, update_fields=None, **kwargs) -> None:
+    """Отмечает новую загрузку аватара."""
+    track_image_upload(instance, "avatar", update_fields)
+
+
+@receiver(post_save, sender=User)
+def avatar_uploaded(sender, instance, **kwargs) -> None:
+    """Запускает генерацию уменьшенных копий аватара."""
+    schedule_renditions(instance)
+
+
+@receiver(pre_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def group_changed(sender, instance, **kwargs) -> None:
+    """Сбрасывает кэш ролей участников при переименовании или удалении группы."""
+    if instance.pk:
+        invalidate_user_roles(instance.user_set.values_list("pk", flat=True))
+
+
+@receiver(pre_save, sender=Payments)
+def payment_saving(sender, instance, **kwargs) -> None:
+    """Запоминает прежние значения платежа для обновления сводки."""
+    instance._rollup_old = None
+    if instance.pk:
+        instance._rollup_old = (
+            Payments.objects.filter(pk=instance.pk)
+            .values(*PAYMENT_ROLLUP_FIELDS)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Payments)
+def payment_saved(sender, instance, **kwargs) -> None:
+    """Обновляет сводку платежей на разницу между прежним и новым платежом."""
+    old = getattr(instance, "_rollup_old", None)
+    new = get_payment_values(instance)
+    if old is not None:
+        old["payment_amount"] = to_amount(old["payment_amount"])
+        if old == new:
+            return
+        apply_payment(old, -1)
+    apply_payment(new, 1)
+
+
+@receiver(post_delete, sender=Payments)
+def payment_deleted(sender, instance, **kwargs) -> None:
+    """Вычитает удаленный платеж из сводки."""
+    apply_payment(get_payment_values(instance), -1)
+
+
+@receiver(pre_delete, sender=Course)
+def course_deleting(sender, instance, **kwargs) -> None:
+    """Переносит сводку удаляемого курса в строки без курса."""
+    detach_payment_rollups("course_id", instance.pk)
+
+
+@receiver(pre_delete, sender=Lesson)
+def lesson_deleting(sender, instance, **kwargs) -> None:
+    """Переносит сводку удаляемого урока в строки без урока."""
+    detach_payment_rollups("lesson_id", instance.pk)
@@ -1,14 +1,41 @@
+import logging
 from datetime import timedelta
+from typing import Dict
 
+import stripe
 from celery import shared_task
 from django.utils.timezone import now
 
-from users.models import User
+from online_school.settings import INACTIVE_USER_DAYS
+from users.models import Payments
+from users.services import block_inactive_users, create_payment_checkout, reconcile_stripe_payments
+
+logger = logging.getLogger(__name__)
 
 
 @shared_task
-def block_inactive_user():
+def block_inactive_user() -> Dict[str, int]:
     """Блокирует неактивных пользователей после месяца неактива"""
-    last_login = now() - timedelta(days=30)
-    inactive_user = User.objects.filter(is_active=True, last_login__lt=last_login)
-    inactive_user.update(is_active=False)
+    result = block_inactive_users(now() - timedelta(days=INACTIVE_USER_DAYS))
+    logger.info("Inactive users blocked: %s", result)
+    return result
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=10)
+def create_payment_checkout_task(self, payment_id: int) -> None:
+    """Создает сессию оплаты в страйпе вне HTTP-запроса"""
+    payment = Payments.objects.select_related("paid_course").get(pk=payment_id)
+    if payment.stripe_session_id:
+        return
+    try:
+        create_payment_checkout(payment)
+    except stripe.StripeError as exc:
+        raise self.retry(exc=exc)
+
+
+@shared_task
+def reconcile_stripe_payments_task() -> Dict[str, int]:
+    """Периодически сверяет неоплаченные платежи со страйпом"""
+    result = reconcile_stripe_payments()
+    logger.info("Stripe reconciliation: %s", result)
+    return result
@@ -1,8 +1,160 @@
-from django.urls import reverse
+import hashlib
+import hmac
+import json
+import os
+import tempfile
+import threading
+import time
+from asyncio import iscoroutinefunction
+from datetime import timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from typing import Any, Dict, List, Set
+from unittest.mock import patch
+from urllib.parse import parse_qsl, urlparse
+
+import stripe
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from lms.models import Course, Lesson
+from lms.tests import make_image, read_streaming_content
+from online_school.celery import app as celery_app
+from users.authentication import ROLES_CLAIM
+from users.exports import PAYMENT_EXPORT_FIELDS
+from users.importers import import_payments
+from users.models import PaymentRollup, Payments, StripePrice, StripeProduct, User
+from users.roles import MODERATORS_GROUP, get_roles_cache_key, is_moderator
+from users.rollups import rebuild_payment_rollups
+from users.serializers import USER_PAYMENTS_PREVIEW, RoleTokenObtainPairSerializer
+from users.services import block_inactive_users, handle_stripe_event, reconcile_stripe_payments
+from users.tasks import block_inactive_user, reconcile_stripe_payments_task
+
+
+class StripeStub:
+    """Локальный HTTP-сервер, имитирующий нужную часть API страйпа."""
+
+    def __init__(self) -> None:
+        self.requests: List[Dict[str, Any]] = []
+        self.sessions: Dict[str, Dict[str, Any]] = {}
+        self.unlisted: Set[str] = set()
+        self.counter = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self.build_handler())
+
+    def build_handler(self) -> type:
+        """Создает обработчик запросов, привязанный к заглушке."""
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                url = urlparse(self.path)
+                stub.requests.append({"method": "GET", "path": url.path, "params": dict(parse_qsl(url.query))})
+                self.respond(stub.handle_get(url.path, dict(parse_qsl(url.query))))
+
+            def do_POST(self) -> None:
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+                params = dict(parse_qsl(body))
+                stub.requests.append(
+                    {"method": "POST", "path": self.path, "params": params, "idempotency_key": self.headers.get("Idempotency-Key")}
+                )
+                self.respond(stub.handle_post(self.path, params))
+
+            def respond(self, data: Dict[str, Any]) -> None:
+                status_code = 404 if data.get("error") else 200
+                content = json.dumps(data).encode()
+                self.send_response(status_code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        return Handler
+
+    def next_id(self, prefix: str) -> str:
+        """Возвращает новый идентификатор объекта."""
+        self.counter += 1
+        return f"{prefix}_{self.counter}"
+
+    def handle_post(self, path: str, params: Dict[str, str]) -> Dict[str, Any]:
+        """Создает продукт, цену или сессию."""
+        if path == "/v1/products":
+            return {"id": self.next_id("prod"), "object": "product", "name": params["name"]}
+        if path == "/v1/prices":
+            return {"id": self.next_id("price"), "object": "price", "unit_amount": int(params["unit_amount"])}
+        if path == "/v1/checkout/sessions":
+            session_id = self.next_id("cs_test")
+            session = {
+                "id": session_id,
+                "object": "checkout.session",
+                "url": f"https://checkout.stripe.test/{session_id}",
+                "payment_status": "unpaid",
+                "status": "open",
+                "payment_intent": None,
+            }
+            self.sessions[session_id] = session
+            return session
+        return {"error": {"type": "invalid_request_error", "message": f"Unknown path {path}"}}
+
+    def handle_get(self, path: str, params: Dict[str, str]) -> Dict[str, Any]:
+        """Возвращает список сессий или сессию по идентификатору."""
+        if path == "/v1/checkout/sessions":
+            listed = [session for session_id, session in self.sessions.items() if session_id not in self.unlisted]
+            if "starting_after" in params:
+                ids = [session["id"] for session in listed]
+                listed = listed[ids.index(params["starting_after"]) + 1:]
+            limit = int(params.get("limit", 10))
+            return {"object": "list", "url": path, "data": listed[:limit], "has_more": len(listed) > limit}
+        session_id = path.rsplit("/", 1)[-1]
+        if path.startswith("/v1/checkout/sessions/") and session_id in self.sessions:
+            return self.sessions[session_id]
+        return {"error": {"type": "invalid_request_error", "message": f"No such session {session_id}"}}
+
+    def add_session(self, payment_status: str = "unpaid", status: str = "open", listed: bool = True) -> str:
+        """Добавляет сессию с заданным статусом."""
+        session = self.handle_post("/v1/checkout/sessions", {})
+        session.update({"payment_status": payment_status, "status": status})
+        if not listed:
+            self.unlisted.add(session["id"])
+        return session["id"]
+
+    def gets(self, path: str) -> List[Dict[str, Any]]:
+        """Возвращает GET-запросы к пути."""
+        return [request for request in self.requests if request["method"] == "GET" and request["path"] == path]
+
+    def posts(self, path: str) -> List[Dict[str, Any]]:
+        """Возвращает POST-запросы к пути."""
+        return [request for request in self.requests if request["method"] == "POST" and request["path"] == path]
 
-from users.models import Payments, User
+    def __enter__(self) -> "StripeStub":
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        host, port = self.server.server_address
+        self.patches = [
+            patch.object(stripe, "api_base", f"http://{host}:{port}"),
+            patch.object(stripe, "api_key", "sk_test_stub"),
+            patch.object(stripe, "max_network_retries", 0),
+        ]
+        for item in self.patches:
+            item.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        for item in self.patches:
+            item.stop()
+        self.server.shutdown()
+        self.server.server_close()
 
 
 class UserTestCase(APITestCase):
@@ -29,6 +181,43 @@ class UserTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(data["email"], self.user.email)
 
+    def test_user_retrieve_caps_payments(self) -> None:
+        """Тестирует, что профиль выводит последние платежи и ссылку на полный список."""
+        Payments.objects.bulk_create(
+            Payments(user=self.user, payment_date=f"2025-01-{day:02}", payment_amount=day, payment_method="cash")
+            for day in range(1, 16)
+        )
+        url = reverse("users:user-retrieve", args=(self.user.id,))
+        with self.assertNumQueries(4):
+            data = self.client.get(url).json()
+        self.assertEqual(len(data["payments"]), USER_PAYMENTS_PREVIEW)
+        self.assertEqual(data["payments"][0]["payment_date"], "2025-01-15")
+        self.assertEqual(data["payments_url"], "http://testserver" + reverse("users:payments-list"))
+        self.assertNotIn("password", data)
+
+    def test_user_retrieve_public(self) -> None:
+        """Тестирует, что чужой профиль выводит только публичные данные."""
+        other = User.objects.create(email="other@example.com", town="Казань")
+        url = reverse("users:user-retrieve", args=(other.id,))
+        with self.assertNumQueries(1):
+            data = self.client.get(url).json()
+        self.assertEqual(data, {"id": other.id, "town": "Казань", "avatar": None, "avatar_renditions": {}})
+
+    def test_user_avatar_renditions(self) -> None:
+        """Тестирует генерацию копий аватара и их ссылки в списке пользователей."""
+        celery_app.conf.task_always_eager = True
+        self.addCleanup(setattr, celery_app.conf, "task_always_eager", False)
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        with override_settings(MEDIA_ROOT=media.name):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.user.avatar = make_image("me.png", (300, 300))
+                self.user.save()
+            data = self.client.get(reverse("users:user-list")).json()["results"][0]
+        self.assertEqual(
+            data["avatar_renditions"]["small"]["webp"], "http://testserver/media/avatars/renditions/me_small.webp"
+        )
+
     def test_user_update(self) -> None:
         """Тестирует редактирование пользователя."""
         url = reverse("users:user-update", args=(self.user.id,))
@@ -50,9 +239,24 @@ class UserTestCase(APITestCase):
         url = reverse("users:user-list")
         response = self.client.get(url)
         data = response.json()
-        result = [{"id": self.user.id, "town": None, "avatar": None}]
+        result = [{"id": self.user.id, "town": None, "avatar": None, "avatar_renditions": {}}]
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(data, result)
+        self.assertEqual(data["results"], result)
+
+    def test_user_list_town_filter_and_cursor(self) -> None:
+        """Тестирует фильтр по городу и курсорную пагинацию списка пользователей."""
+        users = [User.objects.create(email=f"kzn{n}@example.com", town="Казань") for n in range(3)]
+        User.objects.filter(pk=users[0].pk).update(avatar="avatars/kzn.png")
+        url = reverse("users:user-list")
+        with self.assertNumQueries(1):
+            data = self.client.get(url, {"town": "Казань", "page_size": 2}).json()
+        self.assertEqual([row["id"] for row in data["results"]], [users[0].id, users[1].id])
+        self.assertEqual(data["results"][0]["avatar"], "http://testserver/media/avatars/kzn.png")
+        data = self.client.get(data["next"]).json()
+        self.assertEqual(
+            data["results"], [{"id": users[2].id, "town": "Казань", "avatar": None, "avatar_renditions": {}}]
+        )
+        self.assertIsNone(data["next"])
 
 
 class PaymentsTestCase(APITestCase):
@@ -62,7 +266,7 @@ class PaymentsTestCase(APITestCase):
         self.user.set_password("12345")
         self.user.save()
         self.payments = Payments.objects.create(
-            payment_date="2025-01-25", payment_amount=10000.00, payment_method="credit_card"
+            user=self.user, payment_date="2025-01-25", payment_amount=10000.00, payment_method="credit_card"
         )
         self.client.force_authenticate(user=self.user)
 
@@ -79,6 +283,40 @@ class PaymentsTestCase(APITestCase):
         url = reverse("users:payments-detail", args=(self.payments.id,))
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["status"], Payments.STATUS_PENDING)
+        self.assertFalse(response.json()["paid"])
+
+    def test_payment_status_async(self) -> None:
+        """Тестирует асинхронный статус платежа: те же данные, что и в деталях платежа."""
+        url = reverse("users:payments-status-async", args=(self.payments.id,))
+        self.assertTrue(iscoroutinefunction(resolve(url).func))
+        Payments.objects.filter(pk=self.payments.pk).update(status=Payments.STATUS_PAID)
+        self.client.force_authenticate(user=None)
+        token = RoleTokenObtainPairSerializer.get_token(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        expected = self.client.get(reverse("users:payments-detail", args=(self.payments.id,))).json()
+        self.assertEqual(response.json(), expected)
+        self.assertTrue(expected["paid"])
+        response = self.client.get(reverse("users:payments-status-async", args=(self.payments.id + 1,)))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_payment_status_async_scoped_to_user(self) -> None:
+        """Тестирует, что асинхронный статус чужого платежа недоступен, а персоналу доступен со scope=all."""
+        other = User.objects.create(email="other@example.com")
+        url = reverse("users:payments-status-async", args=(self.payments.id,))
+        self.client.force_authenticate(user=None)
+        token = RoleTokenObtainPairSerializer.get_token(other).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        other.is_staff = True
+        other.save()
+        token = RoleTokenObtainPairSerializer.get_token(other).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(url, {"scope": "all"}).status_code, status.HTTP_200_OK)
 
     def test_payment_update(self) -> None:
         """Тестирует редактирование платежа."""
@@ -97,10 +335,577 @@ class PaymentsTestCase(APITestCase):
         self.assertEqual(Payments.objects.all().count(), 0)
 
     def test_payment_list(self) -> None:
-        """Тестирует вывод списка платежей."""
+        """Тестирует постраничный вывод списка платежей: сначала новые, без COUNT(*)."""
+        Payments.objects.create(user=self.user, payment_date="2025-01-26", payment_amount=500, payment_method="cash")
         url = reverse("users:payments-list")
-        response = self.client.get(url)
+        response = self.client.get(url, {"page_size": 1})
         data = response.json()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(data), {"next", "previous", "results"})
+        self.assertEqual(data["results"], [{"payment_date": "2025-01-26", "payment_amount": 500.0, "payment_method": "cash"}])
+        data = self.client.get(data["next"]).json()
         result = [{"payment_date": "2025-01-25", "payment_amount": 10000.00, "payment_method": "credit_card"}]
+        self.assertEqual(data["results"], result)
+        self.assertIsNone(data["next"])
+
+    def test_payment_export(self) -> None:
+        """Тестирует потоковую выгрузку платежей с фильтрами списка."""
+        Payments.objects.create(user=self.user, payment_date="2025-01-26", payment_amount=500, payment_method="cash")
+        url = reverse("users:payments-export")
+        response = self.client.get(url, {"payment_method": "cash"})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(data, result)
+        self.assertTrue(response.streaming)
+        self.assertTrue(response.is_async)
+        lines = read_streaming_content(response).decode().splitlines()
+        self.assertEqual(lines[0], ",".join(PAYMENT_EXPORT_FIELDS))
+        self.assertEqual(len(lines), 2)
+        self.assertIn("2025-01-26,500.00,cash", lines[1])
+
+        response = self.client.get(url, {"export_format": "ndjson", "ordering": "-payment_date"})
+        rows = [json.loads(line) for line in read_streaming_content(response).decode().splitlines()]
+        self.assertEqual([row["payment_date"] for row in rows], ["2025-01-26", "2025-01-25"])
+
+    def test_payment_export_command(self) -> None:
+        """Тестирует выгрузку платежей командой."""
+        out = StringIO()
+        call_command("export_payments", "--format", "ndjson", "--payment-method", "credit_card", stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([row["id"] for row in rows], [self.payments.id])
+
+    def test_payment_list_scoped_to_user(self) -> None:
+        """Тестирует, что в списке только платежи пользователя, а персонал может видеть все."""
+        other = User.objects.create(email="other@example.com")
+        Payments.objects.create(user=other, payment_date="2025-01-26", payment_amount=500, payment_method="cash")
+        url = reverse("users:payments-list")
+        self.assertEqual(len(self.client.get(url).json()["results"]), 1)
+        self.assertEqual(len(self.client.get(url, {"scope": "all"}).json()["results"]), 1)
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(len(self.client.get(url, {"scope": "all"}).json()["results"]), 2)
+
+    def test_payment_detail_scoped_to_user(self) -> None:
+        """Тестирует, что чужой платеж нельзя получить, изменить или удалить, а персонал может со scope=all."""
+        other = User.objects.create(email="other@example.com")
+        self.client.force_authenticate(user=other)
+        url = reverse("users:payments-detail", args=(self.payments.id,))
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        data = {"payment_date": "2025-03-25", "payment_amount": 1.00, "payment_method": "cash"}
+        self.assertEqual(self.client.put(url, data).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.patch(url, {"payment_amount": 1.00}).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.delete(url).status_code, status.HTTP_404_NOT_FOUND)
+        self.payments.refresh_from_db()
+        self.assertEqual(self.payments.payment_amount, Decimal("10000.00"))
+        other.is_staff = True
+        other.save()
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(url, {"scope": "all"}).status_code, status.HTTP_200_OK)
+
+    def test_benchmark_payments(self) -> None:
+        """Тестирует замер на нескольких строках: заполнение проходит на текущей схеме, изменения откатываются."""
+        out = StringIO()
+        call_command("benchmark_payments", "--rows", "30", "--users", "3", "--repeat", "1", stdout=out)
+        self.assertIn("user, order by date", out.getvalue())
+        self.assertEqual(Payments.objects.count(), 1)
+        self.assertEqual(User.objects.count(), 1)
+        with connection.cursor() as cursor:
+            indexes = connection.introspection.get_constraints(cursor, Payments._meta.db_table)
+        self.assertIn("users_payments_user_date", indexes)
+
+
+class RolesTestCase(APITestCase):
+    def setUp(self) -> None:
+        """Создает пользователя и группу модераторов."""
+        cache.clear()
+        self.user = User.objects.create(email="moder@example.com")
+        self.group = Group.objects.create(name=MODERATORS_GROUP)
+
+    def test_roles_memoized_per_request(self) -> None:
+        """Тестирует, что роли запрашиваются из базы один раз."""
+        with self.assertNumQueries(1):
+            self.assertFalse(is_moderator(self.user))
+            self.assertFalse(is_moderator(self.user))
+
+    @override_settings(CACHE_ENABLED=True)
+    def test_roles_cached_between_requests(self) -> None:
+        """Тестирует, что с общим кэшем роли берутся из кэша для нового объекта пользователя."""
+        is_moderator(self.user)
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertFalse(is_moderator(user))
+
+    def test_roles_not_cached_without_shared_cache(self) -> None:
+        """Тестирует, что без общего кэша смена групп видна сразу, даже без сброса кэша сигналом."""
+        self.assertFalse(is_moderator(self.user))
+        User.groups.through.objects.create(user=self.user, group=self.group)
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(1):
+            self.assertTrue(is_moderator(user))
+
+    @override_settings(CACHE_ENABLED=True)
+    def test_roles_invalidated_on_group_change(self) -> None:
+        """Тестирует сброс кэша при добавлении и удалении пользователя из группы."""
+        self.assertFalse(is_moderator(self.user))
+        self.user.groups.add(self.group)
+        self.assertTrue(is_moderator(User.objects.get(pk=self.user.pk)))
+        self.group.user_set.remove(self.user)
+        self.assertFalse(is_moderator(User.objects.get(pk=self.user.pk)))
+
+
+class RoleTokenTestCase(APITestCase):
+    def setUp(self) -> None:
+        """Создает модератора с паролем и его курс."""
+        cache.clear()
+        self.user = User(email="jwt@example.com")
+        self.user.set_password("12345")
+        self.user.save()
+        self.group = Group.objects.create(name=MODERATORS_GROUP)
+        self.user.groups.add(self.group)
+        self.course = Course.objects.create(name="Курс", owner=User.objects.create(email="owner@example.com"))
+
+    def obtain_tokens(self) -> Dict[str, str]:
+        """Получает пару токенов по email и паролю."""
+        response = self.client.post(reverse("users:login"), {"email": self.user.email, "password": "12345"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_login_adds_role_claims(self) -> None:
+        """Тестирует, что access-токен содержит активность, флаг персонала и роли."""
+        token = AccessToken(self.obtain_tokens()["access"])
+        self.assertTrue(token["is_active"])
+        self.assertFalse(token["is_staff"])
+        self.assertEqual(token[ROLES_CLAIM], [MODERATORS_GROUP])
+
+    def test_request_without_user_query(self) -> None:
+        """Тестирует, что права модератора проверяются по токену без запросов пользователя и групп."""
+        access = self.obtain_tokens()["access"]
+        cache.clear()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        url = reverse("lms:lesson-create")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, {"name": "Урок", "course": self.course.pk})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Lesson.objects.get().owner_id, self.user.pk)
+        tables = " ".join(query["sql"] for query in queries.captured_queries)
+        self.assertNotIn('"users_user"', tables)
+        self.assertNotIn('"auth_group"', tables)
+
+    def test_token_user_owns_objects(self) -> None:
+        """Тестирует, что id пользователя из токена совпадает с владельцем объекта."""
+        self.group.user_set.remove(self.user)
+        lesson = Lesson.objects.create(name="Урок", course=self.course, owner=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.obtain_tokens()['access']}")
+        response = self.client.get(reverse("lms:lesson-retrieve", args=(lesson.id,)))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(reverse("users:user-retrieve", args=(self.user.id,)))
+        self.assertIn("email", response.json())
+
+    def test_refresh_rereads_roles(self) -> None:
+        """Тестирует, что обновление токена берет роли и активность из базы."""
+        refresh = self.obtain_tokens()["refresh"]
+        self.group.user_set.remove(self.user)
+        response = self.client.post(reverse("users:token_refresh"), {"refresh": refresh})
+        self.assertEqual(AccessToken(response.json()["access"])[ROLES_CLAIM], [])
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        response = self.client.post(reverse("users:token_refresh"), {"refresh": refresh})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(CACHE_ENABLED=True)
+    def test_tokens_ignore_role_cache(self) -> None:
+        """Тестирует, что вход и обновление токена берут роли из базы, а не из кэша ролей."""
+        refresh = self.obtain_tokens()["refresh"]
+        cache.set(get_roles_cache_key(self.user.pk), frozenset({"Устаревшая роль"}))
+        self.assertEqual(AccessToken(self.obtain_tokens()["access"])[ROLES_CLAIM], [MODERATORS_GROUP])
+        response = self.client.post(reverse("users:token_refresh"), {"refresh": refresh})
+        self.assertEqual(AccessToken(response.json()["access"])[ROLES_CLAIM], [MODERATORS_GROUP])
+
+    def test_token_without_roles_rejected(self) -> None:
+        """Тестирует, что access-токен без ролей отклоняется."""
+        token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        response = self.client.get(reverse("users:payments-list"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class StripeCheckoutTestCase(APITestCase):
+    def setUp(self) -> None:
+        """Запускает заглушку страйпа и создает курс."""
+        self.stub = StripeStub().__enter__()
+        self.addCleanup(self.stub.__exit__)
+        self.user = User.objects.create(email="buyer@example.com")
+        self.course = Course.objects.create(name="English")
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("users:payments-list")
+        self.data = {
+            "payment_date": "2025-02-25",
+            "payment_amount": 1500.50,
+            "payment_method": "stripe",
+            "paid_course": self.course.id,
+        }
+
+    def test_checkout_reuses_product_and_price(self) -> None:
+        """Тестирует, что повторная покупка курса создает в страйпе только сессию."""
+        first = self.client.post(self.url, self.data).json()
+        second = self.client.post(self.url, self.data).json()
+        self.assertTrue(first["stripe_link"].startswith("https://checkout.stripe.test/"))
+        self.assertNotEqual(first["stripe_link"], second["stripe_link"])
+        self.assertEqual(len(self.stub.posts("/v1/products")), 1)
+        self.assertEqual(len(self.stub.posts("/v1/prices")), 1)
+        self.assertEqual(len(self.stub.posts("/v1/checkout/sessions")), 2)
+        self.assertEqual(self.stub.posts("/v1/prices")[0]["params"]["unit_amount"], "150050")
+        self.assertEqual(StripeProduct.objects.count(), 1)
+        self.assertEqual(StripePrice.objects.get().amount, Decimal("1500.50"))
+
+    def test_checkout_requires_course(self) -> None:
+        """Тестирует ошибку при оплате через страйп без курса."""
+        self.data.pop("paid_course")
+        response = self.client.post(self.url, self.data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.stub.requests, [])
+
+    @override_settings(STRIPE_CHECKOUT_ASYNC=True)
+    def test_checkout_async(self) -> None:
+        """Тестирует создание сессии в фоновой задаче с ключом идемпотентности."""
+        celery_app.conf.task_always_eager = True
+        self.addCleanup(setattr, celery_app.conf, "task_always_eager", False)
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            response = self.client.post(self.url, self.data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIsNone(response.json()["stripe_link"])
+        self.assertEqual(self.stub.requests, [])
+        for callback in callbacks:
+            callback()
+        payment = Payments.objects.get(pk=response.json()["id"])
+        self.assertTrue(payment.stripe_link.startswith("https://checkout.stripe.test/"))
+        session_request = self.stub.posts("/v1/checkout/sessions")[0]
+        self.assertEqual(session_request["idempotency_key"], f"payment-{payment.id}-session")
+        detail = self.client.get(reverse("users:payments-detail", args=(payment.id,))).json()
+        self.assertEqual(detail["stripe_link"], payment.stripe_link)
+        self.assertEqual(detail["status"], Payments.STATUS_PENDING)
+        detail = self.client.get(reverse("users:payments-status-async", args=(payment.id,))).json()
+        self.assertEqual(detail["stripe_link"], payment.stripe_link)
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET="whsec_test")
+class StripeWebhookTestCase(APITestCase):
+    def setUp(self) -> None:
+        """Создает платеж со сессией страйпа."""
+        self.user = User.objects.create(email="buyer@example.com")
+        self.payment = Payments.objects.create(
+            user=self.user,
+            payment_date="2025-02-25",
+            payment_amount=1500,
+            payment_method="stripe",
+            stripe_session_id="cs_test_1",
+        )
+        self.url = reverse("users:stripe-webhook")
+
+    def post_event(self, event_type: str, session: Dict[str, Any], event_id: str = "evt_1", secret: str = "whsec_test"):
+        """Отправляет событие, подписанное так же, как это делает страйп."""
+        payload = json.dumps({"id": event_id, "object": "event", "type": event_type, "data": {"object": session}})
+        timestamp = int(time.time())
+        signature = hmac.new(secret.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256).hexdigest()
+        return self.client.post(
+            self.url, payload, content_type="application/json", HTTP_STRIPE_SIGNATURE=f"t={timestamp},v1={signature}"
+        )
+
+    def test_webhook_marks_payment_paid(self) -> None:
+        """Тестирует обновление статуса платежа по событию и ответ retrieve без обращения к страйпу."""
+        session = {"id": "cs_test_1", "object": "checkout.session", "payment_status": "paid", "payment_intent": "pi_1"}
+        response = self.post_event("checkout.session.completed", session)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payments.STATUS_PAID)
+        self.assertEqual(self.payment.stripe_payment_intent_id, "pi_1")
+
+        self.client.force_authenticate(user=self.user)
+        with patch("stripe.checkout.Session.retrieve") as retrieve_mock:
+            data = self.client.get(reverse("users:payments-detail", args=(self.payment.id,))).json()
+        retrieve_mock.assert_not_called()
+        self.assertTrue(data["paid"])
+        self.assertEqual(data["status"], Payments.STATUS_PAID)
+
+    def test_webhook_event_processed_once(self) -> None:
+        """Тестирует, что повторная доставка события не применяется второй раз."""
+        self.post_event("checkout.session.completed", {"id": "cs_test_1", "payment_status": "paid"})
+        self.post_event("checkout.session.expired", {"id": "cs_test_1", "status": "expired"}, event_id="evt_2")
+        Payments.objects.filter(pk=self.payment.pk).update(status=Payments.STATUS_PENDING)
+        response = self.post_event("checkout.session.completed", {"id": "cs_test_1", "payment_status": "paid"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payments.STATUS_PENDING)
+
+    def test_webhook_rejects_bad_signature(self) -> None:
+        """Тестирует отказ для события с неверной подписью."""
+        response = self.post_event("checkout.session.completed", {"id": "cs_test_1"}, secret="whsec_wrong")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payments.STATUS_PENDING)
+
+    def test_webhook_keeps_payment_intent(self) -> None:
+        """Тестирует, что событие без payment_intent не стирает сохраненный идентификатор."""
+        Payments.objects.filter(pk=self.payment.pk).update(stripe_payment_intent_id="pi_1")
+        self.post_event("checkout.session.expired", {"id": "cs_test_1", "status": "expired"})
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payments.STATUS_EXPIRED)
+        self.assertEqual(self.payment.stripe_payment_intent_id, "pi_1")
+
+    @override_settings(STRIPE_WEBHOOK_SECRET="")
+    def test_webhook_rejected_without_secret(self) -> None:
+        """Тестирует отказ для события, подписанного пустым ключом, когда секрет вебхука не задан."""
+        session = {"id": "cs_test_1", "payment_status": "paid"}
+        response = self.post_event("checkout.session.completed", session, secret="")
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payments.STATUS_PENDING)
+
+
+class StripeReconciliationTestCase(APITestCase):
+    def setUp(self) -> None:
+        """Запускает заглушку страйпа."""
+        self.stub = StripeStub().__enter__()
+        self.addCleanup(self.stub.__exit__)
+
+    def create_payment(self, session_id: str, **kwargs) -> Payments:
+        """Создает платеж через страйп."""
+        return Payments.objects.create(
+            payment_date="2025-02-25",
+            payment_amount=1500,
+            payment_method="stripe",
+            stripe_session_id=session_id,
+            **kwargs,
+        )
+
+    def test_reconcile_stripe_payments(self) -> None:
+        """Тестирует сверку платежей списком и точечными запросами."""
+        paid = self.create_payment(self.stub.add_session(payment_status="paid", status="complete"))
+        expired = self.create_payment(self.stub.add_session(status="expired", listed=False))
+        pending = self.create_payment(self.stub.add_session())
+        for i in range(3):
+            self.stub.add_session()
+        already_paid = self.create_payment(self.stub.add_session(), status=Payments.STATUS_PAID)
+        self.create_payment("cs_unknown")
+
+        result = reconcile_stripe_payments_task()
+
+        self.assertEqual(result, {"checked": 4, "updated": 2, "missing": 1})
+        statuses = dict(Payments.objects.values_list("id", "status"))
+        self.assertEqual(statuses[paid.id], Payments.STATUS_PAID)
+        self.assertEqual(statuses[expired.id], Payments.STATUS_EXPIRED)
+        self.assertEqual(statuses[pending.id], Payments.STATUS_PENDING)
+        self.assertEqual(statuses[already_paid.id], Payments.STATUS_PAID)
+        self.assertEqual(len(self.stub.gets(f"/v1/checkout/sessions/{paid.stripe_session_id}")), 0)
+        self.assertEqual(len(self.stub.gets(f"/v1/checkout/sessions/{expired.stripe_session_id}")), 1)
+
+    def test_reconcile_window_uses_creation_time(self) -> None:
+        """Тестирует, что старые и задним числом датированные платежи не расширяют окно сверки."""
+        old = self.create_payment(self.stub.add_session(payment_status="paid", status="complete"))
+        Payments.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=10))
+        backdated = self.create_payment(self.stub.add_session(payment_status="paid", status="complete"))
+        Payments.objects.filter(pk=backdated.pk).update(payment_date="2015-01-01")
+
+        result = reconcile_stripe_payments_task()
+
+        self.assertEqual(result, {"checked": 1, "updated": 1, "missing": 0})
+        self.assertEqual(Payments.objects.get(pk=old.pk).status, Payments.STATUS_PENDING)
+        self.assertEqual(Payments.objects.get(pk=backdated.pk).status, Payments.STATUS_PAID)
+        created_gte = int(self.stub.gets("/v1/checkout/sessions")[0]["params"]["created[gte]"])
+        self.assertGreater(created_gte, (timezone.now() - timedelta(hours=2)).timestamp())
+
+
+class RevenueAnalyticsTestCase(APITestCase):
+    def setUp(self) -> None:
+        """Импортирует платежи за несколько дней: наличные проводятся сразу, одна оплата Stripe ожидает оплаты."""
+        self.admin = User.objects.create(email="admin@example.com", is_staff=True)
+        self.course = Course.objects.create(name="English")
+        self.lesson = Lesson.objects.create(name="Alphabet", course=self.course)
+        course, lesson = {"paid_course": self.course.id}, {"paid_lesson": self.lesson.id}
+        import_payments(
+            [
+                dict(course, payment_date="2025-01-10", payment_amount=100, payment_method="cash"),
+                dict(course, payment_date="2025-01-10", payment_amount=200, payment_method="cash"),
+                dict(course, payment_date="2025-01-20", payment_amount=300, payment_method="stripe", status="paid"),
+                dict(course, payment_date="2025-02-01", payment_amount=400, payment_method="cash"),
+                dict(lesson, payment_date="2025-02-01", payment_amount=50, payment_method="cash"),
+                dict(course, payment_date="2025-02-01", payment_amount=1000, payment_method="stripe"),
+            ]
+        )
+        rebuild_payment_rollups()
+        self.client.force_authenticate(user=self.admin)
+        self.url = reverse("users:revenue")
+
+    def test_revenue_by_month(self) -> None:
+        """Тестирует выручку по месяцам из сводки."""
+        response = self.client.get(self.url, {"group_by": "month"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json(),
+            [
+                {"month": "2025-01-01", "total_amount": 600.0, "payments_count": 3},
+                {"month": "2025-02-01", "total_amount": 450.0, "payments_count": 2},
+            ],
+        )
+
+    def test_revenue_filters(self) -> None:
+        """Тестирует группировку по курсу и способу оплаты с фильтром по датам."""
+        params = {"group_by": "course,payment_method", "date_from": "2025-01-15", "course": self.course.id}
+        response = self.client.get(self.url, params)
+        self.assertEqual(
+            response.json(),
+            [
+                {"course_id": self.course.id, "payment_method": "cash", "total_amount": 400.0, "payments_count": 1},
+                {"course_id": self.course.id, "payment_method": "stripe", "total_amount": 300.0, "payments_count": 1},
+            ],
+        )
+
+    def test_rollup_follows_changes(self) -> None:
+        """Тестирует обновление сводки при изменении и удалении платежей и курса."""
+        payment = Payments.objects.get(payment_amount=300)
+        payment.payment_amount = 350
+        payment.payment_method = "cash"
+        payment.save()
+        Payments.objects.get(payment_amount=400).delete()
+        self.course.delete()
+        incremental = set(
+            PaymentRollup.objects.filter(payments_count__gt=0).values_list(
+                "date", "course_id", "lesson_id", "payment_method", "total_amount", "payments_count"
+            )
+        )
+        call_command("rebuild_payment_rollups", stdout=StringIO())
+        rebuilt = set(
+            PaymentRollup.objects.values_list(
+                "date", "course_id", "lesson_id", "payment_method", "total_amount", "payments_count"
+            )
+        )
+        self.assertEqual(incremental, rebuilt)
+        response = self.client.get(self.url)
+        self.assertEqual(response.json(), [{"total_amount": 700.0, "payments_count": 4}])
+
+    def test_rollup_follows_status(self) -> None:
+        """Тестирует, что в сводку попадают только оплаченные платежи: переходы pending → paid и pending → expired."""
+        Payments.objects.filter(payment_amount=1000).update(stripe_session_id="cs_rollup_paid")
+        expiring = Payments.objects.create(
+            payment_date="2025-02-01", payment_amount=700, payment_method="stripe", paid_course=self.course
+        )
+        self.assertEqual(self.client.get(self.url).json(), [{"total_amount": 1050.0, "payments_count": 5}])
+
+        session = {"id": "cs_rollup_paid", "payment_status": "paid", "payment_intent": "pi_1"}
+        handle_stripe_event({"id": "evt_rollup", "type": "checkout.session.completed", "data": {"object": session}})
+        self.assertEqual(self.client.get(self.url).json(), [{"total_amount": 2050.0, "payments_count": 6}])
+
+        with StripeStub() as stub:
+            expiring.stripe_session_id = stub.add_session(status="expired")
+            expiring.save()
+            self.assertEqual(reconcile_stripe_payments()["updated"], 1)
+        expiring.refresh_from_db()
+        self.assertEqual(expiring.status, Payments.STATUS_EXPIRED)
+        self.assertEqual(self.client.get(self.url).json(), [{"total_amount": 2050.0, "payments_count": 6}])
+
+        expiring.status = Payments.STATUS_PAID
+        expiring.save()
+        Payments.objects.get(stripe_session_id="cs_rollup_paid").delete()
+        self.assertEqual(self.client.get(self.url).json(), [{"total_amount": 1750.0, "payments_count": 6}])
+        incremental = set(PaymentRollup.objects.filter(payments_count__gt=0).values_list("date", "total_amount"))
+        call_command("rebuild_payment_rollups", stdout=StringIO())
+        self.assertEqual(incremental, set(PaymentRollup.objects.values_list("date", "total_amount")))
+
+    def test_offline_payment_counted(self) -> None:
+        """Тестирует, что оплата наличными через API сразу проводится и попадает в выручку."""
+        data = {"payment_date": "2025-03-01", "payment_amount": 70, "payment_method": "cash"}
+        response = self.client.post(reverse("users:payments-list"), data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Payments.objects.get(pk=response.json()["id"]).status, Payments.STATUS_PAID)
+        response = self.client.get(self.url, {"date_from": "2025-03-01"})
+        self.assertEqual(response.json(), [{"total_amount": 70.0, "payments_count": 1}])
+
+    def test_revenue_requires_staff(self) -> None:
+        """Тестирует, что выручка доступна только персоналу."""
+        self.client.force_authenticate(user=User.objects.create(email="user@example.com"))
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class PaymentImportTestCase(APITestCase):
+    def setUp(self) -> None:
+        """Создает покупателя, курс, оплату Stripe для обновления и временный каталог для файлов импорта."""
+        self.user = User.objects.create(email="buyer@example.com")
+        self.course = Course.objects.create(name="Импорт")
+        self.existing = Payments.objects.create(
+            user=self.user,
+            payment_date="2025-01-01",
+            payment_amount=100,
+            payment_method="stripe",
+            stripe_session_id="cs_import_1",
+        )
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name: str, content: str) -> str:
+        """Записывает файл импорта во временный каталог и возвращает его путь."""
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+        return path
+
+    def test_import_csv_upserts_and_rejects(self) -> None:
+        """Тестирует импорт CSV: обновление по сессии Stripe, вставку и отбраковку строк."""
+        path = self.write(
+            "payments.csv",
+            "user_id,payment_date,payment_amount,payment_method,paid_course_id,stripe_session_id,status\n"
+            f"{self.user.id},2025-01-01,150,stripe,{self.course.id},cs_import_1,paid\n"
+            f"{self.user.id},2025-01-02,200,cash,{self.course.id},,\n"
+            f"{self.user.id},2025-01-03,abc,cash,,,\n"
+            f"{self.user.id},2025-01-03,10,cash,999999,,\n",
+        )
+        out, err = StringIO(), StringIO()
+        call_command("load_payments", path, "--batch-size", "2", stdout=out, stderr=err)
+        self.assertIn("1 created, 1 updated, 2 rejected", out.getvalue())
+        self.assertIn("row 3", err.getvalue())
+        self.assertIn("row 4", err.getvalue())
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.payment_amount, Decimal("150.00"))
+        self.assertEqual(self.existing.status, Payments.STATUS_PAID)
+        self.assertEqual(Payments.objects.count(), 2)
+        self.assertEqual(
+            set(PaymentRollup.objects.values_list("payment_method", "total_amount")),
+            {("stripe", Decimal("150.00")), ("cash", Decimal("200.00"))},
+        )
+
+    def test_import_json_fixture_and_ndjson(self) -> None:
+        """Тестирует потоковый импорт фикстуры JSON и NDJSON без удаления существующих платежей."""
+        fields = {"user": self.user.id, "payment_date": "2025-02-01", "payment_amount": "50.00", "payment_method": "cash"}
+        fixture = json.dumps([{"model": "users.payments", "pk": n, "fields": fields} for n in range(1, 4)], indent=2)
+        call_command("load_payments", self.write("payments.json", fixture), stdout=StringIO())
+        line = json.dumps(dict(fields, stripe_session_id="cs_import_2"))
+        call_command("load_payments", self.write("payments.ndjson", f"{line}\n{line}\n"), stdout=StringIO())
+        self.assertEqual(Payments.objects.count(), 5)
+        self.assertEqual(Payments.objects.filter(stripe_session_id="cs_import_2").count(), 1)
+
+
+class InactiveUsersTestCase(APITestCase):
+    def setUp(self) -> None:
+        """Создает давно не заходивших, недавно заходивших, ни разу не входивших и новых пользователей."""
+        old = timezone.now() - timedelta(days=60)
+        self.stale = [User.objects.create(email=f"stale{n}@example.com", last_login=old) for n in range(5)]
+        self.recent = User.objects.create(email="recent@example.com", last_login=timezone.now())
+        self.never = User.objects.create(email="never@example.com")
+        User.objects.filter(pk=self.never.pk).update(date_joined=old)
+        self.fresh = User.objects.create(email="fresh@example.com")
+
+    def test_block_inactive_user(self) -> None:
+        """Тестирует, что по умолчанию никогда не заходившие пользователи не блокируются."""
+        result = block_inactive_user()
+        self.assertEqual(result, {"batches": 1, "stale": 5})
+        self.assertEqual(
+            set(User.objects.filter(is_active=True).values_list("email", flat=True)),
+            {"recent@example.com", "never@example.com", "fresh@example.com"},
+        )
+
+    def test_block_never_logged_in_by_date_joined(self) -> None:
+        """Тестирует блокировку пачками, включая никогда не заходивших пользователей по дате регистрации."""
+        cutoff = timezone.now() - timedelta(days=30)
+        result = block_inactive_users(cutoff, batch_size=2, include_never_logged_in=True)
+        self.assertEqual(result, {"batches": 4, "stale": 5, "never_logged_in": 1})
+        self.assertEqual(
+            set(User.objects.filter(is_active=True).values_list("email", flat=True)),
+            {"recent@example.com", "fresh@example.com"},
+        )
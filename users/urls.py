@@ -3,7 +3,8 @@ from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 from users.apps import UsersConfig
-from users.views import (PaymentsViewSet, UserCreateAPIView, UserDestroyAPIView, UserListAPIView, UserRetrieveAPIView,
+from users.views import (PaymentStatusAsyncAPIView, PaymentsViewSet, RevenueAnalyticsAPIView, StripeWebhookAPIView,
+                         UserCreateAPIView, UserDestroyAPIView, UserListAPIView, UserRetrieveAPIView,
                          UserUpdateAPIView)
 
 app_name = UsersConfig.name
@@ -11,6 +12,7 @@ router = DefaultRouter()
 router.register("payments", PaymentsViewSet)
 
 urlpatterns = router.urls + [
+    path("payments/<int:pk>/async/", PaymentStatusAsyncAPIView.as_view(), name="payments-status-async"),
     path("register/", UserCreateAPIView.as_view(), name="register"),
     path("user/<int:pk>/update/", UserUpdateAPIView.as_view(), name="user-update"),
     path("users/", UserListAPIView.as_view(), name="user-list"),
@@ -18,4 +20,6 @@ urlpatterns = router.urls + [
     path("user/<int:pk>/delete", UserDestroyAPIView.as_view(), name="user-delete"),
     path("login/", TokenObtainPairView.as_view(), name="login"),
     path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
+    path("stripe/webhook/", StripeWebhookAPIView.as_view(), name="stripe-webhook"),
+    path("analytics/revenue/", RevenueAnalyticsAPIView.as_view(), name="revenue"),
 ]
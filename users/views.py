@@ -1,18 +1,36 @@
+from functools import partial
+from typing import Optional, Type
+
+import stripe
+from django.conf import settings
+from django.db import transaction
+from django.db.models import QuerySet
+from django.http import StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, extend_schema_view
-from rest_framework import generics
+from rest_framework import generics, status
+from rest_framework.decorators import action
 from rest_framework.filters import OrderingFilter
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.serializers import Serializer
+from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 
+from lms.images import get_rendition_urls
+from lms.mixins import AsyncViewMixin
+from users.exports import PAYMENT_EXPORT_FIELDS, export_response, get_export_format
 from users.models import Payments, User
+from users.paginators import PaymentCursorPagination, UserCursorPagination
 from users.permissions import IsOwnerOrReadOnly
-from users.serializers import (PaymentsSerializer, UserCreateSerializer, UserPrivateSerializer, UserPublicSerializer,
-                               UserUpdateSerializer)
-from users.services import create_stripe_price, create_stripe_product, create_stripe_session, retrieve_stripe_session
+from users.rollups import get_revenue
+from users.serializers import (PaymentCheckoutSerializer, PaymentsSerializer, PaymentStatusSerializer,
+                               RevenueQuerySerializer, RevenueSerializer, UserCreateSerializer, UserPrivateSerializer,
+                               UserPublicSerializer, UserUpdateSerializer)
+from users.services import create_payment_checkout, handle_stripe_event
+from users.tasks import create_payment_checkout_task
 
 
 @extend_schema(
@@ -35,13 +53,36 @@ class UserCreateAPIView(generics.CreateAPIView):
 
 @extend_schema(
     summary="Список пользователей",
-    description="Возвращает список всех пользователей с публичными данными.",
+    description="Возвращает постраничный список пользователей с публичными данными, с фильтром по городу.",
     responses=UserPublicSerializer(many=True),
 )
 class UserListAPIView(generics.ListAPIView):
-    queryset = User.objects.all()
+    queryset = User.objects.values(*UserPublicSerializer.Meta.fields)
     serializer_class = UserPublicSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = UserCursorPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ("town",)
+
+    def get_avatar_url(self, name: str) -> Optional[str]:
+        """Получает абсолютную ссылку на аватар по имени файла."""
+        if not name:
+            return None
+        return self.request.build_absolute_uri(User._meta.get_field("avatar").storage.url(name))
+
+    def list(self, request: Request, *args, **kwargs) -> Response:
+        """Выводит страницу пользователей из values() без создания объектов модели."""
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        storage = User._meta.get_field("avatar").storage
+        results = [
+            dict(
+                row,
+                avatar=self.get_avatar_url(row["avatar"]),
+                avatar_renditions=get_rendition_urls(row["avatar_renditions"], storage, request),
+            )
+            for row in page
+        ]
+        return self.get_paginated_response(results)
 
 
 @extend_schema(
@@ -54,9 +95,25 @@ class UserRetrieveAPIView(generics.RetrieveAPIView):
     serializer_class = UserPublicSerializer
     permission_classes = [IsAuthenticated]
 
-    def get_serializer_class(self):
+    def is_own_profile(self) -> bool:
+        """Проверяет, что запрошен профиль текущего пользователя."""
+        return self.kwargs["pk"] == self.request.user.pk
+
+    def get_queryset(self) -> QuerySet:
+        """Выбирает только поля, которые выводит сериалайзер."""
+        if self.is_own_profile():
+            return User.objects.defer("password")
+        return User.objects.only(*UserPublicSerializer.Meta.fields)
+
+    def get_object(self) -> User:
+        """Получает пользователя один раз за запрос."""
+        if not hasattr(self, "_object"):
+            self._object = super().get_object()
+        return self._object
+
+    def get_serializer_class(self) -> Type[Serializer]:
         """Получает сериалайзер для эндпоинта."""
-        if self.get_object() == self.request.user:
+        if self.is_own_profile():
             return UserPrivateSerializer
         return UserPublicSerializer
 
@@ -84,21 +141,39 @@ class UserDestroyAPIView(generics.DestroyAPIView):
     permission_classes = [IsAuthenticated, IsOwnerOrReadOnly]
 
 
+class UserPaymentsMixin:
+    """Ограничивает платежи текущим пользователем."""
+
+    def get_queryset(self) -> QuerySet:
+        """Возвращает платежи текущего пользователя.
+
+        Персонал видит платежи всех пользователей с параметром scope=all.
+        """
+        queryset = super().get_queryset()
+        user = self.request.user
+        if user.is_staff and self.request.query_params.get("scope") == "all":
+            return queryset
+        return queryset.filter(user_id=user.pk)
+
+
 @extend_schema_view(
     create=extend_schema(
         summary="Создание платежа",
-        description="Создает платеж и сессию stripe, если метод оплаты stripe.",
-        request=PaymentsSerializer,
-        responses=PaymentsSerializer,
+        description="Создает платеж и сессию stripe, если метод оплаты stripe. "
+        "В асинхронном режиме ссылка на оплату появляется в платеже после создания сессии.",
+        request=PaymentCheckoutSerializer,
+        responses=PaymentCheckoutSerializer,
     ),
     retrieve=extend_schema(
         summary="Детали платежа",
-        description="Возвращает данные платежа и статус оплаты stripe.",
-        responses=PaymentsSerializer,
+        description="Возвращает данные платежа, статус оплаты stripe и ссылку на оплату из базы. "
+        "В асинхронном режиме ссылку ждут, повторяя этот запрос.",
+        responses=PaymentStatusSerializer,
     ),
     list=extend_schema(
         summary="Список платежей",
-        description="Возвращает список всех платежей.",
+        description="Возвращает платежи текущего пользователя постранично (курсорная пагинация, сначала новые). "
+        "Персонал может получить все платежи с scope=all.",
     ),
     update=extend_schema(
         summary="Обновление платежа",
@@ -118,9 +193,10 @@ class UserDestroyAPIView(generics.DestroyAPIView):
         responses=None,
     ),
 )
-class PaymentsViewSet(ModelViewSet):
+class PaymentsViewSet(UserPaymentsMixin, ModelViewSet):
     queryset = Payments.objects.all()
     serializer_class = PaymentsSerializer
+    pagination_class = PaymentCursorPagination
     filter_backends = [DjangoFilterBackend, OrderingFilter]
     ordering_fields = ("payment_date",)
     filterset_fields = (
@@ -129,30 +205,102 @@ class PaymentsViewSet(ModelViewSet):
         "payment_method",
     )
 
+    def get_serializer_class(self) -> Type[Serializer]:
+        """Получает сериализатор для текущего действия."""
+        if self.action == "create":
+            return PaymentCheckoutSerializer
+        if self.action == "retrieve":
+            return PaymentStatusSerializer
+        return PaymentsSerializer
+
     def perform_create(self, serializer: Serializer) -> None:
-        """Реализует оплату через страйп."""
-        payment = serializer.save(user=self.request.user)
-        if payment.payment_method == "stripe":
-            amount = payment.payment_amount
-            product_name = payment.paid_course.name
-            product = create_stripe_product(product_name)
-            price = create_stripe_price(payment_amount=amount, product_id=product["id"])
-            session_id, payment_link = create_stripe_session(price["id"])
-            payment.stripe_session_id = session_id
-            payment.stripe_link = payment_link
-            payment.save()
-
-    def retrieve(self, request: Request, *args, **kwargs) -> Response:
-        """Проверяет статус оплаты в страйпе."""
-        payment = self.get_object()
-        paid = False
-        if payment.payment_method == "stripe" and payment.stripe_session_id:
-            session = retrieve_stripe_session(payment.stripe_session_id)
-            if session and session.get("payment_status") == "paid":
-                payment.is_paid = True
-                payment.save()
-                paid = True
-
-        data = self.get_serializer(payment).data
-        data["paid"] = paid
-        return Response(data)
+        """Реализует оплату через страйп.
+
+        Продукт и цена курса создаются в страйпе один раз и берутся из базы.
+        При STRIPE_CHECKOUT_ASYNC сессия создается в фоновой задаче, а ссылка
+        появляется в платеже позже. Оплата наличными и переводом сразу проводится.
+        """
+        payment_method = serializer.validated_data["payment_method"]
+        payment = serializer.save(user_id=self.request.user.pk, status=Payments.get_initial_status(payment_method))
+        if payment_method == "stripe":
+            if settings.STRIPE_CHECKOUT_ASYNC:
+                transaction.on_commit(partial(create_payment_checkout_task.delay, payment.id))
+            else:
+                create_payment_checkout(payment)
+
+    @extend_schema(
+        summary="Выгрузка платежей",
+        description="Потоково выгружает платежи в CSV или NDJSON (export_format=csv|ndjson) "
+        "с теми же фильтрами, что и список.",
+        responses={(200, "text/csv"): OpenApiTypes.STR, (200, "application/x-ndjson"): OpenApiTypes.STR},
+    )
+    @action(detail=False, methods=["get"])
+    def export(self, request: Request, *args, **kwargs) -> StreamingHttpResponse:
+        """Выгружает отфильтрованные платежи."""
+        export_format = get_export_format(request.query_params.get("export_format", "csv"))
+        queryset = self.filter_queryset(self.get_queryset())
+        return export_response(queryset, PAYMENT_EXPORT_FIELDS, export_format, "payments")
+
+
+@extend_schema(
+    summary="Статус платежа (асинхронный)",
+    description="Асинхронный вариант деталей платежа для ASGI-воркера: данные платежа, статус оплаты stripe "
+    "и ссылка на оплату из базы.",
+    responses=PaymentStatusSerializer,
+)
+class PaymentStatusAsyncAPIView(AsyncViewMixin, UserPaymentsMixin, generics.GenericAPIView):
+    queryset = Payments.objects.only("payment_date", "payment_amount", "payment_method", "status", "stripe_link")
+    serializer_class = PaymentStatusSerializer
+
+    async def get(self, request: Request, *args, **kwargs) -> Response:
+        """Читает платеж асинхронным ORM."""
+        payment = await self.aget_object()
+        return Response(self.get_serializer(payment).data)
+
+
+@extend_schema(
+    summary="Вебхук Stripe",
+    description="Принимает подписанные события страйпа и обновляет статус платежей.",
+    request=None,
+    responses={200: None, 400: None, 503: None},
+)
+class StripeWebhookAPIView(APIView):
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request: Request, *args, **kwargs) -> Response:
+        """Проверяет подпись события и применяет его к платежу.
+
+        Без STRIPE_WEBHOOK_SECRET события не принимаются: подпись пустым ключом может посчитать кто угодно.
+        """
+        if not settings.STRIPE_WEBHOOK_SECRET:
+            return Response(status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        try:
+            event = stripe.Webhook.construct_event(
+                request.body, request.headers.get("Stripe-Signature", ""), settings.STRIPE_WEBHOOK_SECRET
+            )
+        except (ValueError, stripe.SignatureVerificationError):
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        handle_stripe_event(event)
+        return Response(status=status.HTTP_200_OK)
+
+
+@extend_schema(
+    summary="Выручка",
+    description="Возвращает выручку из сводки платежей. group_by — через запятую из day, month, course, "
+    "lesson, payment_method; фильтры date_from, date_to, course, lesson, payment_method.",
+    parameters=[RevenueQuerySerializer],
+    responses=RevenueSerializer(many=True),
+)
+class RevenueAnalyticsAPIView(generics.GenericAPIView):
+    permission_classes = [IsAdminUser]
+    serializer_class = RevenueSerializer
+
+    def get(self, request: Request, *args, **kwargs) -> Response:
+        """Считает выручку по сводке за выбранный период."""
+        query = RevenueQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        filters = dict(query.validated_data)
+        group_by = filters.pop("group_by")
+        rows = get_revenue(group_by, filters)
+        return Response(RevenueSerializer(rows, many=True).data)